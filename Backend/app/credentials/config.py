@@ -51,6 +51,71 @@ APP_PORT = os.environ.get('APP_PORT')
 if APP_PORT is None:
     raise ValueError('No APP_PORT set for FastAPI application')
 
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', 60))
+PRINCIPAL_CACHE_USE_REDIS = os.environ.get('PRINCIPAL_CACHE_USE_REDIS', 'true').lower() == 'true'
+
+# TTL of each namespace of the shared cache, overridable with CACHE_TTL_<NAMESPACE>.
+CACHE_TTL_SECONDS = {
+    namespace: int(os.environ.get(f'CACHE_TTL_{namespace.upper()}', default))
+    for namespace, default in {
+        "post": 60, "user": 120, "user_summary": 300,
+        # Cached GET responses. Feeds also change when a followed author with too many
+        # followers to fan out posts, which does not invalidate them, hence the shorter TTL.
+        "post_response": 60, "user_response": 60, "feed_response": 15,
+    }.items()
+}
+# Eagerness of probabilistic early expiration: 0 disables it, > 1 refreshes earlier.
+CACHE_EARLY_EXPIRATION_BETA = float(os.environ.get('CACHE_EARLY_EXPIRATION_BETA', 1.0))
+# Per-worker cache in front of Redis; entries are evicted on every worker when invalidated.
+CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', 10000))
+CACHE_L1_TTL_SECONDS = float(os.environ.get('CACHE_L1_TTL_SECONDS', 10))
+
+# Requests allowed per sliding window for each route group of app.utils.rate_limit,
+# as "<requests>/<seconds>", overridable with RATE_LIMIT_<GROUP>. 0 requests disables a group.
+RATE_LIMITS = {
+    group: tuple(int(part) for part in os.environ.get(f'RATE_LIMIT_{group.upper()}', default).split('/'))
+    for group, default in {
+        "auth": "20/60", "search": "60/60", "write": "120/60", "default": "600/60",
+    }.items()
+}
+# Proxies in front of the app that append to X-Forwarded-For; anonymous clients are
+# keyed on the address that many entries from the end (0 uses the peer address).
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 1))
+
+# Adaptive concurrency limit of each worker (app.utils.concurrency): requests beyond it
+# are shed with a 503. It starts at the initial value and moves between the bounds.
+CONCURRENCY_LIMIT_INITIAL = int(os.environ.get('CONCURRENCY_LIMIT_INITIAL', 100))
+CONCURRENCY_LIMIT_MIN = int(os.environ.get('CONCURRENCY_LIMIT_MIN', 10))
+CONCURRENCY_LIMIT_MAX = int(os.environ.get('CONCURRENCY_LIMIT_MAX', 500))
+# Average latency above this multiple of its recent baseline is read as overload.
+CONCURRENCY_LATENCY_TOLERANCE = float(os.environ.get('CONCURRENCY_LATENCY_TOLERANCE', 2.0))
+# How long a query may wait for a pooled Mongo connection before failing.
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+
+# Time budget in seconds of a request per route group (see RATE_LIMITS), overridable
+# with REQUEST_TIMEOUT_<GROUP>. Clients may ask for less with X-Request-Timeout.
+REQUEST_TIMEOUTS = {
+    group: float(os.environ.get(f'REQUEST_TIMEOUT_{group.upper()}', default))
+    for group, default in {
+        "auth": 10, "search": 5, "write": 10, "default": 5,
+    }.items()
+}
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+
+WS_HEARTBEAT_SECONDS = float(os.environ.get('WS_HEARTBEAT_SECONDS', 25))
+WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE', 100))
+
+UNREAD_COUNTER_TTL_SECONDS = int(os.environ.get('UNREAD_COUNTER_TTL_SECONDS', 86400))
+UNREAD_RECONCILE_SECONDS = float(os.environ.get('UNREAD_RECONCILE_SECONDS', 300))
+
+NOTIFICATION_COALESCE_SECONDS = float(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 5))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 500))
+NOTIFICATION_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_QUEUE_SIZE', 10000))
+# Read notifications are deleted by a TTL index this long after being read.
+NOTIFICATION_RETENTION_SECONDS = int(os.environ.get('NOTIFICATION_RETENTION_SECONDS', 30 * 86400))
+
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
@@ -81,6 +146,15 @@ GMAIL_EMAIL_PASSWORD = os.environ.get('GMAIL_EMAIL_PASSWORD')
 if GMAIL_EMAIL_PASSWORD is None:
     raise ValueError('No GMAIL_EMAIL_PASSWORD set for FastAPI application')
 
+MAIL_SMTP_HOST = os.environ.get('MAIL_SMTP_HOST', 'smtp.gmail.com')
+MAIL_SMTP_PORT = int(os.environ.get('MAIL_SMTP_PORT', 465))
+MAIL_SMTP_SSL = os.environ.get('MAIL_SMTP_SSL', 'true').lower() == 'true'
+MAIL_SENDER = os.environ.get('MAIL_SENDER', EMAIL_ADDRESS)
+MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE', 2))
+MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+MAIL_POLL_SECONDS = float(os.environ.get('MAIL_POLL_SECONDS', 5))
+MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 8))
+
 OAUTH2 = "oauth2"
 GOOGLE_REDIRECT_URI = f"http://{SERVER_HOST}:{int(APP_PORT)}/api/{OAUTH2}/google/callback"
 
@@ -1,37 +1,167 @@
-from typing import Optional, Dict
+import base64
+from typing import Any, Iterable, Optional, Dict, Tuple, Type
+from bson import ObjectId, json_util
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from pydantic import BaseModel
+from pymongo import IndexModel
 from app.db.connector import MongoConnectionManager
+from app.db.loader import DataLoader
+from app.utils.request_scope import current_request_scope
 from typing import List
 
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor")
+    if not isinstance(values, list) or not values or not isinstance(values[-1], ObjectId):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return values
+
+class ObjectIdAsString(TypeDecoder):
+    bson_type = ObjectId
+
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+# Codec of every read made through BaseRepository. `_id`s are turned into the
+# strings the API hands out while the reply is decoded, instead of in a second
+# pass over the documents; references between documents are already stored as
+# strings, so `_id` is the only ObjectId this affects.
+READ_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([ObjectIdAsString()]))
+
+def model_projection(model: Type[BaseModel], fields: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Projection of the stored fields `model` declares, or only of `fields` among
+    them, so that other fields are neither sent nor decoded. `_id` is always returned.
+    """
+    names = model.model_fields.keys() if fields is None else fields
+    return {model.model_fields[name].alias or name: 1 for name in names}
+
 class BaseRepository:
+    # Indexes backing the queries this repository issues, created by `ensure_indexes`.
+    INDEXES: List[IndexModel] = []
+
     def __init__(self, db_name: str, collection_name: str):
         self.db_name = db_name
         self.collection_name = collection_name
         self.connection_manager = MongoConnectionManager()
 
-    async def find_one(self, query: Dict) -> Optional[Dict]:
+    async def ensure_indexes(self) -> List[str]:
+        """Creates the declared indexes. Indexes that already exist with the same spec are left alone."""
+        if not self.INDEXES:
+            return []
         async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
-            document = await collection.find_one(query)
-            if document:
-                document["_id"] = str(document["_id"])
-            return document
+            return await collection.create_indexes(self.INDEXES)
 
-    async def find(self, query: Dict) -> List[Dict]:
-        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
-            cursor = collection.find(query)
-            documents = await cursor.to_list(length=None)
-            for doc in documents:
-                doc["_id"] = str(doc["_id"])
-            return documents
+    def _reader(self):
+        """The collection with `READ_CODEC_OPTIONS`, for reads returning documents with string `_id`s."""
+        return self.connection_manager.get_collection(self.db_name, self.collection_name, READ_CODEC_OPTIONS)
 
-    async def find_many(self, query: Dict, sort: Optional[List[tuple]] = None) -> List[Dict]:
-        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
-            cursor = collection.find(query)
+    async def find_one(self, query: Dict, projection: Optional[Dict] = None) -> Optional[Dict]:
+        async with self._reader() as collection:
+            return await collection.find_one(query, projection)
+
+    async def find(self, query: Dict, projection: Optional[Dict] = None) -> List[Dict]:
+        async with self._reader() as collection:
+            return await collection.find(query, projection).to_list(length=None)
+
+    async def find_many(
+        self,
+        query: Dict,
+        sort: Optional[List[tuple]] = None,
+        limit: Optional[int] = None,
+        projection: Optional[Dict] = None
+    ) -> List[Dict]:
+        async with self._reader() as collection:
+            cursor = collection.find(query, projection)
             if sort:
                 cursor.sort(sort)
-            documents = await cursor.to_list(length=None)
-            for doc in documents:
-                doc["_id"] = str(doc["_id"])
-            return documents
+            if limit:
+                cursor.limit(limit)
+            return await cursor.to_list(length=limit)
+
+    async def find_page(
+        self,
+        query: Dict,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort_field: str = "created_at",
+        direction: int = -1,
+        projection: Optional[Dict] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns at most `limit` documents ordered by (`sort_field`, `_id`) and an opaque
+        cursor for the next page, or None on the last page. Pages are resolved with a
+        range condition on the sort key, so the cost of a page does not grow with its depth.
+        """
+        if cursor:
+            query = {"$and": [query, self._keyset_filter(decode_cursor(cursor), sort_field, direction)]}
+        if projection and any(projection.values()) and sort_field not in projection:
+            # The next cursor is built from the sort key of the last document.
+            projection = {**projection, sort_field: 1}
+        if sort_field == "_id":
+            sort = [("_id", direction)]
+        else:
+            sort = [(sort_field, direction), ("_id", direction)]
+
+        async with self._reader() as collection:
+            documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            last_id = ObjectId(last["_id"])
+            keys = [last_id] if sort_field == "_id" else [last.get(sort_field), last_id]
+            next_cursor = encode_cursor(keys)
+        return documents, next_cursor
+
+    @staticmethod
+    def _keyset_filter(values: List[Any], sort_field: str, direction: int) -> Dict:
+        operator = "$lt" if direction < 0 else "$gt"
+        last_id = values[-1]
+        if sort_field == "_id":
+            return {"_id": {operator: last_id}}
+        if len(values) != 2:
+            raise InvalidCursorError("Invalid pagination cursor")
+        return {
+            "$or": [
+                {sort_field: {operator: values[0]}},
+                {sort_field: values[0], "_id": {operator: last_id}}
+            ]
+        }
+
+    def loader(self, projection: Optional[Dict] = None) -> DataLoader:
+        """
+        Returns the DataLoader of documents by `_id` for the current request, so that
+        lookups made anywhere while handling it share one batched `$in` query and
+        one cache. Outside a request every call gets a fresh loader.
+        """
+        async def batch_load(ids: List[str]) -> Dict[str, Dict]:
+            object_ids = [ObjectId(_id) for _id in ids if ObjectId.is_valid(_id)]
+            if not object_ids:
+                return {}
+            documents = await self.find_many({"_id": {"$in": object_ids}}, projection=projection)
+            return {document["_id"]: document for document in documents}
+
+        scope = current_request_scope()
+        if scope is None:
+            return DataLoader(batch_load)
+        key = ("loader", self.db_name, self.collection_name, tuple(sorted((projection or {}).items())))
+        if key not in scope:
+            scope[key] = DataLoader(batch_load)
+        return scope[key]
+
+    async def count(self, query: Dict) -> int:
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            return await collection.count_documents(query)
 
     # async def find(
     #     self,
@@ -51,12 +181,39 @@ class BaseRepository:
             result = await collection.insert_one(document)
             return str(result.inserted_id)
 
-    async def update_one(self, query: Dict, update: Dict) -> bool:
+    async def insert_many(self, documents: List[Dict]) -> List[str]:
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            result = await collection.insert_many(documents)
+            return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    async def bulk_write(self, operations: List, ordered: bool = False) -> int:
+        if not operations:
+            return 0
         async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
-            result = await collection.update_one(query, update)
-            return result.modified_count > 0
+            result = await collection.bulk_write(operations, ordered=ordered)
+            return result.inserted_count + result.modified_count + result.upserted_count
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> bool:
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            result = await collection.update_one(query, update, upsert=upsert)
+            return result.modified_count > 0 or result.upserted_id is not None
+
+    async def find_one_and_update(self, query: Dict, update: Dict, projection: Optional[Dict] = None) -> Optional[Dict]:
+        """Applies `update` to the first match and returns it as it was before the update, or None."""
+        async with self._reader() as collection:
+            return await collection.find_one_and_update(query, update, projection=projection)
+
+    async def update_many(self, query: Dict, update: Dict) -> int:
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            result = await collection.update_many(query, update)
+            return result.modified_count
 
     async def delete_one(self, query: Dict) -> bool:
         async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
             result = await collection.delete_one(query)
-            return result.deleted_count > 0
\ No newline at end of file
+            return result.deleted_count > 0
+
+    async def delete_many(self, query: Dict) -> int:
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            result = await collection.delete_many(query)
+            return result.deleted_count
\ No newline at end of file
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+from app.db.base_repo import BaseRepository, InvalidCursorError, decode_cursor, encode_cursor
+
+class CommentRepository(BaseRepository):
+    """
+    Stores the comments of a post in fixed-size bucket documents
+    ({post_id, index, count, comments: [...]}) so that neither the post nor any
+    single document grows with the number of comments. Buckets are numbered
+    from 0 and (post_id, index) is unique, so concurrent comments cannot open
+    two buckets at once: the loser of the race gets a duplicate key error and
+    moves on to the next index.
+    """
+    BUCKET_SIZE = 50
+    PREVIEW_SIZE = 3
+
+    INDEXES = [
+        # Lookups of all buckets of a post, which app.scripts.migrate_comments makes.
+        IndexModel([("post_id", ASCENDING), ("_id", ASCENDING)]),
+        # Buckets written before they were numbered have no index and stay out of it
+        # until app.scripts.migrate_comments numbers them.
+        IndexModel(
+            [("post_id", ASCENDING), ("index", DESCENDING)],
+            unique=True,
+            partialFilterExpression={"index": {"$exists": True}}
+        ),
+    ]
+
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "comments")
+
+    async def add_comment(self, post_id: str, comment: Dict) -> bool:
+        """Appends `comment` to the last bucket of the post, opening the next one when it is full."""
+        last = await self.find_many(
+            {"post_id": post_id, "index": {"$exists": True}},
+            sort=[("index", DESCENDING)],
+            limit=1,
+            projection={"index": 1}
+        )
+        index = last[0]["index"] if last else 0
+        while True:
+            try:
+                return await self.update_one(
+                    {"post_id": post_id, "index": index, "count": {"$lt": self.BUCKET_SIZE}},
+                    {
+                        "$push": {"comments": comment},
+                        "$inc": {"count": 1},
+                        "$setOnInsert": {"created_at": datetime.utcnow()}
+                    },
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # Bucket `index` exists and is full.
+                index += 1
+
+    async def get_comments_page(
+        self,
+        post_id: str,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns up to `limit` comments in chronological order. The cursor points at
+        the bucket (by index and _id) and position of the first comment of the next page.
+        """
+        start_bucket, start_index = 0, 0
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 3 or not all(isinstance(value, int) for value in values[:2]):
+                raise InvalidCursorError("Invalid pagination cursor")
+            start_index, start_bucket, _ = values
+        query = {"post_id": post_id, "index": {"$gte": start_bucket}}
+
+        positions = []
+        batch_size = limit // self.BUCKET_SIZE + 2
+        while len(positions) <= limit:
+            buckets = await self.find_many(query, sort=[("index", ASCENDING)], limit=batch_size)
+            for bucket in buckets:
+                offset = start_index if bucket["index"] == start_bucket else 0
+                for index in range(offset, len(bucket["comments"])):
+                    positions.append((bucket, index, bucket["comments"][index]))
+            if len(buckets) < batch_size:
+                break
+            query["index"] = {"$gt": buckets[-1]["index"]}
+
+        next_cursor = None
+        if len(positions) > limit:
+            bucket, index, _ = positions[limit]
+            next_cursor = encode_cursor([index, bucket["index"], ObjectId(bucket["_id"])])
+        return [comment for _, _, comment in positions[:limit]], next_cursor
@@ -1,7 +1,12 @@
 from typing import Optional, Dict
 import motor.motor_asyncio
+import pymongo
+from bson.codec_options import CodecOptions
+from pymongo.errors import ExecutionTimeout
+from redis import asyncio as aioredis
 from contextlib import asynccontextmanager
-from app.credentials.config import MONGO_CONNECTION_STRING
+from app.credentials.config import MONGO_CONNECTION_STRING, MONGO_WAIT_QUEUE_TIMEOUT_MS, REDIS_HOST, REDIS_PORT
+from app.utils.request_scope import remaining_time
 
 class MongoConnectionManager:
     _instance: Optional['MongoConnectionManager'] = None
@@ -11,7 +16,9 @@ class MongoConnectionManager:
         "maxPoolSize": 1000,
         "minPoolSize": 50,
         "maxIdleTimeMS": 45000,
-        "waitQueueTimeoutMS": 10000,
+        # Requests beyond the adaptive concurrency limit are shed before they get here,
+        # so a long wait for a connection only means the pool is exhausted: fail fast.
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
         "serverSelectionTimeoutMS": 10000,
         "retryWrites": True,
     }
@@ -38,10 +45,64 @@ class MongoConnectionManager:
         self._clients.clear()
 
     @asynccontextmanager
-    async def get_collection(self, db_name: str, collection_name: str):
+    async def get_collection(self, db_name: str, collection_name: str, codec_options: Optional[CodecOptions] = None):
+        """
+        Yields the collection. Within a request, the operations run on it are
+        bounded by the time left before the request's deadline: the driver sends
+        it as maxTimeMS, so the server abandons the query, and applies it to pool
+        waits and socket reads.
+        """
         client = await self.get_client()
-        try:
-            collection = client[db_name][collection_name]
+        collection = client[db_name][collection_name]
+        if codec_options is not None:
+            collection = collection.with_options(codec_options=codec_options)
+        remaining = remaining_time()
+        if remaining is None:
             yield collection
-        finally:
-            pass
\ No newline at end of file
+            return
+        if remaining <= 0:
+            raise ExecutionTimeout("Request deadline exceeded", 50)
+        with pymongo.timeout(remaining):
+            yield collection
+
+class RedisConnectionManager:
+    _instance: Optional['RedisConnectionManager'] = None
+    _clients: Dict[str, aioredis.Redis] = {}
+
+    REDIS_CONFIG = {
+        "max_connections": 500,
+        "socket_timeout": 5,
+        "socket_connect_timeout": 5,
+        "health_check_interval": 30,
+        "decode_responses": True,
+    }
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        self.url = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+
+    async def get_client(self) -> aioredis.Redis:
+        if 'default' not in self._clients:
+            self._clients['default'] = aioredis.from_url(
+                self.url,
+                **self.REDIS_CONFIG
+            )
+        return self._clients['default']
+
+    async def get_binary_client(self) -> aioredis.Redis:
+        """Client returning raw bytes, for values that are not UTF-8 text."""
+        if 'binary' not in self._clients:
+            self._clients['binary'] = aioredis.from_url(
+                self.url,
+                **{**self.REDIS_CONFIG, "decode_responses": False}
+            )
+        return self._clients['binary']
+
+    async def close_all(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
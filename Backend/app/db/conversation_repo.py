@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from app.db.base_repo import BaseRepository
+
+class ConversationRepository(BaseRepository):
+    """
+    One document per pair of users holding the latest message and each
+    participant's unread count, so an inbox page is read from a handful of
+    documents instead of the message history.
+    """
+    INDEXES = [
+        IndexModel([("conversation_id", ASCENDING)], unique=True),
+        IndexModel([("participants", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ]
+
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "conversations")
+
+    async def record_message(self, message: Dict) -> bool:
+        return await self.update_one(
+            {"conversation_id": message["conversation_id"]},
+            {
+                "$set": {"last_message": message, "updated_at": message["created_at"]},
+                "$inc": {f"unread.{message['recipient_id']}": 1},
+                "$setOnInsert": {
+                    "participants": sorted((message["sender_id"], message["recipient_id"])),
+                    "created_at": message["created_at"]
+                }
+            },
+            upsert=True
+        )
+
+    async def mark_read(self, conversation_id: str, user_id: str) -> bool:
+        return await self.update_one(
+            {"conversation_id": conversation_id},
+            {"$set": {f"unread.{user_id}": 0}}
+        )
+
+    async def get_inbox_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns the user's conversations, most recently active first, shaped as
+        `Conversation`. With `fields`, only the stored fields backing them are read.
+        """
+        projection = None
+        if fields is not None:
+            stored = {"id": "conversation_id", "unread_count": f"unread.{user_id}"}
+            projection = {stored.get(field, field): 1 for field in fields}
+            if "updated_at" in fields:
+                projection["created_at"] = 1
+        conversations, next_cursor = await self.find_page(
+            {"participants": user_id}, limit, cursor, sort_field="updated_at", projection=projection
+        )
+        return [
+            {
+                "id": conversation.get("conversation_id"),
+                "participants": conversation.get("participants"),
+                "last_message": conversation.get("last_message"),
+                "unread_count": conversation.get("unread", {}).get(user_id, 0),
+                "created_at": conversation.get("created_at"),
+                "updated_at": conversation.get("updated_at", conversation.get("created_at"))
+            }
+            for conversation in conversations
+        ], next_cursor
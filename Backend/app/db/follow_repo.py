@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.db.base_repo import BaseRepository
+from app.db.user_repo import UserRepository
+
+class FollowRepository(BaseRepository):
+    """
+    Follow graph stored as one {follower_id, followee_id, created_at} edge per
+    relationship. Edges are indexed from both ends, and the follower and
+    following counters live on the user documents, so user documents keep a
+    fixed size however many people they follow. Counters only move when an
+    edge was actually created or removed, but the edge and counter writes are
+    separate: a failure between them is repaired by `reconcile_counters`
+    (app.scripts.reconcile_follow_counts).
+    """
+    INDEXES = [
+        IndexModel([("follower_id", ASCENDING), ("followee_id", ASCENDING)], unique=True),
+        IndexModel([("follower_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("followee_id", ASCENDING), ("_id", DESCENDING)]),
+    ]
+
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "follows")
+        self.user_repo = UserRepository(db_name)
+
+    async def follow(self, follower_id: str, followee_id: str) -> bool:
+        """Creates the edge and bumps both counters. Returns False if it already existed."""
+        try:
+            await self.insert_one({
+                "follower_id": follower_id,
+                "followee_id": followee_id,
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            return False
+        await self._increment_counters(follower_id, followee_id, 1)
+        return True
+
+    async def unfollow(self, follower_id: str, followee_id: str) -> bool:
+        """Removes the edge and decrements both counters. Returns False if there was none."""
+        deleted = await self.delete_one({"follower_id": follower_id, "followee_id": followee_id})
+        if deleted:
+            await self._increment_counters(follower_id, followee_id, -1)
+        return deleted
+
+    async def _increment_counters(self, follower_id: str, followee_id: str, amount: int) -> None:
+        await self.user_repo.update_one({"_id": ObjectId(follower_id)}, {"$inc": {"following_count": amount}})
+        await self.user_repo.update_one({"_id": ObjectId(followee_id)}, {"$inc": {"follower_count": amount}})
+
+    async def is_following(self, follower_id: str, followee_id: str) -> bool:
+        edge = await self.find_many(
+            {"follower_id": follower_id, "followee_id": followee_id},
+            limit=1,
+            projection={"_id": 1}
+        )
+        return bool(edge)
+
+    async def filter_following(self, follower_id: str, followee_ids: List[str]) -> List[str]:
+        """Returns the subset of `followee_ids` that `follower_id` follows."""
+        if not followee_ids:
+            return []
+        edges = await self.find_many(
+            {"follower_id": follower_id, "followee_id": {"$in": followee_ids}},
+            projection={"followee_id": 1}
+        )
+        return [edge["followee_id"] for edge in edges]
+
+    async def get_following_ids(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        edges = await self.find_many(
+            {"follower_id": user_id},
+            sort=[("_id", -1)],
+            limit=limit,
+            projection={"followee_id": 1}
+        )
+        return [edge["followee_id"] for edge in edges]
+
+    async def get_follower_ids(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        edges = await self.find_many(
+            {"followee_id": user_id},
+            sort=[("_id", -1)],
+            limit=limit,
+            projection={"follower_id": 1}
+        )
+        return [edge["follower_id"] for edge in edges]
+
+    async def get_following_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        edges, next_cursor = await self.find_page(
+            {"follower_id": user_id}, limit, cursor, sort_field="_id", projection={"followee_id": 1}
+        )
+        return [edge["followee_id"] for edge in edges], next_cursor
+
+    async def get_followers_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        edges, next_cursor = await self.find_page(
+            {"followee_id": user_id}, limit, cursor, sort_field="_id", projection={"follower_id": 1}
+        )
+        return [edge["follower_id"] for edge in edges], next_cursor
+
+    async def count_followers(self, user_id: str) -> int:
+        user = await self.user_repo.find_many(
+            {"_id": ObjectId(user_id)}, limit=1, projection={"follower_count": 1}
+        )
+        return user[0].get("follower_count", 0) if user else 0
+
+    async def reconcile_counters(self, users: List[Dict]) -> int:
+        """
+        Recounts the edges of `users` (documents with `_id` and both counters) and
+        rewrites the counters that differ. Returns how many users were fixed.
+        """
+        operations = []
+        for user in users:
+            counts = {
+                "follower_count": await self.count({"followee_id": user["_id"]}),
+                "following_count": await self.count({"follower_id": user["_id"]})
+            }
+            if any(user.get(field, 0) != count for field, count in counts.items()):
+                operations.append(UpdateOne({"_id": ObjectId(user["_id"])}, {"$set": counts}))
+        await self.user_repo.bulk_write(operations)
+        return len(operations)
+
+    async def remove_user(self, user_id: str) -> int:
+        """Drops every edge touching a deleted user and fixes the counters on the other end."""
+        removed = 0
+        for followee_id in await self.get_following_ids(user_id):
+            removed += await self.unfollow(user_id, followee_id)
+        for follower_id in await self.get_follower_ids(user_id):
+            removed += await self.unfollow(follower_id, user_id)
+        return removed
@@ -0,0 +1,43 @@
+import logging
+from typing import List, Type
+from pymongo.errors import PyMongoError
+from app.db.base_repo import BaseRepository
+from app.db.comment_repo import CommentRepository
+from app.db.conversation_repo import ConversationRepository
+from app.db.follow_repo import FollowRepository
+from app.db.mail_repo import MailOutboxRepository
+from app.db.message_repo import MessageRepository
+from app.db.notif_repo import NotificationRepository
+from app.db.post_repo import PostRepository
+from app.db.search_index_repo import PostSearchIndex
+from app.db.user_repo import UserRepository
+
+logger = logging.getLogger(__name__)
+
+# Every repository whose INDEXES are applied at startup. The search indexes share
+# their collections, so one of them is enough.
+INDEXED_REPOSITORIES: List[Type[BaseRepository]] = [
+    UserRepository,
+    PostRepository,
+    CommentRepository,
+    FollowRepository,
+    MessageRepository,
+    ConversationRepository,
+    NotificationRepository,
+    MailOutboxRepository,
+    PostSearchIndex,
+]
+
+async def ensure_indexes(db_name: str) -> None:
+    """
+    Creates the declared indexes of every registered repository. A repository whose
+    indexes cannot be built (e.g. a unique index over duplicate data) is logged and
+    skipped so that the others are still applied.
+    """
+    for repository_class in INDEXED_REPOSITORIES:
+        try:
+            created = await repository_class(db_name).ensure_indexes()
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes for {repository_class.__name__}: {e}")
+            continue
+        logger.info(f"{repository_class.__name__}: ensured indexes {', '.join(created)}")
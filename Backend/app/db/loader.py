@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+class DataLoader:
+    """
+    Batches and caches lookups by key.
+
+    Every `load` issued before the event loop gets back to the loader is
+    coalesced into one call of `batch_load`, which receives the distinct keys
+    and returns a {key: value} mapping; missing keys resolve to None. Results
+    stay cached for the lifetime of the loader, which is one request when it is
+    obtained through `BaseRepository.loader`.
+    """
+    def __init__(self, batch_load: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        self._batch_load = batch_load
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        future = self._cache.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        try:
+            results = await self._batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                # Failed keys are not cached, so a later load retries them.
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(results.get(key))
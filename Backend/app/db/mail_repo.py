@@ -0,0 +1,77 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from app.db.base_repo import BaseRepository
+
+class MailOutboxRepository(BaseRepository):
+    """
+    Persistent queue of outgoing mail. A mail stays `pending` until it is sent or
+    gives up; a sender leases a batch by pushing its `next_attempt_at` past the
+    lease, so a mail claimed by a worker that dies is picked up again once the
+    lease runs out. Sent mail is kept for a week, then removed by a TTL index.
+    """
+    INDEXES = [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("sent_at", ASCENDING)], expireAfterSeconds=7 * 86400),
+    ]
+
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "mail_outbox")
+
+    async def enqueue(self, recipient: str, subject: str, template: str, context: Optional[Dict] = None) -> str:
+        now = datetime.utcnow()
+        return await self.insert_one({
+            "recipient": recipient,
+            "subject": subject,
+            "template": template,
+            "context": context or {},
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+
+    async def claim_batch(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """Leases up to `limit` due mails to the caller, oldest first, in three round trips."""
+        now = datetime.utcnow()
+        due = {"status": "pending", "next_attempt_at": {"$lte": now}}
+        candidates = await self.find_many(due, sort=[("next_attempt_at", ASCENDING)], limit=limit, projection={"_id": 1})
+        if not candidates:
+            return []
+        lease = uuid.uuid4().hex
+        # Re-checking `due` makes the claim atomic per mail when workers race for it.
+        await self.update_many(
+            {**due, "_id": {"$in": [ObjectId(mail["_id"]) for mail in candidates]}},
+            {"$set": {"lease": lease, "next_attempt_at": now + timedelta(seconds=lease_seconds)}}
+        )
+        return await self.find_many({"lease": lease, "status": "pending"})
+
+    async def mark_sent(self, mail_ids: List[str]) -> int:
+        if not mail_ids:
+            return 0
+        return await self.update_many(
+            {"_id": {"$in": [ObjectId(mail_id) for mail_id in mail_ids]}},
+            {"$set": {"status": "sent", "sent_at": datetime.utcnow()}, "$unset": {"lease": ""}}
+        )
+
+    async def retry_later(self, mail_id: str, delay_seconds: float, error: str) -> bool:
+        return await self.update_one(
+            {"_id": ObjectId(mail_id)},
+            {
+                "$set": {"next_attempt_at": datetime.utcnow() + timedelta(seconds=delay_seconds), "last_error": error},
+                "$inc": {"attempts": 1},
+                "$unset": {"lease": ""}
+            }
+        )
+
+    async def mark_failed(self, mail_id: str, error: str) -> bool:
+        return await self.update_one(
+            {"_id": ObjectId(mail_id)},
+            {
+                "$set": {"status": "failed", "last_error": error, "failed_at": datetime.utcnow()},
+                "$inc": {"attempts": 1},
+                "$unset": {"lease": ""}
+            }
+        )
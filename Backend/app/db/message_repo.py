@@ -1,5 +1,14 @@
+from pymongo import ASCENDING, IndexModel
 from app.db.base_repo import BaseRepository
 
+def conversation_id(user_id: str, other_id: str) -> str:
+    """Canonical id of the conversation between two users, the same from both sides."""
+    return ":".join(sorted((user_id, other_id)))
+
 class MessageRepository(BaseRepository):
+    INDEXES = [
+        IndexModel([("conversation_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+    ]
+
     def __init__(self, db_name: str):
-        super().__init__(db_name, "messages")
\ No newline at end of file
+        super().__init__(db_name, "messages")
@@ -1,5 +1,60 @@
-from app.db.base_repo import BaseRepository
+from datetime import datetime
+from typing import List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.credentials.config import NOTIFICATION_RETENTION_SECONDS
+from app.db.base_repo import BaseRepository, InvalidCursorError, decode_cursor
+
+READ_TTL_INDEX = "read_at_ttl"
+# Raised by createIndexes when an index exists under the same name with other options.
+INDEX_OPTIONS_CONFLICT = 85
 
 class NotificationRepository(BaseRepository):
+    INDEXES = [
+        IndexModel([("recipient_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("recipient_id", ASCENDING), ("read", ASCENDING)]),
+        # Unread notifications have no `read_at` and are never expired.
+        IndexModel(
+            [("read_at", ASCENDING)],
+            name=READ_TTL_INDEX,
+            expireAfterSeconds=NOTIFICATION_RETENTION_SECONDS,
+            partialFilterExpression={"read": True}
+        ),
+    ]
+
     def __init__(self, db_name: str):
-        super().__init__(db_name, "notifications")
\ No newline at end of file
+        super().__init__(db_name, "notifications")
+
+    async def ensure_indexes(self) -> List[str]:
+        try:
+            return await super().ensure_indexes()
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+        # The retention period changed: update the TTL of the existing index in place.
+        async with self.connection_manager.get_collection(self.db_name, self.collection_name) as collection:
+            await collection.database.command(
+                "collMod",
+                self.collection_name,
+                index={"name": READ_TTL_INDEX, "expireAfterSeconds": NOTIFICATION_RETENTION_SECONDS}
+            )
+        return await super().ensure_indexes()
+
+    async def mark_read(self, recipient_id: str, before: Optional[str] = None) -> int:
+        """
+        Marks the recipient's unread notifications as read with a single update and
+        returns how many were modified. With `before`, a cursor returned by
+        `find_page`, only the notifications listed up to that cursor, i.e. the
+        cursor's own notification and every older one, are marked.
+        """
+        query = {"recipient_id": recipient_id, "read": False}
+        if before:
+            values = decode_cursor(before)
+            if len(values) != 2:
+                raise InvalidCursorError("Invalid pagination cursor")
+            created_at, last_id = values
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lte": last_id}}
+            ]
+        return await self.update_many(query, {"$set": {"read": True, "read_at": datetime.utcnow()}})
@@ -1,5 +1,39 @@
-from app.db.base_repo import BaseRepository
+from typing import Dict, Iterable, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from app.credentials.config import CACHE_EARLY_EXPIRATION_BETA, CACHE_TTL_SECONDS
+from app.db.base_repo import BaseRepository, model_projection
+from app.routers.models import Post
+from app.utils.cache import CacheManager
+
+# Fields rendered by post lists; search fields such as `hashtags` stay on the server.
+POST_PROJECTION = model_projection(Post)
+
+def post_projection(fields: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Projection of the `Post` fields a list renders, plus what building it needs: the author and the sort key."""
+    if fields is None:
+        return POST_PROJECTION
+    return {**model_projection(Post, fields), "author_id": 1, "created_at": 1}
 
 class PostRepository(BaseRepository):
+    INDEXES = [
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("author_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ]
+
     def __init__(self, db_name: str):
-        super().__init__(db_name, "posts")
\ No newline at end of file
+        super().__init__(db_name, "posts")
+        self.cache = CacheManager(db_name, CACHE_TTL_SECONDS, beta=CACHE_EARLY_EXPIRATION_BETA)
+
+    async def load_post(self, post_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
+        return await self.loader(projection).load(post_id)
+
+    async def load_posts(self, post_ids: List[str], projection: Optional[Dict] = None) -> List[Dict]:
+        posts = await self.loader(projection).load_many(post_ids)
+        return [post for post in posts if post is not None]
+
+    async def get_post(self, post_id: str) -> Optional[Dict]:
+        """Post by id from the shared cache, loaded through the request loader on a miss."""
+        return await self.cache.get_or_load("post", post_id, lambda: self.load_post(post_id))
+
+    async def invalidate_post(self, post_id: str) -> None:
+        await self.cache.delete("post", post_id)
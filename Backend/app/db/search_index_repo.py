@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from app.db.base_repo import BaseRepository, InvalidCursorError, decode_cursor, encode_cursor
+from app.utils.tokenizer import tokenize
+
+class SearchIndexRepository(BaseRepository):
+    """
+    Inverted index over one collection, ranked with BM25.
+
+    Postings ({index, term, doc_id, tf, length}) live in `search_postings`,
+    per-term document frequencies in `search_terms` and per-index document
+    count and total length in `search_stats`. `fields` maps each indexed
+    field to the weight its term frequencies are multiplied by.
+    """
+    K1 = 1.2
+    B = 0.75
+    MAX_POSTINGS_PER_TERM = 20000
+
+    INDEXES = [
+        IndexModel([("index", ASCENDING), ("term", ASCENDING), ("tf", DESCENDING)]),
+        IndexModel([("index", ASCENDING), ("doc_id", ASCENDING)]),
+    ]
+    TERM_INDEXES = [IndexModel([("index", ASCENDING), ("term", ASCENDING)], unique=True)]
+    STATS_INDEXES = [IndexModel([("index", ASCENDING)], unique=True)]
+
+    def __init__(self, db_name: str, index_name: str, fields: Dict[str, int]):
+        super().__init__(db_name, "search_postings")
+        self.index_name = index_name
+        self.fields = fields
+        self.terms_repo = BaseRepository(db_name, "search_terms")
+        self.stats_repo = BaseRepository(db_name, "search_stats")
+
+    async def ensure_indexes(self) -> List[str]:
+        created = await super().ensure_indexes()
+        async with self.connection_manager.get_collection(self.db_name, "search_terms") as collection:
+            created += await collection.create_indexes(self.TERM_INDEXES)
+        async with self.connection_manager.get_collection(self.db_name, "search_stats") as collection:
+            created += await collection.create_indexes(self.STATS_INDEXES)
+        return created
+
+    def _term_counts(self, document: Dict) -> Counter:
+        counts = Counter()
+        for field, weight in self.fields.items():
+            for term in tokenize(document.get(field) or ""):
+                counts[term] += weight
+        return counts
+
+    async def index_document(self, doc_id: str, document: Dict) -> None:
+        await self.remove_document(doc_id)
+        await self.index_documents([(doc_id, document)])
+
+    async def index_documents(self, documents: List[Tuple[str, Dict]]) -> int:
+        """Adds documents that are not in the index yet, in one write per collection."""
+        postings = []
+        document_frequencies = Counter()
+        total_length = 0
+        indexed = 0
+        for doc_id, document in documents:
+            counts = self._term_counts(document)
+            if not counts:
+                continue
+            length = sum(counts.values())
+            postings.extend(
+                {"index": self.index_name, "term": term, "doc_id": doc_id, "tf": tf, "length": length}
+                for term, tf in counts.items()
+            )
+            document_frequencies.update(counts.keys())
+            total_length += length
+            indexed += 1
+
+        if not postings:
+            return 0
+        await self.insert_many(postings)
+        await self._update_stats(document_frequencies, indexed, total_length)
+        return indexed
+
+    async def remove_document(self, doc_id: str) -> bool:
+        postings = await self.find_many(
+            {"index": self.index_name, "doc_id": doc_id},
+            projection={"term": 1, "length": 1}
+        )
+        if not postings:
+            return False
+        await self.delete_many({"index": self.index_name, "doc_id": doc_id})
+        await self._update_stats(
+            Counter({posting["term"]: -1 for posting in postings}),
+            -1,
+            -postings[0]["length"]
+        )
+        return True
+
+    async def clear(self) -> None:
+        await self.delete_many({"index": self.index_name})
+        await self.terms_repo.delete_many({"index": self.index_name})
+        await self.stats_repo.delete_many({"index": self.index_name})
+
+    async def _update_stats(self, document_frequencies: Counter, doc_count: int, total_length: int) -> None:
+        await self.terms_repo.bulk_write([
+            UpdateOne(
+                {"index": self.index_name, "term": term},
+                {"$inc": {"df": delta}},
+                upsert=True
+            )
+            for term, delta in document_frequencies.items()
+        ])
+        await self.stats_repo.update_one(
+            {"index": self.index_name},
+            {"$inc": {"doc_count": doc_count, "total_length": total_length}},
+            upsert=True
+        )
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+        """
+        Returns up to `limit` (doc_id, score) pairs, best first, and a cursor for
+        the next page. Each term reads at most MAX_POSTINGS_PER_TERM postings,
+        highest term frequency first.
+        """
+        terms = list(dict.fromkeys(tokenize(query, expand_hashtags=False)))
+        if not terms:
+            return [], None
+
+        stats = await self.stats_repo.find_one({"index": self.index_name})
+        if not stats or stats.get("doc_count", 0) <= 0:
+            return [], None
+        doc_count = stats["doc_count"]
+        average_length = stats["total_length"] / doc_count
+
+        term_docs = await self.terms_repo.find_many({"index": self.index_name, "term": {"$in": terms}})
+        document_frequencies = {term["term"]: term["df"] for term in term_docs if term.get("df", 0) > 0}
+        terms = [term for term in terms if term in document_frequencies]
+        postings_per_term = await asyncio.gather(*[
+            self.find_many(
+                {"index": self.index_name, "term": term},
+                sort=[("tf", DESCENDING)],
+                limit=self.MAX_POSTINGS_PER_TERM,
+                projection={"doc_id": 1, "tf": 1, "length": 1}
+            )
+            for term in terms
+        ])
+
+        scores = defaultdict(float)
+        for term, postings in zip(terms, postings_per_term):
+            df = document_frequencies[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for posting in postings:
+                tf = posting["tf"]
+                norm = tf + self.K1 * (1 - self.B + self.B * posting["length"] / average_length)
+                scores[posting["doc_id"]] += idf * tf * (self.K1 + 1) / norm
+
+        ranked = scores.items()
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2 or not isinstance(values[0], float):
+                raise InvalidCursorError("Invalid pagination cursor")
+            last = (values[0], str(values[1]))
+            ranked = [(doc_id, score) for doc_id, score in ranked if (score, doc_id) < last]
+
+        top = heapq.nlargest(limit + 1, ranked, key=lambda item: (item[1], item[0]))
+        next_cursor = None
+        if len(top) > limit:
+            top = top[:limit]
+            next_cursor = encode_cursor([top[-1][1], ObjectId(top[-1][0])])
+        return top, next_cursor
+
+class PostSearchIndex(SearchIndexRepository):
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "posts", {"title": 2, "content": 1})
+
+class UserSearchIndex(SearchIndexRepository):
+    def __init__(self, db_name: str):
+        super().__init__(db_name, "users", {"full_name": 2, "email": 1})
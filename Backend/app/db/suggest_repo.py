@@ -0,0 +1,81 @@
+import json
+from typing import Dict, List, Optional
+from app.db.connector import RedisConnectionManager
+from app.utils.tokenizer import normalize
+
+class UserSuggestRepository:
+    """
+    Prefix index over normalized `full_name` tokens for search-as-you-type.
+
+    Every word of a name, and the whole name, is stored as a `token\\0user_id`
+    member of a single Redis sorted set with score 0, so a prefix lookup is one
+    ZRANGEBYLEX. The lightweight user payload is kept in a hash next to it.
+    """
+    SEPARATOR = "\0"
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.connection_manager = RedisConnectionManager()
+
+    def _index_key(self) -> str:
+        return f"{self.db_name}:suggest:users"
+
+    def _payload_key(self) -> str:
+        return f"{self.db_name}:suggest:users:payload"
+
+    def _members(self, user_id: str, full_name: str) -> List[str]:
+        name = " ".join(normalize(full_name or "").split())
+        tokens = set(name.split())
+        if name:
+            tokens.add(name)
+        return [f"{token}{self.SEPARATOR}{user_id}" for token in tokens]
+
+    async def add_user(self, user_id: str, full_name: str, profile_picture: Optional[str] = None) -> None:
+        await self.remove_user(user_id)
+        redis = await self.connection_manager.get_client()
+        members = self._members(user_id, full_name)
+        if not members:
+            return
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._index_key(), {member: 0 for member in members})
+            pipe.hset(self._payload_key(), user_id, json.dumps({
+                "id": user_id,
+                "full_name": full_name,
+                "profile_picture": profile_picture
+            }))
+            await pipe.execute()
+
+    async def remove_user(self, user_id: str) -> None:
+        redis = await self.connection_manager.get_client()
+        payload = await redis.hget(self._payload_key(), user_id)
+        if not payload:
+            return
+        members = self._members(user_id, json.loads(payload)["full_name"])
+        async with redis.pipeline(transaction=True) as pipe:
+            if members:
+                pipe.zrem(self._index_key(), *members)
+            pipe.hdel(self._payload_key(), user_id)
+            await pipe.execute()
+
+    async def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        prefix = " ".join(normalize(prefix).split())
+        if not prefix:
+            return []
+        redis = await self.connection_manager.get_client()
+        # A user can match through several tokens, so over-fetch before de-duplicating.
+        members = await redis.zrangebylex(
+            self._index_key(),
+            b"[" + prefix.encode(),
+            b"[" + prefix.encode() + b"\xff",
+            start=0,
+            num=limit * 3
+        )
+        user_ids = list(dict.fromkeys(member.rsplit(self.SEPARATOR, 1)[1] for member in members))[:limit]
+        if not user_ids:
+            return []
+        payloads = await redis.hmget(self._payload_key(), user_ids)
+        return [json.loads(payload) for payload in payloads if payload]
+
+    async def clear(self) -> None:
+        redis = await self.connection_manager.get_client()
+        await redis.delete(self._index_key(), self._payload_key())
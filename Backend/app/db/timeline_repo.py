@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from app.db.base_repo import InvalidCursorError, decode_cursor, encode_cursor
+from app.db.connector import RedisConnectionManager
+from app.db.follow_repo import FollowRepository
+from app.db.post_repo import POST_PROJECTION, PostRepository
+
+# Pushes a post into every timeline passed as KEYS that is already materialized,
+# then trims it to the newest ARGV[3] entries. Cold timelines are left alone and
+# get rebuilt from Mongo the next time they are read.
+FAN_OUT_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', key, ARGV[2], ARGV[1])
+        redis.call('ZREMRANGEBYRANK', key, 0, -tonumber(ARGV[3]) - 1)
+    end
+end
+return #KEYS
+"""
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Member kept, with a -inf score, in a timeline rebuilt with no posts, so that an
+# empty timeline still exists and is not rebuilt from Mongo on every read. It
+# sorts last, is the first one trimmed once real posts are fanned out, and is
+# never returned by `get_page`.
+EMPTY_MARKER = "-"
+
+class TimelineRepository:
+    TIMELINE_SIZE = 800
+    FAN_OUT_FOLLOWER_LIMIT = 10000
+    FAN_OUT_BATCH_SIZE = 1000
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.connection_manager = RedisConnectionManager()
+        self.post_repo = PostRepository(db_name)
+        self.follow_repo = FollowRepository(db_name)
+        self._fan_out_script = None
+
+    def _timeline_key(self, user_id: str) -> str:
+        return f"{self.db_name}:timeline:{user_id}"
+
+    def _pull_authors_key(self) -> str:
+        return f"{self.db_name}:timeline:pull-authors"
+
+    @staticmethod
+    def _score(created_at: datetime) -> int:
+        # Mongo stores datetimes with millisecond precision, so scores use the same
+        # resolution to line up with the (created_at, _id) pagination cursor.
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return (created_at - EPOCH) // timedelta(milliseconds=1)
+
+    async def fan_out(self, author_id: str, post_id: str, created_at: datetime) -> List[str]:
+        """Pushes the post into its author's followers' timelines and returns their ids."""
+        redis = await self.connection_manager.get_client()
+
+        if await self.follow_repo.count_followers(author_id) > self.FAN_OUT_FOLLOWER_LIMIT:
+            await redis.sadd(self._pull_authors_key(), author_id)
+            return []
+        await redis.srem(self._pull_authors_key(), author_id)
+
+        if self._fan_out_script is None:
+            self._fan_out_script = redis.register_script(FAN_OUT_SCRIPT)
+
+        follower_ids = await self.follow_repo.get_follower_ids(author_id)
+        score = self._score(created_at)
+        for start in range(0, len(follower_ids), self.FAN_OUT_BATCH_SIZE):
+            keys = [
+                self._timeline_key(follower_id)
+                for follower_id in follower_ids[start:start + self.FAN_OUT_BATCH_SIZE]
+            ]
+            await self._fan_out_script(keys=keys, args=[post_id, score, self.TIMELINE_SIZE])
+        return follower_ids
+
+    async def rebuild(self, user_id: str) -> int:
+        following = await self.follow_repo.get_following_ids(user_id)
+        posts = []
+        if following:
+            posts = await self.post_repo.find_many(
+                {"author_id": {"$in": following}},
+                sort=[("created_at", -1)],
+                limit=self.TIMELINE_SIZE,
+                projection={"_id": 1, "created_at": 1}
+            )
+
+        redis = await self.connection_manager.get_client()
+        key = self._timeline_key(user_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if posts:
+                pipe.zadd(key, {post["_id"]: self._score(post["created_at"]) for post in posts})
+            else:
+                pipe.zadd(key, {EMPTY_MARKER: float("-inf")})
+            await pipe.execute()
+        return len(posts)
+
+    async def invalidate(self, user_id: str) -> None:
+        redis = await self.connection_manager.get_client()
+        await redis.delete(self._timeline_key(user_id))
+
+    async def get_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        projection: Dict = POST_PROJECTION
+    ) -> Tuple[List[Dict], Optional[str]]:
+        redis = await self.connection_manager.get_client()
+        key = self._timeline_key(user_id)
+        if not await redis.exists(key):
+            await self.rebuild(user_id)
+
+        max_score, last_id = "+inf", None
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2 or not isinstance(values[0], datetime):
+                raise InvalidCursorError("Invalid pagination cursor")
+            max_score, last_id = self._score(values[0]), str(values[1])
+
+        # Entries of deleted posts hydrate to nothing: keep reading older entries
+        # until the page is full or the timeline runs out, so a page is only short
+        # on the last one, and drop the stale entries on the way.
+        posts = []
+        while len(posts) <= limit:
+            wanted = limit + 1 - len(posts)
+            entries = await self._read_entries(redis, key, max_score, last_id, wanted)
+            if not entries:
+                break
+            post_ids = [post_id for post_id, _ in entries]
+            hydrated = await self._hydrate(post_ids, projection)
+            posts.extend(hydrated)
+            if len(hydrated) < len(post_ids):
+                found = {post["_id"] for post in hydrated}
+                await redis.zrem(key, *(post_id for post_id in post_ids if post_id not in found))
+            if len(entries) < wanted:
+                break
+            last_id, max_score = entries[-1]
+
+        # Authors with too many followers are never fanned out; the set is small, so
+        # intersect it with the user's follow edges and read their posts directly.
+        pull_authors = await self.follow_repo.filter_following(
+            user_id, list(await redis.smembers(self._pull_authors_key()))
+        )
+        if pull_authors:
+            pulled, _ = await self.post_repo.find_page(
+                {"author_id": {"$in": pull_authors}}, limit + 1, cursor, projection=projection
+            )
+            seen = {post["_id"] for post in posts}
+            posts.extend({**post, "id": post["_id"]} for post in pulled if post["_id"] not in seen)
+            posts.sort(key=lambda post: (post["created_at"], post["_id"]), reverse=True)
+
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = encode_cursor([posts[-1]["created_at"], ObjectId(posts[-1]["_id"])])
+        return posts, next_cursor
+
+    @staticmethod
+    async def _read_entries(redis, key: str, max_score, last_id: Optional[str], count: int) -> List[Tuple[str, float]]:
+        """Up to `count` (post id, score) entries older than (`max_score`, `last_id`), newest first."""
+        if last_id is None:
+            entries = await redis.zrevrangebyscore(key, max_score, "-inf", start=0, num=count, withscores=True)
+            return [(post_id, score) for post_id, score in entries if post_id != EMPTY_MARKER]
+        # Entries sharing the cursor's score are ordered by descending id, like the
+        # Mongo sort, so fetch enough extra to skip the ones already returned.
+        ties = await redis.zcount(key, max_score, max_score)
+        entries = await redis.zrevrangebyscore(key, max_score, "-inf", start=0, num=count + ties, withscores=True)
+        return [
+            (post_id, score) for post_id, score in entries
+            if (score < max_score or post_id < last_id) and post_id != EMPTY_MARKER
+        ][:count]
+
+    async def _hydrate(self, post_ids: List[str], projection: Dict) -> List[Dict]:
+        if not post_ids:
+            return []
+        posts = await self.post_repo.load_posts(post_ids, projection)
+        return [{**post, "id": post["_id"]} for post in posts]
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from typing import Dict
+from app.db.connector import RedisConnectionManager
+from app.db.conversation_repo import ConversationRepository
+from app.db.notif_repo import NotificationRepository
+
+logger = logging.getLogger(__name__)
+
+# Applies (field, delta) pairs from ARGV to the counters hash, clamping at zero.
+# A missing hash is left alone: it is loaded from Mongo on its next read.
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1]) < 0 then
+        redis.call('HSET', KEYS[1], ARGV[i], 0)
+    end
+end
+return 1
+"""
+
+# Drops the unread count of conversation ARGV[1] and takes it off the messages total.
+CLEAR_CONVERSATION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local unread = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+redis.call('HDEL', KEYS[1], ARGV[1])
+if redis.call('HINCRBY', KEYS[1], 'messages', -unread) < 0 then
+    redis.call('HSET', KEYS[1], 'messages', 0)
+end
+return unread
+"""
+
+class UnreadCounterRepository:
+    """
+    Unread notification and message counts of each user, kept in a Redis hash
+    ({notifications, messages, conv:<conversation_id>}) so badges are read in
+    O(1). Mongo stays the source of truth: a missing hash is rebuilt from the
+    notifications and conversations collections, and `reconcile_all` rewrites
+    the cached hashes to correct any drift.
+    """
+    def __init__(self, db_name: str, ttl_seconds: int):
+        self.db_name = db_name
+        self.ttl_seconds = ttl_seconds
+        self.connection_manager = RedisConnectionManager()
+        self.notification_repo = NotificationRepository(db_name)
+        self.conversation_repo = ConversationRepository(db_name)
+        self._adjust_script = None
+        self._clear_conversation_script = None
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.db_name}:unread:{user_id}"
+
+    async def _adjust(self, user_id: str, deltas: Dict[str, int]) -> None:
+        redis = await self.connection_manager.get_client()
+        if self._adjust_script is None:
+            self._adjust_script = redis.register_script(ADJUST_SCRIPT)
+        args = [value for field, delta in deltas.items() for value in (field, delta)]
+        await self._adjust_script(keys=[self._key(user_id)], args=args)
+
+    async def notifications_added(self, user_id: str, count: int = 1) -> None:
+        await self._adjust(user_id, {"notifications": count})
+
+    async def notifications_read(self, user_id: str, count: int = 1) -> None:
+        if count:
+            await self._adjust(user_id, {"notifications": -count})
+
+    async def message_added(self, user_id: str, conversation_id: str) -> None:
+        await self._adjust(user_id, {"messages": 1, f"conv:{conversation_id}": 1})
+
+    async def conversation_read(self, user_id: str, conversation_id: str) -> None:
+        redis = await self.connection_manager.get_client()
+        if self._clear_conversation_script is None:
+            self._clear_conversation_script = redis.register_script(CLEAR_CONVERSATION_SCRIPT)
+        await self._clear_conversation_script(keys=[self._key(user_id)], args=[f"conv:{conversation_id}"])
+
+    async def get_counts(self, user_id: str) -> Dict[str, int]:
+        redis = await self.connection_manager.get_client()
+        key = self._key(user_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(key, "notifications", "messages")
+            pipe.expire(key, self.ttl_seconds)
+            (notifications, messages), exists = await pipe.execute()
+        if not exists:
+            return await self.reconcile(user_id)
+        return {"notifications": int(notifications or 0), "messages": int(messages or 0)}
+
+    async def _load(self, user_id: str) -> Dict[str, int]:
+        counters = {
+            "notifications": await self.notification_repo.count({"recipient_id": user_id, "read": False}),
+            "messages": 0
+        }
+        conversations = await self.conversation_repo.find_many(
+            {"participants": user_id, f"unread.{user_id}": {"$gt": 0}},
+            projection={"conversation_id": 1, f"unread.{user_id}": 1}
+        )
+        for conversation in conversations:
+            unread = conversation["unread"][user_id]
+            counters[f"conv:{conversation['conversation_id']}"] = unread
+            counters["messages"] += unread
+        return counters
+
+    async def reconcile(self, user_id: str) -> Dict[str, int]:
+        """Rewrites the user's counters from Mongo."""
+        counters = await self._load(user_id)
+        redis = await self.connection_manager.get_client()
+        key = self._key(user_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=counters)
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+        return {"notifications": counters["notifications"], "messages": counters["messages"]}
+
+    async def reconcile_all(self) -> int:
+        """Reconciles every cached hash, i.e. every user active within the TTL."""
+        redis = await self.connection_manager.get_client()
+        prefix = self._key("")
+        reconciled = 0
+        async for key in redis.scan_iter(match=f"{prefix}*", count=500):
+            await self.reconcile(key[len(prefix):])
+            reconciled += 1
+        return reconciled
+
+    async def reconcile_periodically(self, interval_seconds: float) -> None:
+        """
+        Runs `reconcile_all` every `interval_seconds`. Every worker runs this loop,
+        but a Redis lock lets only one of them do the work each period.
+        """
+        lock_key = f"{self.db_name}:locks:unread-reconcile"
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                redis = await self.connection_manager.get_client()
+                if await redis.set(lock_key, "1", nx=True, ex=max(1, int(interval_seconds))):
+                    reconciled = await self.reconcile_all()
+                    logger.info(f"Reconciled unread counters of {reconciled} users")
+            except Exception as e:
+                logger.error(f"Unread counter reconciliation failed: {e}")
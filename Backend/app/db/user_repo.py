@@ -1,49 +1,130 @@
-from typing import Optional, Dict, List
+from typing import Iterable, Optional, Dict, List, Tuple
 from bson import ObjectId
-from app.db.base_repo import BaseRepository
-from app.routers.models import UserInDB
+from pymongo import ASCENDING, IndexModel
+from app.db.base_repo import BaseRepository, model_projection
+from app.routers.models import User, UserInDB
+from app.credentials.config import (
+    CACHE_EARLY_EXPIRATION_BETA, CACHE_TTL_SECONDS, PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_USE_REDIS
+)
+from app.utils.cache import CacheManager, PrincipalCache
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, use_redis=PRINCIPAL_CACHE_USE_REDIS)
+
+PUBLIC_USER_PROJECTION = {"hashed_password": 0}
+USER_SUMMARY_PROJECTION = {"full_name": 1, "profile_picture": 1}
 
 class UserRepository(BaseRepository):
+    INDEXES = [
+        IndexModel([("full_name", ASCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+    ]
+
     def __init__(self, db_name: str):
         super().__init__(db_name, "users")
+        self.cache = CacheManager(db_name, CACHE_TTL_SECONDS, beta=CACHE_EARLY_EXPIRATION_BETA)
+
+    async def load_user(self, user_id: str, projection: Optional[Dict] = PUBLIC_USER_PROJECTION) -> Optional[Dict]:
+        return await self.loader(projection).load(user_id)
+
+    async def load_users(self, user_ids: List[str], projection: Optional[Dict] = PUBLIC_USER_PROJECTION) -> List[Dict]:
+        users = await self.loader(projection).load_many(user_ids)
+        return [user for user in users if user is not None]
+
+    async def get_profile(self, user_id: str) -> Optional[Dict]:
+        """Public user document from the shared cache, loaded through the request loader on a miss."""
+        return await self.cache.get_or_load("user", user_id, lambda: self.load_user(user_id))
+
+    async def invalidate_profile(self, user_id: str) -> None:
+        await self.cache.delete("user", user_id)
+        await self.cache.delete("user_summary", user_id)
+
+    async def load_summaries(self, user_ids: List[str]) -> List[Dict]:
+        """Summaries of the users that exist, in order, read from the shared cache in one round trip."""
+        async def load(missing_ids: List[str]) -> Dict[str, Dict]:
+            return {
+                user["_id"]: {
+                    "id": user["_id"],
+                    "full_name": user.get("full_name"),
+                    "profile_picture": user.get("profile_picture")
+                }
+                for user in await self.load_users(missing_ids, USER_SUMMARY_PROJECTION)
+            }
+
+        summaries = await self.cache.get_many_or_load("user_summary", user_ids, load)
+        return [summaries[user_id] for user_id in user_ids if summaries.get(user_id)]
+
+    async def attach_authors(self, posts: List[Dict]) -> List[Dict]:
+        summaries = {
+            author["id"]: author
+            for author in await self.load_summaries([post["author_id"] for post in posts])
+        }
+        for post in posts:
+            post["author"] = summaries.get(post["author_id"])
+        return posts
 
     async def get_user(self, full_name: str) -> Optional[UserInDB]:
         user = await self.find_one({"full_name": full_name})
         if user:
-            return UserInDB(**self._map_user_data(user))
+            return self._to_user(user)
         return None
+
+    async def get_principal(self, full_name: str) -> Optional[User]:
+        """
+        The user a token names, through the principal cache. It has no password
+        hash: paths checking a password read it with `get_user`.
+        """
+        return await principal_cache.get(
+            f"{self.db_name}:{full_name}",
+            lambda _: self._load_principal(full_name)
+        )
+
+    async def _load_principal(self, full_name: str) -> Optional[User]:
+        user = await self.find_one({"full_name": full_name}, PUBLIC_USER_PROJECTION)
+        return User.model_construct(**user) if user else None
+
+    async def invalidate_principal(self, full_name: str) -> None:
+        await principal_cache.invalidate(f"{self.db_name}:{full_name}")
     
     async def get_all_users(self) -> List[UserInDB]:
         users = await self.find({})
-        return [UserInDB(**self._map_user_data(user)) for user in users]
+        return [self._to_user(user) for user in users]
+
+    async def get_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """One page of public user documents in creation order, with only `fields` of `User` when given."""
+        return await self.find_page(
+            {}, limit, cursor, sort_field="_id", direction=1, projection=model_projection(User, fields)
+        )
 
     async def create_user(self, user_data: Dict) -> UserInDB:
         user_id = await self.insert_one(user_data)
         created_user = await self.find_one({"_id": ObjectId(user_id)})
-        return UserInDB(**self._map_user_data(created_user))
+        return self._to_user(created_user)
 
     async def update_user(self, full_name: str, update_data: Dict) -> bool:
-        return await self.update_one({"full_name": full_name}, update_data)
+        if not any(key.startswith("$") for key in update_data):
+            update_data = {"$set": update_data}
+        updated = await self.update_one({"full_name": full_name}, update_data)
+        await self.invalidate_principal(full_name)
+        return updated
 
     async def delete_user(self, full_name: str) -> bool:
-        return await self.delete_one({"full_name": full_name})
+        deleted = await self.delete_one({"full_name": full_name})
+        await self.invalidate_principal(full_name)
+        return deleted
 
     async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
         user = await self.find_one({"email": email})
         if user:
-            return UserInDB(**self._map_user_data(user))
+            return self._to_user(user)
         return None
 
-    def _map_user_data(self, user_data: Dict) -> Dict:
-        return {
-            "_id": str(user_data["_id"]),
-            "full_name": user_data.get("full_name"),
-            "email": user_data.get("email"),
-            "hashed_password": user_data.get("hashed_password", ""),
-            "provider": user_data.get("provider", "createk"),
-            "disabled": user_data.get("disabled", False),
-            "profile_picture": user_data.get("profile_picture", None),
-            "following": user_data.get("following", []),
-            "followers": user_data.get("followers", []),
-            "social_links": user_data.get("social_links", {})
-        }
\ No newline at end of file
+    @staticmethod
+    def _to_user(user_data: Dict) -> UserInDB:
+        # Users are only written through validated models and are read with string
+        # ids, so the decoded document is used as is: no copy, no second validation.
+        return UserInDB.model_construct(**user_data)
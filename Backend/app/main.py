@@ -1,7 +1,12 @@
 import asyncio
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.connector import MongoConnectionManager
+from app.db.base_repo import InvalidCursorError
+from app.db.connector import MongoConnectionManager, RedisConnectionManager
+from app.db.indexes import ensure_indexes
+from app.db.unread_repo import UnreadCounterRepository
+from app.credentials.config import UNREAD_COUNTER_TTL_SECONDS, UNREAD_RECONCILE_SECONDS
 from app.routers.auth.oauth2 import oauth2_router
 from app.routers.api.api import user_router
 from app.routers.post.post import post_router
@@ -10,25 +15,60 @@ from app.routers.post.feed import feed_router
 from app.routers.post.notif import notification_router
 from app.routers.search.search import search_router
 from app.routers.message.message import message_router
-from app.credentials.config import REDIS_HOST, REDIS_PORT
+from app.routers.realtime.ws import ws_router
 from fastapi import FastAPI
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from app.utils.auth_utils import password_service
+from app.utils.cache import cache_invalidator
+from app.utils.mail import mail_service
+from app.utils.metrics import render_metrics
+from app.utils.realtime import realtime_hub
+from app.utils.notifications import notification_pipeline
+from app.utils.concurrency import AdaptiveConcurrencyMiddleware
+from app.utils.deadline import DeadlineMiddleware
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.request_scope import RequestScopeMiddleware
+from app.utils.responses import ORJSONResponse
 
 async def startup_logic(app: FastAPI) -> tuple[asyncio.Task, asyncio.Task]:
     connection_manager = MongoConnectionManager()
     app.state.mongo = connection_manager
+    await ensure_indexes("createk")
+
+    redis_manager = RedisConnectionManager()
+    app.state.redis = redis_manager
 
-    redis = aioredis.from_url(f"redis://{REDIS_HOST}:{REDIS_PORT}", decode_responses=True)
+    redis = await redis_manager.get_client()
     FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
 
+    unread_counters = UnreadCounterRepository("createk", UNREAD_COUNTER_TTL_SECONDS)
+    app.state.unread_reconciler = asyncio.create_task(
+        unread_counters.reconcile_periodically(UNREAD_RECONCILE_SECONDS)
+    )
+    mail_service.start()
+    notification_pipeline.start()
+    cache_invalidator.start()
+
 async def shutdown_logic(app: FastAPI):
+    app.state.unread_reconciler.cancel()
+    await notification_pipeline.close()
+    await mail_service.close()
+    await cache_invalidator.close()
+    await realtime_hub.close()
     await app.state.mongo.close_all()
+    await app.state.redis.close_all()
+    password_service.shutdown()
     print("Shutting down background tasks.")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_logic(app)
+    yield
+    await shutdown_logic(app)
+
 app = FastAPI(
     title="EPILINK API Documentation",
     summary="EPILINK API Documentation",
@@ -42,8 +82,19 @@ app = FastAPI(
     },
     version="1.0.0",
     docs_url=None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+app.add_middleware(RequestScopeMiddleware)
+
+# Inside CORS, so that 429, 503 and 504 responses carry the CORS headers too. Overload
+# is shed before the rate limiter's Redis round trip, and requests running out of
+# time count as overload.
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(AdaptiveConcurrencyMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -52,6 +103,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 app.include_router(oauth2_router)
 app.include_router(user_router)
 app.include_router(post_router)
@@ -60,9 +115,14 @@ app.include_router(feed_router)
 app.include_router(notification_router)
 app.include_router(search_router)
 app.include_router(message_router)
+app.include_router(ws_router)
 
 app.mount("/template", StaticFiles(directory="app/template"), name="template")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics())
+
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
     with open("app/template/custom_swagger.html") as f:
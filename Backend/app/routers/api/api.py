@@ -1,8 +1,17 @@
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from typing import Optional
 from app.db.user_repo import UserRepository
-from app.routers.models import User, UserInDB
-from app.utils.auth_utils import get_current_active_user, get_password_hash
+from app.db.follow_repo import FollowRepository
+from app.db.post_repo import PostRepository
+from app.db.search_index_repo import UserSearchIndex
+from app.db.suggest_repo import UserSuggestRepository
+from app.routers.models import Page, User
+from app.utils.auth_utils import get_current_active_user, get_password_hash, verify_password
+from app.utils.http_cache import cached_response, invalidate_tags
+from app.utils.responses import FieldSelection, field_selection, selected_fields, trusted_page
+from app.utils.request_scope import without_deadline
+from app.credentials.config import CACHE_TTL_SECONDS
 
 user_router = APIRouter(
     prefix="/api/users",
@@ -10,6 +19,10 @@ user_router = APIRouter(
 )
 
 user_repo = UserRepository("createk")
+post_repo = PostRepository("createk")
+follow_repo = FollowRepository("createk")
+user_search_index = UserSearchIndex("createk")
+user_suggest_repo = UserSuggestRepository("createk")
 
 @user_router.get(
     "/me",
@@ -26,7 +39,7 @@ Retrieves the details of the currently authenticated user.
 - **200 OK**: Returns the authenticated user's details as a `User` object.
     """
 )
-async def read_users_me(current_user: UserInDB = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 @user_router.get(
@@ -37,19 +50,14 @@ async def read_users_me(current_user: UserInDB = Depends(get_current_active_user
 Retrieves the unique identifier of the currently authenticated user.
 
 ### Description:
-- Fetches the user's unique ID by querying the user repository with the user's full name.
-- Relies on `get_current_active_user` to obtain the current user.
+- Returns the unique ID of the user resolved by `get_current_active_user`.
 
 ### Responses:
 - **200 OK**: Returns the user's unique identifier as a string.
-- **404 Not Found**: If the user is not found in the repository.
     """
 )
-async def get_me_id(current_user: UserInDB = Depends(get_current_active_user)):
-    user = await user_repo.find_one({"full_name": current_user.full_name})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user["_id"]
+async def get_me_id(current_user: User = Depends(get_current_active_user)):
+    return current_user.id
 
 @user_router.put(
     "/me/email",
@@ -60,7 +68,7 @@ Updates the email address of the currently authenticated user.
 
 ### Description:
 - Validates the provided email address (checks for a valid format with '@').
-- Updates the user's email in the repository.
+- Updates the user's email in the repository and re-indexes the user for search.
 - Returns the updated user details if the update is successful.
 
 ### Parameters:
@@ -74,13 +82,16 @@ Updates the email address of the currently authenticated user.
 )
 async def update_user_email(
     email: str,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user)
 ):
     if not email or "@" not in email:
         raise HTTPException(status_code=400, detail="Invalid email format")
     
     if await user_repo.update_user(current_user.full_name, {"email": email}):
-        return User(**current_user.model_dump(), email=email)
+        await user_repo.invalidate_profile(current_user.id)
+        await invalidate_tags(f"user:{current_user.id}")
+        await user_search_index.index_document(current_user.id, {"full_name": current_user.full_name, "email": email})
+        return User(**{**current_user.model_dump(by_alias=True), "email": email})
     
     raise HTTPException(status_code=500, detail="Failed to update email")
 
@@ -93,7 +104,7 @@ Updates the password for the currently authenticated user.
 
 ### Description:
 - Requires the user's current password (`old_password`) and a new password (`new_password`).
-- Validates that the provided `old_password` matches the stored password.
+- Validates that the provided `old_password` matches the stored password hash (bcrypt runs in a worker process pool, off the event loop).
 - Ensures that the `new_password` meets a minimum length requirement.
 - If successful, updates the stored password with the hashed value of the new password.
 
@@ -106,22 +117,25 @@ Updates the password for the currently authenticated user.
 - **401 Unauthorized**: If the current password is incorrect.
 - **400 Bad Request**: If the new password is too short.
 - **500 Internal Server Error**: If the password update fails.
+- **503 Service Unavailable**: If too many password operations are already queued.
     """
 )
 async def update_user_password(
     old_password: str,
     new_password: str,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user)
 ):
-    if get_password_hash(old_password) != current_user.hashed_password:
+    # The authenticated principal carries no password hash.
+    user = await user_repo.get_user(current_user.full_name)
+    if not user or not await verify_password(old_password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect current password")
     
     if len(new_password) < 8:
         raise HTTPException(status_code=400, detail="Password too short")
     
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await get_password_hash(new_password)
     if await user_repo.update_user(current_user.full_name, {"hashed_password": hashed_password}):
-        return User(**current_user.dict())
+        return User(**current_user.model_dump(by_alias=True))
     
     raise HTTPException(status_code=500, detail="Password update failed")
 
@@ -133,7 +147,8 @@ async def update_user_password(
 Deletes the account of the currently authenticated user.
 
 ### Description:
-- Removes the user account from the system.
+- Removes the user account from the system, from the user search index and from the name suggestions.
+- Drops the user's follow edges in the background, adjusting the counters of the users on the other end.
 - The current user is obtained using the `get_current_active_user` dependency.
 
 ### Responses:
@@ -141,59 +156,94 @@ Deletes the account of the currently authenticated user.
 - **500 Internal Server Error**: If the deletion process fails.
     """
 )
-async def delete_user(current_user: UserInDB = Depends(get_current_active_user)):
+async def delete_user(background_tasks: BackgroundTasks, current_user: User = Depends(get_current_active_user)):
     if not await user_repo.delete_user(current_user.full_name):
         raise HTTPException(status_code=500, detail="Failed to delete user")
+    await user_repo.invalidate_profile(current_user.id)
+    await invalidate_tags(f"user:{current_user.id}")
+    await user_search_index.remove_document(current_user.id)
+    await user_suggest_repo.remove_user(current_user.id)
+    background_tasks.add_task(without_deadline(follow_repo.remove_user), current_user.id)
 
 @user_router.get(
     "/all-users",
-    response_model=list[User],
+    response_model=Page[User],
     summary="Get All Users",
     description="""
 Retrieves a list of all users in the system.
 
 ### Description:
-- Queries the user repository to obtain all registered users.
+- Queries the user repository for one page of registered users, in creation order.
 - Intended for administrative or informational purposes.
 
+### Parameters:
+- **limit (query parameter)**: Maximum number of users to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `User` fields to return, e.g. `id,full_name,profile_picture`. Only those fields are read from Mongo.
+
 ### Responses:
-- **200 OK**: Returns a list of all `User` objects.
+- **200 OK**: Returns a page of `User` objects and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
-async def get_all_users():
-    users = await user_repo.get_all_users()
-    return users
+async def get_all_users(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(User))
+):
+    users, next_cursor = await user_repo.get_users_page(limit, cursor, selected_fields(selection))
+    return trusted_page(User, users, next_cursor, selection)
 
 @user_router.get(
     "/get/{_id}",
     response_model=dict,
     summary="Get User Profile and Posts",
     description="""
-Retrieves complete user profile information and all associated posts.
+Retrieves complete user profile information and the user's posts.
 
 ### Description:
-- Fetches user details and all posts created by the user
+- Fetches user details from the shared Redis cache, loading them through the request-scoped user loader on a miss
+- Fetches the most recent posts created by the user, one page at a time
 - Returns comprehensive profile data including user info and post history
+- The response is cached until the user, one of the listed posts, or the user's posts change, and carries an `ETag` and a `Last-Modified` header
 
 ### Parameters:
 - **_id**: User's unique identifier
+- **limit (query parameter)**: Maximum number of posts to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `posts_next_cursor` returned by the previous page.
+- **If-None-Match / If-Modified-Since (headers, optional)**: Validators of a previously received copy.
 
 ### Responses:
-- **200 OK**: Returns user profile and posts
+- **200 OK**: Returns user profile, posts and the cursor of the next page of posts
+- **304 Not Modified**: The client's copy is current
+- **400 Bad Request**: If the cursor is invalid.
 - **404 Not Found**: If user is not found
 """
 )
-async def get_user_by_id(_id: str):
-    user = await user_repo.find_one({"_id": ObjectId(_id)})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    user_data = UserInDB(**user).model_dump()
-    del user_data["hashed_password"]
+async def get_user_by_id(
+    _id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    async def build():
+        user = await user_repo.get_profile(_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    posts = await user_repo.get_user_posts(ObjectId(_id))
-    
-    return {
-        "user_profile": user_data,
-        "posts": posts
-    }
\ No newline at end of file
+        user_data = User(**user).model_dump()
+
+        posts, next_cursor = await post_repo.find_page({"author_id": _id}, limit, cursor)
+
+        return {
+            "user_profile": user_data,
+            "posts": [{**post, "id": post["_id"]} for post in posts],
+            "posts_next_cursor": next_cursor
+        }
+
+    def tags(profile):
+        return [f"user:{_id}", *(f"post:{post['id']}" for post in profile["posts"])]
+
+    return await cached_response(
+        request, "user", f"{_id}:{limit}:{cursor or ''}", CACHE_TTL_SECONDS["user_response"], build, tags
+    )
\ No newline at end of file
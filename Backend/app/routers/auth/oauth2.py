@@ -5,12 +5,16 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 import httpx
 from fastapi.responses import RedirectResponse
 from app.routers.models import UserInDB
-from app.utils.mail import send_email
+from app.utils.mail import mail_service
+from app.utils.http_cache import invalidate_tags
 from app.utils.auth_utils import create_access_token
+from app.utils.request_scope import without_deadline
 from app.db.user_repo import UserRepository
+from app.db.search_index_repo import UserSearchIndex
+from app.db.suggest_repo import UserSuggestRepository
 from fastapi import BackgroundTasks
 from app.credentials.config import (
-    GMAIL_EMAIL_PASSWORD, CLIENT_IDS, 
+    CLIENT_IDS, 
     CLIENT_SECRETS, REDIRECT_URIS,
     OAUTH_CONFIG,
     FRONTEND_HOST, FRONTEND_PORT
@@ -20,6 +24,8 @@ logger = logging.getLogger(__name__)
 
 frontend_url = f"http://{FRONTEND_HOST}:{FRONTEND_PORT}/success"
 user_repo = UserRepository("createk")
+user_search_index = UserSearchIndex("createk")
+user_suggest_repo = UserSuggestRepository("createk")
 
 oauth2_router = APIRouter(
     prefix="/api/oauth2",
@@ -126,7 +132,7 @@ Handles the callback from the OAuth provider after user authentication.
    Fetches user profile data using the access token.
    - For GitHub: Uses the `login` field as a fallback if `name` is absent.
 3. **User Processing:**  
-   Either creates a new user or updates an existing user, and if a new user is created, a welcome email is sent via background tasks.
+   Either creates a new user or updates an existing user, and if a new user is created, a welcome email is queued in the mail outbox.
 4. **Token Generation and Redirection:**  
    Generates a JWT token for the user and redirects to the frontend with the token as a query parameter.
 5. **Error Handling:**  
@@ -136,7 +142,7 @@ Handles the callback from the OAuth provider after user authentication.
 ### Parameters:
 - **provider (path parameter)**: The OAuth provider's identifier (e.g., "google", "github").
 - **code (query parameter)**: The authorization code returned by the OAuth provider.
-- **background_tasks**: An instance to schedule background tasks (e.g., sending emails).
+- **background_tasks**: An instance to schedule background tasks (e.g., indexing the new user).
 
 ### Responses:
 - **302 Redirect**: Redirects the user to the frontend URL with a JWT token in the query parameter.
@@ -198,6 +204,9 @@ async def handle_user_creation(
                     {"profile_picture": profile_picture}
                 )
                 existing_user.profile_picture = profile_picture
+                await user_repo.invalidate_profile(existing_user.id)
+                await invalidate_tags(f"user:{existing_user.id}")
+                await user_suggest_repo.add_user(existing_user.id, full_name, profile_picture)
             return existing_user
 
         user_data = {
@@ -210,17 +219,11 @@ async def handle_user_creation(
         }
         
         new_user = await user_repo.create_user(user_data)
+        background_tasks.add_task(without_deadline(user_search_index.index_documents), [(new_user.id, user_data)])
+        await user_suggest_repo.add_user(new_user.id, full_name, profile_picture)
 
         if email:
-            background_tasks.add_task(
-                send_email,
-                "Welcome to Createk",
-                "dossehdosseh14@gmail.com",
-                email,
-                GMAIL_EMAIL_PASSWORD,
-                "app/template/welcome.html",
-                {"full_name": full_name}
-            )
+            await mail_service.enqueue(email, "Welcome to Createk", "welcome.html", {"full_name": full_name})
 
         return new_user
 
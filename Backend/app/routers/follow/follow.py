@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.db.user_repo import UserRepository
-from app.routers.models import PostCreate, Post, CommentCreate, Comment
-from app.utils.auth_utils import get_current_active_user
-from bson import ObjectId
-from datetime import datetime
-from app.routers.models import User
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.db.follow_repo import FollowRepository
+from app.db.user_repo import UserRepository, USER_SUMMARY_PROJECTION
+from app.db.timeline_repo import TimelineRepository
+from app.routers.models import NotificationType, Page, User, UserSummary
 from app.utils.auth_utils import get_current_active_user, has_access
+from app.utils.notifications import NotificationEvent, notification_pipeline
+from app.utils.http_cache import invalidate_tags
 
 follow_router = APIRouter(prefix="/follow", tags=["Follow"], dependencies=[Depends(has_access)])
 user_repo = UserRepository("createk")
+follow_repo = FollowRepository("createk")
+timeline_repo = TimelineRepository("createk")
 
 @follow_router.post(
     "/{user_id}",
@@ -18,10 +21,12 @@ Allows the authenticated user to follow another user.
 
 ### Description:
 - Retrieves the target user using the provided `user_id`.
-- If the target user exists, adds the `user_id` to the current user's "following" list.
+- If the target user exists, creates a follow edge from the current user to the target user and increments the current user's `following_count` and the target user's `follower_count`.
+- Drops the current user's materialized feed timeline so it is rebuilt with the new author on next read.
+- Queues a `follow` notification for the target user.
 - Returns a success message upon completion.
 - If the target user is not found, returns a 404 error.
-- If the update operation fails, returns a 400 error.
+- If the current user already follows the target user, or targets themselves, returns a 400 error.
 
 ### Parameters:
 - **user_id (path parameter)**: The unique identifier of the user to follow.
@@ -33,16 +38,23 @@ Allows the authenticated user to follow another user.
     """
 )
 async def follow_user(user_id: str, current_user: User = Depends(get_current_active_user)):
-    user = await user_repo.find_one({"_id": ObjectId(user_id)})
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot follow yourself")
+    user = await user_repo.load_user(user_id, USER_SUMMARY_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    updated = await user_repo.update_one(
-        {"_id": ObjectId(current_user.id)},
-        {"$addToSet": {"following": user_id}}
-    )
-    if not updated:
-        raise HTTPException(status_code=400, detail="Failed to follow user")
+
+    if not await follow_repo.follow(current_user.id, user_id):
+        raise HTTPException(status_code=400, detail="Already following user")
+    await user_repo.invalidate_principal(current_user.full_name)
+    await user_repo.invalidate_principal(user["full_name"])
+    await user_repo.invalidate_profile(current_user.id)
+    await user_repo.invalidate_profile(user_id)
+    await invalidate_tags(f"user:{current_user.id}", f"user:{user_id}", f"feed:{current_user.id}")
+    await timeline_repo.invalidate(current_user.id)
+    notification_pipeline.enqueue(NotificationEvent(
+        user_id, current_user.id, current_user.full_name, NotificationType.FOLLOW
+    ))
     return {"message": "Successfully followed user"}
 
 @follow_router.delete(
@@ -53,10 +65,11 @@ Allows the authenticated user to unfollow another user.
 
 ### Description:
 - Retrieves the target user using the provided `user_id`.
-- If the target user exists, removes the `user_id` from the current user's "following" list.
+- If the target user exists, deletes the follow edge from the current user to the target user and decrements both counters.
+- Drops the current user's materialized feed timeline so it is rebuilt without the author on next read.
 - Returns a success message upon successful update.
 - If the target user is not found, returns a 404 error.
-- If the update operation fails, returns a 400 error.
+- If the current user does not follow the target user, returns a 400 error.
 
 ### Parameters:
 - **user_id (path parameter)**: The unique identifier of the user to unfollow.
@@ -68,70 +81,97 @@ Allows the authenticated user to unfollow another user.
     """
 )
 async def unfollow_user(user_id: str, current_user: User = Depends(get_current_active_user)):
-    user = await user_repo.find_one({"_id": ObjectId(user_id)})
+    user = await user_repo.load_user(user_id, USER_SUMMARY_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    updated = await user_repo.update_one(
-        {"_id": ObjectId(current_user.id)},
-        {"$pull": {"following": user_id}}
-    )
-    if not updated:
-        raise HTTPException(status_code=400, detail="Failed to unfollow user")
+
+    if not await follow_repo.unfollow(current_user.id, user_id):
+        raise HTTPException(status_code=400, detail="Not following user")
+    await user_repo.invalidate_principal(current_user.full_name)
+    await user_repo.invalidate_principal(user["full_name"])
+    await user_repo.invalidate_profile(current_user.id)
+    await user_repo.invalidate_profile(user_id)
+    await invalidate_tags(f"user:{current_user.id}", f"user:{user_id}", f"feed:{current_user.id}")
+    await timeline_repo.invalidate(current_user.id)
     return {"message": "Successfully unfollowed user"}
 
 @follow_router.get(
     "/{user_id}",
+    response_model=Page[UserSummary],
     summary="Get Followers",
     description="""
-Retrieves the list of followers for a specific user.
+Retrieves the followers of a specific user, most recent first.
 
 ### Description:
 - Retrieves the target user using the provided `user_id`.
-- If the user exists, queries for all users whose `_id` is in the target user's `followers` list.
-- Returns the list of follower user objects.
+- If the user exists, reads one page of follow edges pointing at the user and loads the followers' summaries in one batched query.
+- The total number of followers is available as `follower_count` on the user profile.
 - If the target user is not found, returns a 404 error.
 
 ### Parameters:
 - **user_id (path parameter)**: The unique identifier of the user whose followers are being retrieved.
+- **limit (query parameter)**: Maximum number of users to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
 
 ### Responses:
-- **200 OK**: Returns a list of follower user objects.
+- **200 OK**: Returns a page of follower summaries and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid.
 - **404 Not Found**: Target user not found.
     """
 )
-async def get_followers(user_id: str):
-    user = await user_repo.find_one({"_id": ObjectId(user_id)})
-    if not user:
+async def get_followers(user_id: str, limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    if not await user_repo.load_user(user_id, USER_SUMMARY_PROJECTION):
         raise HTTPException(status_code=404, detail="User not found")
-    
-    followers = await user_repo.find_many({"_id": {"$in": user.followers}})
-    return followers
+
+    follower_ids, next_cursor = await follow_repo.get_followers_page(user_id, limit, cursor)
+    return {"items": await user_repo.load_summaries(follower_ids), "next_cursor": next_cursor}
 
 @follow_router.get(
     "/{user_id}/following",
+    response_model=Page[UserSummary],
     summary="Get Following",
     description="""
-Retrieves the list of users that a specific user is following.
+Retrieves the users that a specific user is following, most recently followed first.
 
 ### Description:
 - Retrieves the target user using the provided `user_id`.
-- If the user exists, queries for all users whose `_id` is in the target user's `following` list.
-- Returns the list of following user objects.
+- If the user exists, reads one page of follow edges starting at the user and loads the followed users' summaries in one batched query.
+- The total number of followed users is available as `following_count` on the user profile.
 - If the target user is not found, returns a 404 error.
 
 ### Parameters:
 - **user_id (path parameter)**: The unique identifier of the user whose following list is being retrieved.
+- **limit (query parameter)**: Maximum number of users to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
 
 ### Responses:
-- **200 OK**: Returns a list of user objects that the target user is following.
+- **200 OK**: Returns a page of summaries of the users that the target user is following and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid.
 - **404 Not Found**: Target user not found.
     """
 )
-async def get_following(user_id: str):
-    user = await user_repo.find_one({"_id": ObjectId(user_id)})
-    if not user:
+async def get_following(user_id: str, limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    if not await user_repo.load_user(user_id, USER_SUMMARY_PROJECTION):
         raise HTTPException(status_code=404, detail="User not found")
-    
-    following = await user_repo.find_many({"_id": {"$in": user.following}})
-    return following
\ No newline at end of file
+
+    following_ids, next_cursor = await follow_repo.get_following_page(user_id, limit, cursor)
+    return {"items": await user_repo.load_summaries(following_ids), "next_cursor": next_cursor}
+
+@follow_router.get(
+    "/{user_id}/status",
+    summary="Get Follow Status",
+    description="""
+Tells whether the authenticated user follows a specific user.
+
+### Description:
+- Looks up the follow edge from the current user to the target user through its unique index.
+
+### Parameters:
+- **user_id (path parameter)**: The unique identifier of the target user.
+
+### Responses:
+- **200 OK**: Returns `{"following": true}` or `{"following": false}`.
+    """
+)
+async def get_follow_status(user_id: str, current_user: User = Depends(get_current_active_user)):
+    return {"following": await follow_repo.is_following(current_user.id, user_id)}
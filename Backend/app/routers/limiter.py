@@ -1,4 +0,0 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
@@ -1,12 +1,21 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from app.db.message_repo import MessageRepository
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.db.conversation_repo import ConversationRepository
+from app.db.message_repo import MessageRepository, conversation_id
+from app.db.unread_repo import UnreadCounterRepository
+from app.credentials.config import UNREAD_COUNTER_TTL_SECONDS
 from app.utils.auth_utils import get_current_active_user, has_access
-from app.routers.models import Message, MessageCreate, User
+from app.utils.realtime import realtime_hub
+from app.db.base_repo import model_projection
+from app.utils.responses import FieldSelection, field_selection, selected_fields, trusted_page
+from app.routers.models import Conversation, Message, MessageCreate, Page, User
 from bson import ObjectId
+from typing import Optional
 
 message_router = APIRouter(prefix="/messages", tags=["Messages"], dependencies=[Depends(has_access)])
 message_repo = MessageRepository("createk")
+conversation_repo = ConversationRepository("createk")
+unread_counters = UnreadCounterRepository("createk", UNREAD_COUNTER_TTL_SECONDS)
 
 @message_router.post(
     "/",
@@ -17,8 +26,10 @@ Sends a new message from the currently authenticated user to a specified recipie
 
 ### Description:
 - Accepts a message payload as defined by the `MessageCreate` schema.
-- Augments the message data with the sender's identifier and a creation timestamp.
+- Augments the message data with the sender's identifier, the canonical `conversation_id` of the two users and a creation timestamp.
 - Inserts the new message into the message repository.
+- Stores it as the conversation's `last_message` and increments the recipient's unread count for the conversation, in Mongo and in the recipient's cached unread counters.
+- Pushes the message to the recipient's open WebSocket connections through their Redis channel.
 - Returns the newly created message data along with its generated unique identifier.
 
 ### Parameters:
@@ -34,40 +45,118 @@ async def send_message(
     current_user: User = Depends(get_current_active_user)
 ):
     message_data = {
+        "conversation_id": conversation_id(current_user.id, message.recipient_id),
         "sender_id": current_user.id,
         **message.model_dump(),
+        "read": False,
         "created_at": datetime.utcnow()
     }
-    message_id = await message_repo.insert_one(message_data)
-    return {**message_data, "id": message_id}
+    message_id = await message_repo.insert_one(dict(message_data))
+    message_data["id"] = message_id
+    await conversation_repo.record_message(message_data)
+    await unread_counters.message_added(message.recipient_id, message_data["conversation_id"])
+    await realtime_hub.publish(message.recipient_id, "message", message_data)
+    return message_data
+
+@message_router.get(
+    "/conversations",
+    response_model=Page[Conversation],
+    summary="Get Inbox",
+    description="""
+Retrieves the conversations of the currently authenticated user, most recently active first.
+
+### Description:
+- Reads one page of the user's conversation documents, each holding the latest message and the user's unread count.
+- The cost of a page does not depend on the number of messages exchanged.
+
+### Parameters:
+- **limit (query parameter)**: Maximum number of conversations to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Conversation` fields to return, e.g. `id,unread_count,updated_at`. Only those fields are read from Mongo.
+- The current user's details are provided via the `get_current_active_user` dependency.
+
+### Responses:
+- **200 OK**: Returns a page of conversations and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
+    """
+)
+async def get_inbox(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Conversation)),
+    current_user: User = Depends(get_current_active_user)
+):
+    conversations, next_cursor = await conversation_repo.get_inbox_page(
+        current_user.id, limit, cursor, selected_fields(selection)
+    )
+    return trusted_page(Conversation, conversations, next_cursor, selection)
 
 @message_router.get(
     "/conversations/{user_id}",
+    response_model=Page[Message],
     summary="Get Conversation",
     description="""
 Retrieves the conversation messages between the currently authenticated user and another specified user.
 
 ### Description:
-- Fetches all messages where the sender and recipient match the current user and the specified user.
+- Fetches the messages stamped with the canonical `conversation_id` of the current user and the specified user.
 - The conversation includes messages sent by either party.
-- Messages are sorted in chronological order based on their creation time.
+- Messages are sorted in chronological order based on their creation time and returned one page at a time.
 
 ### Parameters:
 - **user_id (path parameter)**: The unique identifier of the user with whom the conversation is held.
+- **limit (query parameter)**: Maximum number of messages to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Message` fields to return, e.g. `id,sender_id,content`. Only those fields are read from Mongo.
 - The current user's details are provided via the `get_current_active_user` dependency.
 
 ### Responses:
-- **200 OK**: Returns a list of messages representing the conversation.
+- **200 OK**: Returns a page of messages representing the conversation and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
 async def get_conversation(
     user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Message)),
     current_user: User = Depends(get_current_active_user)
 ):
-    messages = await message_repo.find_many({
-        "$or": [
-            {"sender_id": current_user.id, "recipient_id": user_id},
-            {"sender_id": user_id, "recipient_id": current_user.id}
-        ]
-    }, sort=[("created_at", 1)])
-    return messages
\ No newline at end of file
+    messages, next_cursor = await message_repo.find_page(
+        {"conversation_id": conversation_id(current_user.id, user_id)}, limit, cursor, direction=1,
+        projection=model_projection(Message, selected_fields(selection))
+    )
+    return trusted_page(
+        Message,
+        [{**message, "id": message["_id"]} for message in messages],
+        next_cursor,
+        selection
+    )
+
+@message_router.post(
+    "/conversations/{user_id}/read",
+    summary="Mark Conversation Read",
+    description="""
+Marks the conversation between the currently authenticated user and another user as read.
+
+### Description:
+- Flags every unread message addressed to the current user in the conversation as read.
+- Resets the current user's unread count on the conversation and takes it off their cached unread total.
+
+### Parameters:
+- **user_id (path parameter)**: The unique identifier of the other participant.
+- The current user's details are provided via the `get_current_active_user` dependency.
+
+### Responses:
+- **200 OK**: Returns the number of messages marked as read.
+    """
+)
+async def mark_conversation_read(user_id: str, current_user: User = Depends(get_current_active_user)):
+    key = conversation_id(current_user.id, user_id)
+    updated = await message_repo.update_many(
+        {"conversation_id": key, "recipient_id": current_user.id, "read": False},
+        {"$set": {"read": True}}
+    )
+    await conversation_repo.mark_read(key, current_user.id)
+    await unread_counters.conversation_read(current_user.id, key)
+    return {"updated": updated}
\ No newline at end of file
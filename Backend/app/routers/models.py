@@ -1,7 +1,13 @@
 from enum import Enum
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
@@ -18,13 +24,21 @@ class User(BaseModel):
     provider: Optional[str] = "createk"
     profile_picture: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    following: Optional[list[str]] = []
-    followers: Optional[list[str]] = []
+    follower_count: int = 0
+    following_count: int = 0
     social_links: Optional[dict[str, str]] = {}
 
 class UserInDB(User):
     hashed_password: Optional[str] = None
 
+class UserSummary(BaseModel):
+    id: str
+    full_name: str
+    profile_picture: Optional[str] = None
+
+class UserSuggestion(UserSummary):
+    pass
+
 class UserCreate(BaseModel):
     full_name: str
     email: str
@@ -37,8 +51,10 @@ class PostCreate(BaseModel):
 class Post(PostCreate):
     id: str
     author_id: str
+    author: Optional[UserSummary] = None
     likes: List[str] = []
-    comments: List['Comment'] = []
+    comment_count: int = 0
+    recent_comments: List['Comment'] = []
     created_at: datetime
     updated_at: datetime
 
@@ -77,13 +93,17 @@ class Notification(BaseModel):
     type: NotificationType
     content: str
     post_id: Optional[str] = None
+    actor_ids: List[str] = []
+    actor_count: int = 1
     read: bool = False
+    read_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Add new models
 
 class Message(BaseModel):
     id: str
+    conversation_id: Optional[str] = None
     sender_id: str
     recipient_id: str
     content: str
@@ -98,7 +118,9 @@ class Conversation(BaseModel):
     id: str
     participants: List[str]
     last_message: Optional[Message] = None
+    unread_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 Post.model_rebuild()
 Comment.model_rebuild()
\ No newline at end of file
@@ -1,34 +1,65 @@
-from fastapi import APIRouter, Depends
-from app.db.post_repo import PostRepository
+from fastapi import APIRouter, Depends, Query, Request
+from app.db.timeline_repo import TimelineRepository
+from app.db.user_repo import UserRepository
 from app.utils.auth_utils import get_current_active_user, has_access
-from app.routers.models import User, Post
-from typing import List
+from app.routers.models import Page, User, Post
+from app.utils.http_cache import cached_response, post_tags
+from app.db.post_repo import post_projection
+from app.utils.responses import FieldSelection, field_selection, selected_fields
+from app.credentials.config import CACHE_TTL_SECONDS
+from typing import Optional
 
 feed_router = APIRouter(prefix="/feed", tags=["Feed"], dependencies=[Depends(has_access)])
-post_repo = PostRepository("createk")
+timeline_repo = TimelineRepository("createk")
+user_repo = UserRepository("createk")
 
 @feed_router.get(
     "/",
-    response_model=List[Post],
+    response_model=Page[Post],
     summary="Get User Feed",
     description="""
 Retrieves the feed for the currently authenticated user.
 
 ### Description:
-- Fetches posts authored by users that the current user is following.
-- Queries the post repository for posts where the `author_id` is in the current user's `following` list.
-- Returns a list of posts that constitute the user's feed.
+- Fetches posts authored by users that the current user is following, newest first.
+- Reads a page of post ids from the user's materialized timeline in Redis and loads the posts in one batched query.
+- Attaches a summary of each post's author, loaded in one batched query for the whole page.
+- Cold timelines are rebuilt from the post repository on first read.
+- Posts from authors with very large follower counts are not fanned out and are pulled at read time instead.
+- Each page is cached and carries an `ETag` and a `Last-Modified` header. It is dropped when a followed author posts, when the user follows or unfollows someone, or when one of its posts or authors changes. Posts of authors that are pulled at read time may take up to the feed cache TTL to appear.
 
 ### Parameters:
-- No direct parameters are required.
+- **limit (query parameter)**: Maximum number of posts to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Post` fields to return, e.g. `id,title,created_at`. Only those fields are read from Mongo.
+- **If-None-Match / If-Modified-Since (headers, optional)**: Validators of a previously received copy.
 - The current user's details are obtained via the `get_current_active_user` dependency.
 
 ### Responses:
-- **200 OK**: Returns a list of `Post` objects representing the user's feed.
+- **200 OK**: Returns a page of `Post` objects representing the user's feed and the cursor of the next page.
+- **304 Not Modified**: The client's copy is current.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
-async def get_user_feed(current_user: User = Depends(get_current_active_user)):
-    following_posts = await post_repo.find({
-        "author_id": {"$in": current_user.following}
-    })
-    return following_posts
\ No newline at end of file
+async def get_user_feed(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Post)),
+    current_user: User = Depends(get_current_active_user)
+):
+    fields = selected_fields(selection)
+
+    async def build():
+        posts, next_cursor = await timeline_repo.get_page(current_user.id, limit, cursor, post_projection(fields))
+        if fields is None or "author" in fields:
+            await user_repo.attach_authors(posts)
+        return {"items": posts, "next_cursor": next_cursor}
+
+    def tags(page):
+        return [f"feed:{current_user.id}", *(tag for post in page["items"] for tag in post_tags(post))]
+
+    return await cached_response(
+        request, "feed", f"{current_user.id}:{limit}:{cursor or ''}",
+        CACHE_TTL_SECONDS["feed_response"], build, tags, Page[Post], selection
+    )
\ No newline at end of file
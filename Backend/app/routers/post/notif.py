@@ -1,9 +1,14 @@
+from datetime import datetime
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.db.notif_repo import NotificationRepository
+from app.db.unread_repo import UnreadCounterRepository
+from app.credentials.config import UNREAD_COUNTER_TTL_SECONDS
 from app.utils.auth_utils import get_current_active_user, has_access
-from app.routers.models import User, Notification
-from typing import List
+from app.routers.models import Page, User, Notification
+from app.db.base_repo import model_projection
+from app.utils.responses import FieldSelection, field_selection, selected_fields, trusted_page
+from typing import Optional
 
 notification_router = APIRouter(
     prefix="/notifications", 
@@ -11,29 +16,50 @@ notification_router = APIRouter(
     dependencies=[Depends(has_access)]
 )
 notification_repo = NotificationRepository("createk")
+unread_counters = UnreadCounterRepository("createk", UNREAD_COUNTER_TTL_SECONDS)
 
 @notification_router.get(
     "/",
-    response_model=List[Notification],
+    response_model=Page[Notification],
     summary="Get Notifications",
     description="""
 Retrieves a list of notifications for the currently authenticated user.
 
 ### Description:
-- Queries the notification repository for notifications where the `author_id` matches the current user's full name.
+- Queries the notification repository for notifications whose `recipient_id` is the current user's id.
 - The notifications are sorted in descending order by the `created_at` timestamp.
+- Returns one page of notifications at a time.
+- The stored notifications are shaped into `Notification` objects without being validated again and encoded with orjson.
 - The current user's details are provided by the `get_current_active_user` dependency.
 
+### Parameters:
+- **limit (query parameter)**: Maximum number of notifications to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Notification` fields to return, e.g. `id,content,read`. Only those fields are read from Mongo.
+
 ### Responses:
-- **200 OK**: Returns a list of `Notification` objects.
+- **200 OK**: Returns a page of `Notification` objects and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
-async def get_notifications(current_user: User = Depends(get_current_active_user)):
-    notifications = await notification_repo.find_many(
-        {"author_id": current_user.full_name},
-        sort=[("created_at", -1)]
+async def get_notifications(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Notification)),
+    current_user: User = Depends(get_current_active_user)
+):
+    notifications, next_cursor = await notification_repo.find_page(
+        {"recipient_id": current_user.id},
+        limit,
+        cursor,
+        projection=model_projection(Notification, selected_fields(selection))
+    )
+    return trusted_page(
+        Notification,
+        [{**notification, "id": notification["_id"]} for notification in notifications],
+        next_cursor,
+        selection
     )
-    return notifications
 
 @notification_router.put(
     "/{notification_id}/read",
@@ -43,7 +69,7 @@ Marks a specific notification as read.
 
 ### Description:
 - Updates the notification identified by `notification_id` for the current user.
-- Sets the `read` field of the notification to `True`.
+- Sets the `read` field of the notification to `True`, stamps `read_at` and decrements the user's unread notification counter.
 - If the notification is not found or does not belong to the current user, returns a 404 error.
 
 ### Parameters:
@@ -58,10 +84,61 @@ async def mark_notification_read(
     notification_id: str,
     current_user: User = Depends(get_current_active_user)
 ):
+    if not ObjectId.is_valid(notification_id):
+        raise HTTPException(status_code=404, detail="Notification not found")
+    # Only an unread notification is modified, so the counter moves once per notification.
     updated = await notification_repo.update_one(
-        {"_id": ObjectId(notification_id), "author_id": current_user.full_name},
-        {"$set": {"read": True}}
+        {"_id": ObjectId(notification_id), "recipient_id": current_user.id, "read": False},
+        {"$set": {"read": True, "read_at": datetime.utcnow()}}
     )
-    if not updated:
+    if updated:
+        await unread_counters.notifications_read(current_user.id)
+    elif not await notification_repo.find_one({"_id": ObjectId(notification_id), "recipient_id": current_user.id}):
         raise HTTPException(status_code=404, detail="Notification not found")
-    return {"message": "Notification marked as read"}
\ No newline at end of file
+    return {"message": "Notification marked as read"}
+
+@notification_router.put(
+    "/read",
+    summary="Mark All Notifications as Read",
+    description="""
+Marks every unread notification of the current user, or every one up to a cursor, as read.
+
+### Description:
+- Sets the `read` field of the user's unread notifications to `True` and stamps `read_at` with a single update.
+- With `before`, only the notifications listed up to that cursor are marked: the last notification of the page the cursor was returned with and every older one. Notifications received after the list was loaded stay unread.
+- Decrements the user's unread notification counter by the number of notifications updated.
+- Read notifications are deleted once they have been read for the configured retention period.
+
+### Parameters:
+- **before (query parameter, optional)**: A `next_cursor` returned by `GET /notifications`.
+
+### Responses:
+- **200 OK**: Returns the number of notifications marked as read.
+- **400 Bad Request**: If the cursor is invalid.
+    """
+)
+async def mark_all_notifications_read(
+    before: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    updated = await notification_repo.mark_read(current_user.id, before)
+    await unread_counters.notifications_read(current_user.id, updated)
+    return {"updated": updated}
+
+@notification_router.get(
+    "/unread-count",
+    summary="Get Unread Counts",
+    description="""
+Retrieves the number of unread notifications and messages of the current user.
+
+### Description:
+- Reads the user's unread counters from Redis in a single round trip.
+- Counters missing from Redis are rebuilt from the notifications and conversations collections.
+- Counters are kept up to date as notifications and messages are created and read, and are periodically reconciled with Mongo.
+
+### Responses:
+- **200 OK**: Returns `{"notifications": <int>, "messages": <int>}`.
+    """
+)
+async def get_unread_count(current_user: User = Depends(get_current_active_user)):
+    return await unread_counters.get_counts(current_user.id)
\ No newline at end of file
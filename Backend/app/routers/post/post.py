@@ -1,34 +1,69 @@
 import re
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.db.post_repo import PostRepository
-from app.routers.models import PostCreate, Post, CommentCreate, Comment
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from app.db.post_repo import PostRepository, post_projection
+from app.db.user_repo import UserRepository
+from app.db.comment_repo import CommentRepository
+from app.db.timeline_repo import TimelineRepository
+from app.db.search_index_repo import PostSearchIndex
+from app.routers.models import Page, PostCreate, Post, CommentCreate, Comment, NotificationType
 from app.utils.auth_utils import get_current_active_user
 from bson import ObjectId
 from datetime import datetime
+from typing import Optional
 from app.routers.models import User
 from app.utils.auth_utils import get_current_active_user, has_access
+from app.utils.notifications import NotificationEvent, notification_pipeline
+from app.utils.http_cache import cached_response, invalidate_tags, post_tags
+from app.utils.responses import FieldSelection, field_selection, selected_fields, trusted_page
+from app.utils.request_scope import without_deadline
+from app.credentials.config import CACHE_TTL_SECONDS
 
 post_router = APIRouter(prefix="/posts", tags=["Posts"], dependencies=[Depends(has_access)])
 post_repo = PostRepository("createk")
+user_repo = UserRepository("createk")
+comment_repo = CommentRepository("createk")
+timeline_repo = TimelineRepository("createk")
+post_search_index = PostSearchIndex("createk")
+
+async def fan_out_post(author_id: str, post_id: str, created_at: datetime) -> None:
+    follower_ids = await timeline_repo.fan_out(author_id, post_id, created_at)
+    for start in range(0, len(follower_ids), timeline_repo.FAN_OUT_BATCH_SIZE):
+        await invalidate_tags(*[f"feed:{follower_id}" for follower_id in follower_ids[start:start + timeline_repo.FAN_OUT_BATCH_SIZE]])
 
 @post_router.get(
     "/all",
-    response_model=list[Post],
+    response_model=Page[Post],
     summary="Get All Posts",
     description="""
 Retrieves all posts in the system.
 
 ### Description:
-- Queries the post repository to retrieve all posts.
+- Queries the post repository for one page of posts, newest first.
 - For each post, converts the internal `_id` to a string and includes it as `id` in the response.
+- Attaches a summary of each post's author, loaded in one batched query for the whole page.
+- The stored posts are shaped into `Post` objects without being validated again and encoded with orjson.
+- With `fields`, only those fields are read from Mongo and returned; authors are only loaded when `author` is requested.
+
+### Parameters:
+- **limit (query parameter)**: Maximum number of posts to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Post` fields to return, e.g. `id,title,created_at`.
 
 ### Responses:
-- **200 OK**: Returns a list of posts.
+- **200 OK**: Returns a page of posts and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
-async def get_all_posts():
-    posts = await post_repo.find({})
-    return [{"id": str(post["_id"]), **post} for post in posts]
+async def get_all_posts(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Post))
+):
+    fields = selected_fields(selection)
+    posts, next_cursor = await post_repo.find_page({}, limit, cursor, projection=post_projection(fields))
+    if fields is None or "author" in fields:
+        await user_repo.attach_authors(posts)
+    return trusted_page(Post, [{"id": post["_id"], **post} for post in posts], next_cursor, selection)
 
 @post_router.get(
     "/{post_id}",
@@ -38,23 +73,57 @@ async def get_all_posts():
 Retrieves a specific post by its unique identifier.
 
 ### Description:
-- Looks up a post by converting the provided `post_id` into an ObjectId.
-- If the post is found, returns the post data with `_id` converted to `id`.
+- Reads the post from the shared Redis cache, loading it from Mongo on a miss.
+- If the post is found, returns the post data with `_id` converted to `id` and a summary of its author.
+- The response is cached until the post or its author changes and carries an `ETag` and a `Last-Modified` header.
 - If the post is not found, returns a 404 error.
 
 ### Parameters:
 - **post_id (path parameter)**: The unique identifier of the post.
+- **If-None-Match / If-Modified-Since (headers, optional)**: Validators of a previously received copy.
 
 ### Responses:
 - **200 OK**: Returns the post data.
+- **304 Not Modified**: The client's copy is current.
 - **404 Not Found**: If no post is found with the given identifier.
     """
 )
-async def get_post(post_id: str):
-    post = await post_repo.find_one({"_id": ObjectId(post_id)})
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    return {**post, "id": str(post["_id"])}
+async def get_post(post_id: str, request: Request):
+    async def build():
+        post = await post_repo.get_post(post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        await user_repo.attach_authors([post])
+        return {**post, "id": str(post["_id"])}
+
+    return await cached_response(
+        request, "post", post_id, CACHE_TTL_SECONDS["post_response"], build, post_tags, Post
+    )
+
+@post_router.get(
+    "/{post_id}/comments",
+    response_model=Page[Comment],
+    summary="Get Post Comments",
+    description="""
+Retrieves the comments of a specific post, oldest first.
+
+### Description:
+- Reads the comment buckets of the post in order and returns one page of comments.
+- Posts only embed their `comment_count` and a few `recent_comments`; this endpoint returns the full thread.
+
+### Parameters:
+- **post_id (path parameter)**: The unique identifier of the post.
+- **limit (query parameter)**: Maximum number of comments to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+
+### Responses:
+- **200 OK**: Returns a page of comments and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid.
+    """
+)
+async def get_post_comments(post_id: str, limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    comments, next_cursor = await comment_repo.get_comments_page(post_id, limit, cursor)
+    return {"items": comments, "next_cursor": next_cursor}
 
 @post_router.post(
     "/{post_id}/comments",
@@ -64,13 +133,14 @@ async def get_post(post_id: str):
 Adds a new comment to a specific post.
 
 ### Description:
-- Retrieves the post using the provided `post_id`.
-- If the post exists, creates a new comment with the data provided in the request.
+- Creates a new comment with the data provided in the request.
 - The new comment includes:
   - A generated unique `id`
   - The `author_id` set to the current user's full name.
   - The comment content and additional metadata (likes, replies, timestamps).
-- The new comment is added to the post's `comments` array.
+- Appends the comment, authored by the current user's id, to the post's current comment bucket in the `comments` collection.
+- Then increments the post's `comment_count` and keeps the comment in the post's short `recent_comments` preview.
+- Queues a `comment` notification for the post's author.
 - If the post is not found or the update fails, appropriate error responses are returned.
 
 ### Parameters:
@@ -79,33 +149,108 @@ Adds a new comment to a specific post.
 
 ### Responses:
 - **200 OK**: Returns the created comment.
-- **404 Not Found**: If the target post is not found.
+- **404 Not Found**: If the post id is malformed or the post is not found.
 - **400 Bad Request**: If adding the comment fails.
     """
 )
 async def create_comment(post_id: str, comment: CommentCreate, current_user: User = Depends(get_current_active_user)):
-    post = await post_repo.find_one({"_id": ObjectId(post_id)})
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+    post = await post_repo.find_one({"_id": ObjectId(post_id)}, {"author_id": 1})
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    
+
     new_comment = {
         "id": str(ObjectId()),
-        "author_id": current_user.full_name,
+        "author_id": current_user.id,
         **comment.dict(),
         "likes": [],
         "replies": [],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
-    
-    updated = await post_repo.update_one(
+    # The comment is stored first, so the count and preview never list one that does not exist.
+    if not await comment_repo.add_comment(post_id, new_comment):
+        raise HTTPException(status_code=400, detail="Failed to add comment")
+    await post_repo.update_one(
         {"_id": ObjectId(post_id)},
-        {"$push": {"comments": new_comment}}
+        {
+            "$inc": {"comment_count": 1},
+            "$push": {"recent_comments": {"$each": [new_comment], "$slice": -CommentRepository.PREVIEW_SIZE}}
+        }
     )
-    if not updated:
-        raise HTTPException(status_code=400, detail="Failed to add comment")
+    await post_repo.invalidate_post(post_id)
+    await invalidate_tags(f"post:{post_id}")
+    notification_pipeline.enqueue(NotificationEvent(
+        post["author_id"], current_user.id, current_user.full_name, NotificationType.COMMENT, post_id
+    ))
     return new_comment
 
+@post_router.post(
+    "/{post_id}/like",
+    summary="Like Post",
+    description="""
+Adds the current user to the likes of a post.
+
+### Description:
+- Adds the current user's id to the post's `likes` if it is not there yet.
+- Queues a `like` notification for the post's author. Likes arriving close together are grouped into a single notification.
+- Liking a post twice has no further effect.
+
+### Parameters:
+- **post_id (path parameter)**: The unique identifier of the post to like.
+
+### Responses:
+- **200 OK**: The post is liked.
+- **404 Not Found**: If the post is not found.
+    """
+)
+async def like_post(post_id: str, current_user: User = Depends(get_current_active_user)):
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+    post = await post_repo.find_one_and_update(
+        {"_id": ObjectId(post_id), "likes": {"$ne": current_user.id}},
+        {"$push": {"likes": current_user.id}},
+        projection={"author_id": 1}
+    )
+    if post:
+        await post_repo.invalidate_post(post_id)
+        await invalidate_tags(f"post:{post_id}")
+        notification_pipeline.enqueue(NotificationEvent(
+            post["author_id"], current_user.id, current_user.full_name, NotificationType.LIKE, post_id
+        ))
+    elif not await post_repo.find_one({"_id": ObjectId(post_id)}):
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"message": "Post liked"}
+
+@post_router.delete(
+    "/{post_id}/like",
+    summary="Unlike Post",
+    description="""
+Removes the current user from the likes of a post.
+
+### Parameters:
+- **post_id (path parameter)**: The unique identifier of the post to unlike.
+
+### Responses:
+- **200 OK**: The post is no longer liked.
+- **404 Not Found**: If the post is not found.
+    """
+)
+async def unlike_post(post_id: str, current_user: User = Depends(get_current_active_user)):
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+    post = await post_repo.find_one_and_update(
+        {"_id": ObjectId(post_id)},
+        {"$pull": {"likes": current_user.id}},
+        projection={"_id": 1}
+    )
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    await post_repo.invalidate_post(post_id)
+    await invalidate_tags(f"post:{post_id}")
+    return {"message": "Post unliked"}
+
 @post_router.post(
     "/create",
     response_model=Post,
@@ -115,8 +260,11 @@ Creates a new post authored by the currently authenticated user.
 
 ### Description:
 - Extracts hashtags from the post content using a regex pattern.
-- Sets additional post fields such as `author_id`, `hashtags`, `likes`, `comments`, and timestamps.
+- Sets additional post fields such as `author_id`, `hashtags`, `likes`, `comment_count`, `recent_comments`, and timestamps.
 - Inserts the new post data into the post repository.
+- Pushes the post id into the feed timelines of the author's followers in the background and drops their cached feed responses.
+- Drops the cached profile responses of the author, which list their posts.
+- Adds the post to the search index in the background.
 - Returns the new post data, including the generated post `id`.
 
 ### Parameters:
@@ -126,16 +274,24 @@ Creates a new post authored by the currently authenticated user.
 - **200 OK**: Returns the created post.
     """
 )
-async def create_post(post: PostCreate, current_user: User = Depends(get_current_active_user)):
+async def create_post(
+    post: PostCreate,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user)
+):
     hashtags = re.findall(r'#(\w+)', post.content)
     post_data = post.model_dump()
     post_data.update({
-        "author_id": current_user.full_name,
+        "author_id": current_user.id,
         "hashtags": hashtags,
         "likes": [],
-        "comments": [],
+        "comment_count": 0,
+        "recent_comments": [],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     })
     post_id = await post_repo.insert_one(post_data)
+    await invalidate_tags(f"user:{current_user.id}")
+    background_tasks.add_task(without_deadline(fan_out_post), current_user.id, post_id, post_data["created_at"])
+    background_tasks.add_task(without_deadline(post_search_index.index_documents), [(post_id, post_data)])
     return {**post_data, "id": post_id}
@@ -0,0 +1,39 @@
+from typing import Optional
+from fastapi import APIRouter, WebSocket, status
+from jose import jwt
+from jose.exceptions import JOSEError
+from app.credentials.config import SECRET_KEY, ALGORITHM
+from app.utils.auth_utils import mongodb
+from app.utils.realtime import realtime_hub
+
+ws_router = APIRouter(tags=["Realtime"])
+
+@ws_router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Pushes the current user's events (`message`, `notification`) as JSON frames
+    `{"type": ..., "data": ...}`.
+
+    The JWT is passed as the `token` query parameter, since browsers cannot set
+    headers on a WebSocket handshake, or as a bearer `Authorization` header. The
+    server sends `{"type": "ping"}` when the socket has been idle for the heartbeat
+    interval; clients must send any frame in return, or are disconnected after two
+    intervals. Clients that fall behind are disconnected with code 1013 and should
+    reconnect and refetch.
+    """
+    if token is None:
+        authorization = websocket.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    try:
+        payload = jwt.decode(token or "", SECRET_KEY, algorithms=[ALGORITHM])
+    except JOSEError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    user = await mongodb.get_principal(payload.get("sub")) if payload.get("sub") else None
+    if user is None or user.disabled:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    await realtime_hub.serve(websocket, user.id)
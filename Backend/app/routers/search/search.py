@@ -1,12 +1,35 @@
+from bson import ObjectId
 from fastapi import APIRouter, Depends, Query
 from app.db.user_repo import UserRepository
 from app.db.post_repo import PostRepository
+from app.db.search_index_repo import PostSearchIndex, UserSearchIndex
+from app.db.suggest_repo import UserSuggestRepository
+from app.routers.models import Post, User, UserSuggestion
+from app.db.base_repo import model_projection
+from app.utils.responses import FieldSelection, field_selection
 from app.utils.auth_utils import has_access
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 search_router = APIRouter(prefix="/search", tags=["Search"], dependencies=[Depends(has_access)])
 user_repo = UserRepository("createk")
 post_repo = PostRepository("createk")
+user_search_index = UserSearchIndex("createk")
+post_search_index = PostSearchIndex("createk")
+user_suggest_repo = UserSuggestRepository("createk")
+
+async def hydrate_ranked(repo, ranked: List[Tuple[str, float]], projection: Optional[Dict] = None) -> List[Dict]:
+    if not ranked:
+        return []
+    documents = await repo.find_many(
+        {"_id": {"$in": [ObjectId(doc_id) for doc_id, _ in ranked]}},
+        projection=projection
+    )
+    documents_by_id = {document["_id"]: document for document in documents}
+    return [
+        {**documents_by_id[doc_id], "id": doc_id, "score": score}
+        for doc_id, score in ranked
+        if doc_id in documents_by_id
+    ]
 
 @search_router.get(
     "/users",
@@ -15,25 +38,54 @@ post_repo = PostRepository("createk")
 Searches for users based on a query string.
 
 ### Description:
-- Searches for users whose `full_name` or `email` contains the query string.
-- Performs a case-insensitive regex match.
-- Returns a list of matching user records.
+- Tokenizes the query (case and accent insensitive) and looks the terms up in the users inverted index built over `full_name` and `email`.
+- Ranks matching users with BM25, `full_name` matches weighing more than `email` matches.
+- Returns one page of the best matching user records, best first.
 
 ### Parameters:
 - **q (query parameter, required)**: The search string (minimum length: 1).
+- **limit (query parameter)**: Maximum number of users to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `User` fields to return alongside the `score`. Only those fields are read from Mongo.
+
+### Responses:
+- **200 OK**: Returns a page of users matching the query and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
+    """
+)
+async def search_users(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(User))
+):
+    ranked, next_cursor = await user_search_index.search(q, limit, cursor)
+    projection = {"hashed_password": 0} if selection is None else model_projection(User, selection.names)
+    users = await hydrate_ranked(user_repo, ranked, projection=projection)
+    return {"items": users, "next_cursor": next_cursor}
+
+@search_router.get(
+    "/users/suggest",
+    response_model=List[UserSuggestion],
+    summary="Suggest Users",
+    description="""
+Suggests users whose name starts with the typed prefix, for search-as-you-type.
+
+### Description:
+- Normalizes the prefix (case and accent insensitive) and looks it up in the Redis prefix index of user names.
+- Matches the start of any word of the name, or of the whole name.
+- Returns lightweight entries only (`id`, `full_name`, `profile_picture`).
+
+### Parameters:
+- **q (query parameter, required)**: The typed prefix (minimum length: 1).
+- **limit (query parameter)**: Maximum number of suggestions to return (1-10, default 10).
 
 ### Responses:
-- **200 OK**: Returns a list of users matching the query.
+- **200 OK**: Returns a list of `UserSuggestion` objects.
     """
 )
-async def search_users(q: str = Query(..., min_length=1)):
-    users = await user_repo.find_many({
-        "$or": [
-            {"full_name": {"$regex": q, "$options": "i"}},
-            {"email": {"$regex": q, "$options": "i"}}
-        ]
-    })
-    return users
+async def suggest_users(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=10)):
+    return await user_suggest_repo.suggest(q, limit)
 
 @search_router.get(
     "/posts",
@@ -42,23 +94,29 @@ async def search_users(q: str = Query(..., min_length=1)):
 Searches for posts based on a query string.
 
 ### Description:
-- Searches for posts where `title`, `content`, or `hashtags` contain the query string.
-- Performs a case-insensitive regex match for title and content.
-- Checks if the query matches a hashtag exactly.
+- Tokenizes the query (case and accent insensitive) and looks the terms up in the posts inverted index built over `title` and `content`.
+- A `#tag` term only matches posts using that hashtag; a plain word also matches hashtags.
+- Ranks matching posts with BM25, `title` matches weighing more than `content` matches.
+- Returns one page of the best matching posts, best first.
 
 ### Parameters:
 - **q (query parameter, required)**: The search string (minimum length: 1).
+- **limit (query parameter)**: Maximum number of posts to return (1-100, default 20).
+- **cursor (query parameter, optional)**: The `next_cursor` returned by the previous page.
+- **fields (query parameter, optional)**: Comma-separated `Post` fields to return alongside the `score`. Only those fields are read from Mongo.
 
 ### Responses:
-- **200 OK**: Returns a list of posts matching the query.
+- **200 OK**: Returns a page of posts matching the query and the cursor of the next page.
+- **400 Bad Request**: If the cursor is invalid or `fields` names an unknown field.
     """
 )
-async def search_posts(q: str = Query(..., min_length=1)):
-    posts = await post_repo.find_many({
-        "$or": [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"content": {"$regex": q, "$options": "i"}},
-            {"hashtags": q}
-        ]
-    })
-    return posts
\ No newline at end of file
+async def search_posts(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    selection: Optional[FieldSelection] = Depends(field_selection(Post))
+):
+    ranked, next_cursor = await post_search_index.search(q, limit, cursor)
+    projection = None if selection is None else model_projection(Post, selection.names)
+    posts = await hydrate_ranked(post_repo, ranked, projection=projection)
+    return {"items": posts, "next_cursor": next_cursor}
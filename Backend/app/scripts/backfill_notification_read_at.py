@@ -0,0 +1,36 @@
+"""
+Stamps `read_at` on notifications that were read before it was recorded.
+
+The TTL index on `read_at` only expires documents that have the field, so
+without this backfill older read notifications would be kept forever. They
+are stamped with the time of the run, so they expire one retention period
+from now. The update is idempotent.
+
+Usage:
+    python -m app.scripts.backfill_notification_read_at [--db createk]
+"""
+import argparse
+import asyncio
+from app.db.connector import MongoConnectionManager
+from app.db.notif_repo import NotificationRepository
+
+async def backfill_read_at(db_name: str) -> None:
+    notification_repo = NotificationRepository(db_name)
+    updated = await notification_repo.update_many(
+        {"read": True, "read_at": {"$exists": False}},
+        [{"$set": {"read_at": "$$NOW"}}]
+    )
+    print(f"Stamped read_at on {updated} notifications")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Stamp read_at on previously read notifications.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await backfill_read_at(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
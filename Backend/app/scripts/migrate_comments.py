@@ -0,0 +1,131 @@
+"""
+Moves comments embedded in post documents into the bucketed comments collection
+and numbers the buckets written before buckets were numbered.
+
+The embedded comments of a post predate every comment in its buckets, so they
+become buckets 0..n-1 and the buckets already there (written by add_comment
+since the deploy) are renumbered to follow them in their current order. The
+post's `comment_count` is incremented by the number of embedded comments and
+its `recent_comments` preview keeps the newest of both, in the same update that
+removes the embedded array.
+
+Buckets created by this script are flagged `migrated`. A post whose embedded
+array is still there after a failed run only loses those buckets on the next
+run, so the script can be re-run; buckets written by add_comment are never
+deleted. Run it while comments are not being written: a comment added to a post
+while its buckets are renumbered can make the run fail with a duplicate key
+error, after which it has to be re-run.
+
+Usage:
+    python -m app.scripts.migrate_comments [--db createk]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict, List
+from bson import ObjectId
+from pymongo import ASCENDING
+from app.db.comment_repo import CommentRepository
+from app.db.connector import MongoConnectionManager
+from app.db.post_repo import PostRepository
+
+BATCH_SIZE = 200
+
+async def _renumber_buckets(comment_repo: CommentRepository, post_id: str, first_index: int) -> None:
+    """Numbers the buckets of the post from `first_index`, unnumbered ones first, keeping their order."""
+    buckets = await comment_repo.find_many(
+        {"post_id": post_id},
+        sort=[("index", ASCENDING), ("_id", ASCENDING)],
+        projection={"_id": 1}
+    )
+    # Through negative numbers first, so that no two buckets share an index on the way.
+    for position, bucket in enumerate(buckets):
+        await comment_repo.update_one({"_id": ObjectId(bucket["_id"])}, {"$set": {"index": -1 - position}})
+    for position, bucket in enumerate(reversed(buckets)):
+        await comment_repo.update_one(
+            {"_id": ObjectId(bucket["_id"])},
+            {"$set": {"index": first_index + len(buckets) - 1 - position}}
+        )
+
+async def _migrate_post(
+    post_repo: PostRepository,
+    comment_repo: CommentRepository,
+    post_id: str,
+    comments: List[Dict]
+) -> None:
+    size = CommentRepository.BUCKET_SIZE
+    await comment_repo.delete_many({"post_id": post_id, "migrated": True})
+    buckets = [
+        {
+            "post_id": post_id,
+            "index": start // size,
+            "count": len(comments[start:start + size]),
+            "comments": comments[start:start + size],
+            "created_at": datetime.utcnow(),
+            "migrated": True
+        }
+        for start in range(0, len(comments), size)
+    ]
+    await _renumber_buckets(comment_repo, post_id, len(buckets))
+    if buckets:
+        await comment_repo.insert_many(buckets)
+    await post_repo.update_one(
+        {"_id": ObjectId(post_id)},
+        {
+            "$inc": {"comment_count": len(comments)},
+            # Embedded comments are older than the preview, so they go before it.
+            "$push": {
+                "recent_comments": {
+                    "$each": comments[-CommentRepository.PREVIEW_SIZE:],
+                    "$position": 0,
+                    "$slice": -CommentRepository.PREVIEW_SIZE
+                }
+            },
+            "$unset": {"comments": ""}
+        }
+    )
+
+async def migrate_comments(db_name: str) -> None:
+    post_repo = PostRepository(db_name)
+    comment_repo = CommentRepository(db_name)
+
+    migrated = 0
+    last_id = None
+    while True:
+        query = {"comments": {"$exists": True}}
+        if last_id:
+            query["_id"] = {"$gt": ObjectId(last_id)}
+        posts = await post_repo.find_many(
+            query,
+            sort=[("_id", 1)],
+            limit=BATCH_SIZE,
+            projection={"_id": 1, "comments": 1}
+        )
+        if not posts:
+            break
+
+        for post in posts:
+            await _migrate_post(post_repo, comment_repo, post["_id"], post.get("comments") or [])
+            migrated += 1
+        last_id = posts[-1]["_id"]
+        print(f"Migrated {migrated} posts")
+
+    # Posts without embedded comments may still have buckets from before they were numbered.
+    async with comment_repo.connection_manager.get_collection(db_name, comment_repo.collection_name) as collection:
+        post_ids = await collection.distinct("post_id", {"index": {"$exists": False}})
+    for post_id in post_ids:
+        await _renumber_buckets(comment_repo, post_id, 0)
+    print(f"Numbered the buckets of {len(post_ids)} more posts")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Move embedded post comments into comment buckets.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await migrate_comments(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
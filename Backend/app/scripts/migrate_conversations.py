@@ -0,0 +1,86 @@
+"""
+Stamps existing messages with their `conversation_id` and builds the conversations collection.
+
+Every message is given the canonical id of its (sender, recipient) pair, then
+one conversation document per pair is written with its latest message and the
+number of unread messages of each participant. Conversation documents are
+overwritten on every run, so the script can be re-run after a failure.
+
+Usage:
+    python -m app.scripts.migrate_conversations [--db createk]
+"""
+import argparse
+import asyncio
+from typing import Dict
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.db.connector import MongoConnectionManager
+from app.db.conversation_repo import ConversationRepository
+from app.db.message_repo import MessageRepository, conversation_id
+
+BATCH_SIZE = 1000
+
+async def migrate_conversations(db_name: str) -> None:
+    message_repo = MessageRepository(db_name)
+    conversation_repo = ConversationRepository(db_name)
+    await conversation_repo.ensure_indexes()
+
+    conversations: Dict[str, Dict] = {}
+    scanned = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        messages = await message_repo.find_many(query, sort=[("_id", 1)], limit=BATCH_SIZE)
+        if not messages:
+            break
+
+        operations = []
+        for message in messages:
+            message_id = message.pop("_id")
+            key = conversation_id(message["sender_id"], message["recipient_id"])
+            if message.get("conversation_id") != key:
+                operations.append(UpdateOne({"_id": ObjectId(message_id)}, {"$set": {"conversation_id": key}}))
+
+            message.update(conversation_id=key, id=message_id)
+            conversation = conversations.setdefault(key, {
+                "participants": sorted((message["sender_id"], message["recipient_id"])),
+                "unread": {},
+                "created_at": message["created_at"],
+                "last_message": message
+            })
+            if message["created_at"] >= conversation["last_message"]["created_at"]:
+                conversation["last_message"] = message
+            conversation["created_at"] = min(conversation["created_at"], message["created_at"])
+            if not message.get("read", False):
+                unread = conversation["unread"]
+                unread[message["recipient_id"]] = unread.get(message["recipient_id"], 0) + 1
+
+        await message_repo.bulk_write(operations)
+        scanned += len(messages)
+        last_id = messages[-1]["id"]
+        print(f"Stamped {scanned} messages")
+
+    operations = [
+        UpdateOne(
+            {"conversation_id": key},
+            {"$set": {**conversation, "updated_at": conversation["last_message"]["created_at"]}},
+            upsert=True
+        )
+        for key, conversation in conversations.items()
+    ]
+    for start in range(0, len(operations), BATCH_SIZE):
+        await conversation_repo.bulk_write(operations[start:start + BATCH_SIZE])
+    print(f"Wrote {len(conversations)} conversations")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Group existing messages into conversations.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await migrate_conversations(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
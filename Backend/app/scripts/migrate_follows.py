@@ -0,0 +1,82 @@
+"""
+Moves the `following` arrays embedded in user documents into the follows edge collection.
+
+A first pass upserts one edge per entry of every `following` array. A second
+pass recomputes `follower_count` and `following_count` from the edges and
+removes the `following` and `followers` arrays. Both passes are idempotent, so
+the script can be re-run after a failure.
+
+Usage:
+    python -m app.scripts.migrate_follows [--db createk]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.db.connector import MongoConnectionManager
+from app.db.follow_repo import FollowRepository
+from app.db.user_repo import UserRepository
+
+BATCH_SIZE = 500
+
+async def migrate_follows(db_name: str) -> None:
+    user_repo = UserRepository(db_name)
+    follow_repo = FollowRepository(db_name)
+    await follow_repo.ensure_indexes()
+
+    edges = 0
+    async for users in _iter_users(user_repo, {"_id": 1, "following": 1}):
+        operations = [
+            UpdateOne(
+                {"follower_id": user["_id"], "followee_id": followee_id},
+                {"$setOnInsert": {"created_at": datetime.utcnow()}},
+                upsert=True
+            )
+            for user in users
+            for followee_id in set(user.get("following") or [])
+            if followee_id != user["_id"]
+        ]
+        edges += await follow_repo.bulk_write(operations)
+    print(f"Created {edges} follow edges")
+
+    migrated = 0
+    async for users in _iter_users(user_repo, {"_id": 1}):
+        operations = []
+        for user in users:
+            operations.append(UpdateOne(
+                {"_id": ObjectId(user["_id"])},
+                {
+                    "$set": {
+                        "follower_count": await follow_repo.count({"followee_id": user["_id"]}),
+                        "following_count": await follow_repo.count({"follower_id": user["_id"]})
+                    },
+                    "$unset": {"following": "", "followers": ""}
+                }
+            ))
+        await user_repo.bulk_write(operations)
+        migrated += len(users)
+        print(f"Migrated {migrated} users")
+
+async def _iter_users(user_repo: UserRepository, projection: dict):
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        users = await user_repo.find_many(query, sort=[("_id", 1)], limit=BATCH_SIZE, projection=projection)
+        if not users:
+            return
+        yield users
+        last_id = users[-1]["_id"]
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Move embedded follow arrays into the follows collection.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await migrate_follows(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
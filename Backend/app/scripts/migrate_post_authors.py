@@ -0,0 +1,53 @@
+"""
+Rewrites `author_id` of posts created before authors were keyed by user id.
+
+Older posts store the author's full_name in `author_id`, so feeds built from
+followee ids never include them and notifications about them are addressed to
+a name. Every distinct legacy name is looked up in the users collection and
+its posts are updated with one update_many. Names without a matching user are
+reported and left alone. The update is idempotent.
+
+Run `python -m app.scripts.rebuild_timelines` afterwards so materialized
+feeds pick up the migrated posts; cached posts refresh within their TTL.
+
+Usage:
+    python -m app.scripts.migrate_post_authors [--db createk]
+"""
+import argparse
+import asyncio
+from app.db.connector import MongoConnectionManager
+from app.db.post_repo import PostRepository
+from app.db.user_repo import UserRepository
+
+# Anything but a 24 hex digit ObjectId string is a legacy full_name.
+LEGACY_AUTHOR = {"author_id": {"$not": {"$regex": "^[0-9a-f]{24}$"}}}
+
+async def migrate_post_authors(db_name: str) -> None:
+    post_repo = PostRepository(db_name)
+    user_repo = UserRepository(db_name)
+
+    async with post_repo.connection_manager.get_collection(db_name, post_repo.collection_name) as collection:
+        names = [name for name in await collection.distinct("author_id", LEGACY_AUTHOR) if isinstance(name, str)]
+    users = await user_repo.find_many({"full_name": {"$in": names}}, projection={"full_name": 1})
+    user_ids = {user["full_name"]: user["_id"] for user in users}
+
+    migrated = 0
+    for name in names:
+        if name not in user_ids:
+            print(f"No user named {name!r}: its posts are left unchanged")
+            continue
+        migrated += await post_repo.update_many({"author_id": name}, {"$set": {"author_id": user_ids[name]}})
+    print(f"Migrated {migrated} posts of {len(user_ids)} authors")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Key legacy posts by author user id instead of full_name.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await migrate_post_authors(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""
+Rebuilds the BM25 search indexes from the posts and users collections.
+
+Usage:
+    python -m app.scripts.rebuild_search_index            # posts and users
+    python -m app.scripts.rebuild_search_index posts      # one index
+"""
+import argparse
+import asyncio
+from bson import ObjectId
+from app.db.base_repo import BaseRepository
+from app.db.connector import MongoConnectionManager
+from app.db.post_repo import PostRepository
+from app.db.search_index_repo import PostSearchIndex, SearchIndexRepository, UserSearchIndex
+from app.db.user_repo import UserRepository
+
+BATCH_SIZE = 1000
+
+async def rebuild_index(source: BaseRepository, index: SearchIndexRepository) -> None:
+    await index.ensure_indexes()
+    await index.clear()
+
+    projection = {field: 1 for field in index.fields}
+    indexed = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        documents = await source.find_many(query, sort=[("_id", 1)], limit=BATCH_SIZE, projection=projection)
+        if not documents:
+            break
+        indexed += await index.index_documents([(document["_id"], document) for document in documents])
+        last_id = documents[-1]["_id"]
+        print(f"{index.index_name}: indexed {indexed} documents")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the search indexes.")
+    parser.add_argument("indexes", nargs="*", choices=["posts", "users"], help="Indexes to rebuild (default: all)")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    targets = {
+        "posts": (PostRepository(args.db), PostSearchIndex(args.db)),
+        "users": (UserRepository(args.db), UserSearchIndex(args.db)),
+    }
+    try:
+        for name in args.indexes or targets:
+            await rebuild_index(*targets[name])
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Rebuilds materialized feed timelines from the posts collection.
+
+Usage:
+    python -m app.scripts.rebuild_timelines              # every user
+    python -m app.scripts.rebuild_timelines <user_id>... # selected users
+"""
+import argparse
+import asyncio
+from typing import List
+from bson import ObjectId
+from app.db.connector import MongoConnectionManager, RedisConnectionManager
+from app.db.timeline_repo import TimelineRepository
+from app.db.user_repo import UserRepository
+
+BATCH_SIZE = 500
+
+async def rebuild_timelines(db_name: str, user_ids: List[str]) -> None:
+    user_repo = UserRepository(db_name)
+    timeline_repo = TimelineRepository(db_name)
+
+    rebuilt = 0
+    async for users in _iter_users(user_repo, user_ids):
+        for user in users:
+            count = await timeline_repo.rebuild(user["_id"])
+            rebuilt += 1
+            print(f"{user['_id']}: {count} posts")
+    print(f"Rebuilt {rebuilt} timelines")
+
+async def _iter_users(user_repo: UserRepository, user_ids: List[str]):
+    projection = {"_id": 1}
+    if user_ids:
+        yield await user_repo.find_many(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+            projection=projection
+        )
+        return
+
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        users = await user_repo.find_many(query, sort=[("_id", 1)], limit=BATCH_SIZE, projection=projection)
+        if not users:
+            return
+        yield users
+        last_id = users[-1]["_id"]
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild materialized feed timelines.")
+    parser.add_argument("user_ids", nargs="*", help="Only rebuild these users (default: all users)")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await rebuild_timelines(args.db, args.user_ids)
+    finally:
+        await MongoConnectionManager().close_all()
+        await RedisConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
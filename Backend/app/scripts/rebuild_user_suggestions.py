@@ -0,0 +1,51 @@
+"""
+Rebuilds the Redis prefix index behind /search/users/suggest from the users collection.
+
+Usage:
+    python -m app.scripts.rebuild_user_suggestions [--db createk]
+"""
+import argparse
+import asyncio
+from bson import ObjectId
+from app.db.connector import MongoConnectionManager, RedisConnectionManager
+from app.db.suggest_repo import UserSuggestRepository
+from app.db.user_repo import UserRepository
+
+BATCH_SIZE = 1000
+
+async def rebuild_user_suggestions(db_name: str) -> None:
+    user_repo = UserRepository(db_name)
+    suggest_repo = UserSuggestRepository(db_name)
+    await suggest_repo.clear()
+
+    indexed = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        users = await user_repo.find_many(
+            query,
+            sort=[("_id", 1)],
+            limit=BATCH_SIZE,
+            projection={"full_name": 1, "profile_picture": 1}
+        )
+        if not users:
+            break
+        for user in users:
+            await suggest_repo.add_user(user["_id"], user.get("full_name"), user.get("profile_picture"))
+        indexed += len(users)
+        last_id = users[-1]["_id"]
+        print(f"Indexed {indexed} users")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the user name suggestion index.")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await rebuild_user_suggestions(args.db)
+    finally:
+        await MongoConnectionManager().close_all()
+        await RedisConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
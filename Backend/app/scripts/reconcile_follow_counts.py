@@ -0,0 +1,60 @@
+"""
+Recomputes `follower_count` and `following_count` of users from the follows
+edge collection and fixes the ones that drifted, e.g. after a failure between
+an edge write and its counter update. Safe to run at any time.
+
+Usage:
+    python -m app.scripts.reconcile_follow_counts              # every user
+    python -m app.scripts.reconcile_follow_counts <user_id>... # selected users
+"""
+import argparse
+import asyncio
+from typing import List
+from bson import ObjectId
+from app.db.connector import MongoConnectionManager
+from app.db.follow_repo import FollowRepository
+from app.db.user_repo import UserRepository
+
+BATCH_SIZE = 500
+PROJECTION = {"_id": 1, "follower_count": 1, "following_count": 1}
+
+async def reconcile_follow_counts(db_name: str, user_ids: List[str]) -> None:
+    user_repo = UserRepository(db_name)
+    follow_repo = FollowRepository(db_name)
+
+    checked = fixed = 0
+    async for users in _iter_users(user_repo, user_ids):
+        fixed += await follow_repo.reconcile_counters(users)
+        checked += len(users)
+        print(f"Checked {checked} users, fixed {fixed}")
+
+async def _iter_users(user_repo: UserRepository, user_ids: List[str]):
+    if user_ids:
+        yield await user_repo.find_many(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+            projection=PROJECTION
+        )
+        return
+
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        users = await user_repo.find_many(query, sort=[("_id", 1)], limit=BATCH_SIZE, projection=PROJECTION)
+        if not users:
+            return
+        yield users
+        last_id = users[-1]["_id"]
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Fix follower and following counters from the follow edges.")
+    parser.add_argument("user_ids", nargs="*", help="Only reconcile these users (default: all users)")
+    parser.add_argument("--db", default="createk", help="Database name")
+    args = parser.parse_args()
+
+    try:
+        await reconcile_follow_counts(args.db, args.user_ids)
+    finally:
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
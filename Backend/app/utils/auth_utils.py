@@ -1,46 +1,61 @@
 from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import Depends, HTTPException, status
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
 from jose.exceptions import JOSEError
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from app.routers.models import UserInDB
+from app.routers.models import User
 from app.credentials.config import (
     SECRET_KEY, ALGORITHM, 
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
 )
 from app.db.user_repo import UserRepository
-import bcrypt
-
-if not hasattr(bcrypt, '__about__'):
-    bcrypt.__about__ = type('about', (object,), {'__version__': bcrypt.__version__})
+from app.utils.password import PasswordService
 
 mongodb = UserRepository("createk")
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_service = PasswordService(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
 security = HTTPBearer()
 
-async def has_access(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+def token_claims(scope, token: str) -> Dict:
+    """
+    Claims of `token`, decoded once per request: the outcome is kept in the
+    request state, so the rate limiter and `has_access` share one decode.
+    Raises JOSEError if the token is invalid or expired.
+    """
+    state = scope.setdefault("state", {})
+    decoded = state.get("token_claims")
+    if decoded is None or decoded[0] != token:
+        try:
+            decoded = (token, jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), None)
+        except JOSEError as e:
+            decoded = (token, None, e)
+        state["token_claims"] = decoded
+    if decoded[2] is not None:
+        raise decoded[2]
+    return decoded[1]
+
+async def has_access(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
+    # FastAPI caches dependency results per request, so routers guarded by
+    # has_access and handlers depending on get_current_user share this decode.
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return token_claims(request.scope, credentials.credentials)
     except JOSEError as e:
         raise HTTPException(status_code=401, detail="Invalid token: " + str(e))
-    return token
 
-def verify_password(plain_password, hashed_password):
-    return password_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_service.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return password_context.hash(password)
+async def get_password_hash(password):
+    return await password_service.hash(password)
 
 async def authenticate_user(full_name: str, password: str):
     user = await mongodb.get_user(full_name)
     if not user or not user.hashed_password:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -61,17 +76,16 @@ def decode_access_token(token: str):
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(has_access)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        full_name: str = payload.get("sub")
-        if full_name is None:
-            raise HTTPException(status_code=401, detail="Token missing 'sub'")
-        return await mongodb.get_user(full_name=full_name)
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def get_current_user(payload: Dict = Depends(has_access)):
+    full_name: str = payload.get("sub")
+    if full_name is None:
+        raise HTTPException(status_code=401, detail="Token missing 'sub'")
+    user = await mongodb.get_principal(full_name)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
 
-async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)):
+async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="You are disabled. Please contact the administrator.")
     return current_user
\ No newline at end of file
@@ -1,25 +1,423 @@
+import asyncio
 import json
-import redis
-from app.credentials.config import REDIS_HOST, REDIS_PORT
-import json
-import redis
-import os
-from typing import Dict, List, Optional
+import logging
+import math
+import random
+import struct
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import msgpack
+from bson import ObjectId
+from redis.exceptions import RedisError
+from app.credentials.config import CACHE_L1_MAX_ENTRIES, CACHE_L1_TTL_SECONDS
+from app.db.connector import RedisConnectionManager
+from app.routers.models import User
+from app.utils.metrics import Counter, Gauge
+from app.utils.request_scope import within_deadline
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by namespace, tier (l1 in-process, l2 Redis) and result.",
+    labels=("namespace", "tier", "result")
+)
+CACHE_L1_ENTRIES = Gauge("cache_l1_entries", "Entries held by this worker's in-process caches.", labels=("cache",))
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "Cache keys invalidated, by origin (local writes or other workers).",
+    labels=("origin",)
+)
+
+# msgpack extension types for the BSON values found in Mongo documents.
+OBJECT_ID_EXT = 1
+DATETIME_EXT = 2
+EPOCH = datetime(1970, 1, 1)
+
+def _encode_ext(value: Any) -> msgpack.ExtType:
+    if isinstance(value, ObjectId):
+        return msgpack.ExtType(OBJECT_ID_EXT, value.binary)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        # Mongo stores milliseconds as naive UTC; microseconds keep Python values intact.
+        micros = (value - EPOCH) // EPOCH.resolution
+        return msgpack.ExtType(DATETIME_EXT, struct.pack(">q", micros))
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+def _decode_ext(code: int, data: bytes) -> Any:
+    if code == OBJECT_ID_EXT:
+        return ObjectId(data)
+    if code == DATETIME_EXT:
+        return EPOCH + struct.unpack(">q", data)[0] * EPOCH.resolution
+    return msgpack.ExtType(code, data)
+
+def pack(value: Any) -> bytes:
+    return msgpack.packb(value, default=_encode_ext, use_bin_type=True)
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_decode_ext, raw=False)
+
+class LocalCache:
+    """In-process LRU of at most `max_entries` entries, each with its own expiry."""
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        CACHE_L1_ENTRIES.set(len(self._entries), cache=self.name)
+
+    def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+        CACHE_L1_ENTRIES.set(len(self._entries), cache=self.name)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        CACHE_L1_ENTRIES.set(0, cache=self.name)
+
+class CacheInvalidator:
+    """
+    Keeps the in-process caches of every worker coherent. A write evicts its
+    keys locally and publishes them on a Redis channel; each worker reads the
+    channel with one pub/sub connection and evicts them from its own caches.
+    A message missed while the subscription is down is bounded by the L1 TTL,
+    and the caches are cleared when the subscription is re-established.
+    """
+    CHANNEL = "cache:invalidations"
 
-class CacheManager:
     def __init__(self):
-        self.redis_client = redis.StrictRedis(
-            host=REDIS_HOST,
-            port=int(REDIS_PORT),
-            decode_responses=True,
-        )
-
-    async def get_cached(self, namespace: str, key: str) -> Optional[Dict]:
-        cache_key = f"{namespace}:{key}"
-        cached_data = self.redis_client.get(cache_key)
-        return json.loads(cached_data) if cached_data else None
-        
-    async def update_cache(self, namespace: str, key: str, data: Dict) -> Dict:
-        cache_key = f"{namespace}:{key}"
-        self.redis_client.set(cache_key, json.dumps(data))
-        return data
\ No newline at end of file
+        self.connection_manager = RedisConnectionManager()
+        self._caches: Dict[str, LocalCache] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    def register(self, cache: LocalCache) -> LocalCache:
+        self._caches[cache.name] = cache
+        return cache
+
+    def _evict(self, cache_name: str, keys: List[str]) -> None:
+        cache = self._caches.get(cache_name)
+        if cache is not None:
+            cache.delete(keys)
+
+    async def publish(self, cache_name: str, keys: List[str]) -> None:
+        self._evict(cache_name, keys)
+        CACHE_INVALIDATIONS.inc(len(keys), origin="local")
+        try:
+            redis = await self.connection_manager.get_client()
+            await redis.publish(self.CHANNEL, json.dumps({"cache": cache_name, "keys": keys}))
+        except RedisError as e:
+            logger.warning(f"Could not publish cache invalidation of {len(keys)} keys: {e}")
+
+    def start(self) -> None:
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await self.connection_manager.get_client()
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.CHANNEL)
+                # Invalidations may have been missed while unsubscribed.
+                for cache in self._caches.values():
+                    cache.clear()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not message or message["type"] != "message":
+                        continue
+                    invalidation = json.loads(message["data"])
+                    # Our own messages are harmless: those keys were already evicted.
+                    self._evict(invalidation["cache"], invalidation["keys"])
+                    CACHE_INVALIDATIONS.inc(len(invalidation["keys"]), origin="remote")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation reader error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+
+cache_invalidator = CacheInvalidator()
+document_cache = cache_invalidator.register(LocalCache("documents", CACHE_L1_MAX_ENTRIES))
+
+class _LoadAbandoned(Exception):
+    """Set on a shared load whose leader was cancelled, telling waiters to load the key themselves."""
+
+class CacheManager:
+    """
+    Two-tier cache of Mongo documents: an in-process LRU (L1) in front of Redis
+    (L2), shared by every instance on the worker. The L1 holds the encoded
+    entries, so every reader decodes its own copy, for at most `l1_ttl`
+    seconds; `delete` evicts them on every worker through `cache_invalidator`.
+    Redis is used through the async client so a lookup never blocks the event
+    loop, and within a request every Redis call is bounded by the time left
+    before its deadline; a call that runs out of time is treated as a Redis
+    error. Values are msgpack-encoded, ObjectId and datetime included, and
+    every namespace has its own TTL.
+
+    Hot keys are protected from stampedes in two ways. Each entry records how
+    long it took to load, and a reader may refresh it before it expires with
+    a probability that grows as expiry nears and with the load cost
+    (probabilistic early expiration), so one request refreshes a hot key
+    while the others keep reading the cached value. And concurrent misses of
+    the same key on a worker share a single load.
+    """
+    # Loads in flight on this worker, shared by every instance.
+    _inflight: Dict[str, asyncio.Future] = {}
+
+    def __init__(
+        self,
+        db_name: str,
+        ttls: Dict[str, int],
+        default_ttl: int = 60,
+        beta: float = 1.0,
+        l1_ttl: float = CACHE_L1_TTL_SECONDS
+    ):
+        self.db_name = db_name
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.beta = beta
+        self.l1_ttl = l1_ttl
+        self.connection_manager = RedisConnectionManager()
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.db_name}:cache:{namespace}:{key}"
+
+    def ttl(self, namespace: str) -> int:
+        return self.ttls.get(namespace, self.default_ttl)
+
+    def _fresh(self, load_seconds: float, expires_at: float) -> bool:
+        # -log(u) is exponentially distributed, so early refreshes are rare until expiry is close.
+        return time.time() - load_seconds * self.beta * math.log(1.0 - random.random()) < expires_at
+
+    async def _read(self, namespace: str, keys: List[str]) -> Dict[str, Tuple[Any, float, float]]:
+        entries = {}
+        remote_keys = []
+        for key in keys:
+            data = document_cache.get(self._key(namespace, key))
+            if data is None:
+                remote_keys.append(key)
+            else:
+                entries[key] = tuple(unpack(data))
+        CACHE_LOOKUPS.inc(len(entries), namespace=namespace, tier="l1", result="hit")
+        CACHE_LOOKUPS.inc(len(remote_keys), namespace=namespace, tier="l1", result="miss")
+        if not remote_keys:
+            return entries
+
+        try:
+            redis = await self.connection_manager.get_binary_client()
+            values = await within_deadline(redis.mget([self._key(namespace, key) for key in remote_keys]))
+        except (RedisError, asyncio.TimeoutError):
+            CACHE_LOOKUPS.inc(len(remote_keys), namespace=namespace, tier="l2", result="error")
+            return entries
+        now = time.time()
+        hits = 0
+        for key, data in zip(remote_keys, values):
+            if data is None:
+                continue
+            hits += 1
+            entries[key] = tuple(unpack(data))
+            document_cache.set(self._key(namespace, key), data, min(self.l1_ttl, entries[key][2] - now))
+        CACHE_LOOKUPS.inc(hits, namespace=namespace, tier="l2", result="hit")
+        CACHE_LOOKUPS.inc(len(remote_keys) - hits, namespace=namespace, tier="l2", result="miss")
+        return entries
+
+    async def _write(self, namespace: str, entries: Dict[str, Tuple[Any, float]], ttl: Optional[int] = None) -> None:
+        if not entries:
+            return
+        ttl = ttl or self.ttl(namespace)
+        expires_at = time.time() + ttl
+        packed = {
+            self._key(namespace, key): pack([value, load_seconds, expires_at])
+            for key, (value, load_seconds) in entries.items()
+        }
+        try:
+            redis = await self.connection_manager.get_binary_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                for full_key, data in packed.items():
+                    pipe.set(full_key, data, ex=ttl)
+                await within_deadline(pipe.execute())
+        except (RedisError, asyncio.TimeoutError):
+            return
+        for full_key, data in packed.items():
+            document_cache.set(full_key, data, min(self.l1_ttl, ttl))
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        return (await self.get_many(namespace, [key])).get(key)
+
+    async def get_many(self, namespace: str, keys: List[str]) -> Dict[str, Any]:
+        """Cached values of `keys`, in one MGET. Missing keys are left out."""
+        return {key: entry[0] for key, entry in (await self._read(namespace, keys)).items()}
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._write(namespace, {key: (value, 0.0)}, ttl)
+
+    async def set_many(self, namespace: str, values: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """Caches every value in one pipelined round trip."""
+        await self._write(namespace, {key: (value, 0.0) for key, value in values.items()}, ttl)
+
+    async def delete(self, namespace: str, *keys: str) -> None:
+        """Removes `keys` from Redis and from the in-process cache of every worker."""
+        if not keys:
+            return
+        full_keys = [self._key(namespace, key) for key in keys]
+        try:
+            redis = await self.connection_manager.get_binary_client()
+            await within_deadline(redis.delete(*full_keys))
+        except (RedisError, asyncio.TimeoutError):
+            pass
+        await cache_invalidator.publish(document_cache.name, full_keys)
+
+    async def get_or_load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        Cached value of `key`, loaded and cached on a miss or an early refresh.
+        None is not cached. Redis errors fall back to the loader.
+        """
+        entry = (await self._read(namespace, [key])).get(key)
+        if entry is not None and self._fresh(entry[1], entry[2]):
+            return entry[0]
+
+        full_key = self._key(namespace, key)
+        while full_key in self._inflight:
+            try:
+                return await asyncio.shield(self._inflight[full_key])
+            except _LoadAbandoned:
+                # The request leading the load was cancelled; this one was not.
+                continue
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            start = time.monotonic()
+            value = await loader()
+            if value is not None:
+                await self._write(namespace, {key: (value, time.monotonic() - start)})
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Waiters belong to other requests: they retry the load instead of being cancelled too.
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; without any, it must not be reported as unretrieved.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[full_key]
+
+    async def get_many_or_load(
+        self,
+        namespace: str,
+        keys: List[str],
+        loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Cached values of `keys`. Keys that are missing or due for an early refresh
+        are loaded with a single `loader` call and written back in one pipeline.
+        """
+        keys = list(dict.fromkeys(keys))
+        entries = await self._read(namespace, keys)
+        values = {key: entry[0] for key, entry in entries.items() if self._fresh(entry[1], entry[2])}
+        missing = [key for key in keys if key not in values]
+        if missing:
+            start = time.monotonic()
+            loaded = await loader(missing)
+            load_seconds = time.monotonic() - start
+            await self._write(namespace, {key: (value, load_seconds) for key, value in loaded.items() if value is not None})
+            values.update(loaded)
+        return values
+
+class PrincipalCache:
+    """
+    TTL cache of authenticated users, keyed by token subject. Entries live in an
+    in-process LRU and, when `use_redis` is set, in Redis so that other workers
+    and restarts can skip Mongo too. Invalidations reach the LRU of every worker
+    through `cache_invalidator`. Redis failures fall back to the loader.
+    Principals are public `User`s, never carrying the password hash, and every
+    caller gets its own copy of the cached one.
+    """
+    def __init__(self, ttl_seconds: int, max_entries: int = 10000, use_redis: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._entries = cache_invalidator.register(LocalCache("principal", max_entries))
+        self.connection_manager = RedisConnectionManager()
+
+    def _redis_key(self, key: str) -> str:
+        return f"principal:{key}"
+
+    async def get(self, key: str, loader: Callable[[str], Awaitable[Optional[User]]]) -> Optional[User]:
+        user = self._entries.get(key)
+        CACHE_LOOKUPS.inc(namespace="principal", tier="l1", result="miss" if user is None else "hit")
+        if user is not None:
+            return user.model_copy(deep=True)
+
+        user = await self._get_remote(key)
+        if user is None:
+            user = await loader(key)
+            if user is not None:
+                await self._set_remote(key, user)
+        if user is not None:
+            self._entries.set(key, user.model_copy(deep=True), self.ttl_seconds)
+        return user
+
+    async def invalidate(self, key: str) -> None:
+        if self.use_redis:
+            try:
+                redis = await self.connection_manager.get_client()
+                await redis.delete(self._redis_key(key))
+            except RedisError:
+                pass
+        await cache_invalidator.publish(self._entries.name, [key])
+
+    async def _get_remote(self, key: str) -> Optional[User]:
+        if not self.use_redis:
+            return None
+        try:
+            redis = await self.connection_manager.get_client()
+            cached = await redis.get(self._redis_key(key))
+        except RedisError:
+            CACHE_LOOKUPS.inc(namespace="principal", tier="l2", result="error")
+            return None
+        CACHE_LOOKUPS.inc(namespace="principal", tier="l2", result="hit" if cached else "miss")
+        return User.model_validate_json(cached) if cached else None
+
+    async def _set_remote(self, key: str, user: User) -> None:
+        if not self.use_redis:
+            return
+        try:
+            redis = await self.connection_manager.get_client()
+            await redis.set(self._redis_key(key), user.model_dump_json(by_alias=True), ex=self.ttl_seconds)
+        except RedisError:
+            pass
@@ -0,0 +1,182 @@
+import time
+from typing import Dict, Optional
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from starlette.responses import JSONResponse
+from app.credentials.config import (
+    CONCURRENCY_LATENCY_TOLERANCE, CONCURRENCY_LIMIT_INITIAL, CONCURRENCY_LIMIT_MAX, CONCURRENCY_LIMIT_MIN
+)
+from app.utils.metrics import Counter, Gauge
+from app.utils.rate_limit import EXEMPT_PREFIXES, WRITE_METHODS
+
+CONCURRENCY_LIMIT = Gauge("concurrency_limit", "Current adaptive limit of in-flight requests of this worker.")
+CONCURRENCY_IN_FLIGHT = Gauge("concurrency_in_flight", "Requests of this worker currently being handled.")
+CONCURRENCY_REQUESTS = Counter(
+    "concurrency_requests_total",
+    "Requests by priority and outcome (admitted, shed); the shed rate is shed / total.",
+    labels=("priority", "result")
+)
+
+# Share of the limit each priority may fill. Heavy routes are shed first, then
+# writes, while cheap reads keep the remaining headroom.
+PRIORITY_SHARES = {"critical": 1.0, "normal": 0.9, "write": 0.75, "heavy": 0.6}
+
+def request_priority(method: str, path: str) -> Optional[str]:
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path.startswith("/api/oauth2"):
+        return "critical"
+    if path.startswith("/search") or (method == "GET" and path.rstrip("/") == "/posts/all"):
+        return "heavy"
+    if method in WRITE_METHODS:
+        return "write"
+    return "normal"
+
+class _Latency:
+    """
+    Moving average of the latency of one priority and its baseline: the lowest
+    value the average took over the last one to two `window` seconds. The
+    average rather than single samples is compared, so ordinary variance of a
+    route does not read as overload, while queueing raises it well above the
+    baseline.
+    """
+    def __init__(self, sample: float, window: float):
+        self.window = window
+        self.average = sample
+        self._previous_min = sample
+        self._current_min = sample
+        self._window_start = time.monotonic()
+
+    @property
+    def baseline(self) -> float:
+        return min(self._previous_min, self._current_min)
+
+    def update(self, sample: float, smoothing: float) -> None:
+        self.average += (sample - self.average) * smoothing
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._previous_min, self._current_min = self._current_min, self.average
+            self._window_start = now
+        else:
+            self._current_min = min(self._current_min, self.average)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the requests a worker handles at once. Every completed
+    request updates the latency average of its priority: when it exceeds
+    `tolerance` times its recent baseline, or Mongo reports a pool or server
+    timeout, requests are queueing somewhere and the limit is cut by
+    `backoff`, at most once per baseline latency. Otherwise, while the limit is
+    in use, it grows by about one per round of `limit` requests. Latencies are
+    tracked per priority because heavy and cheap routes have very different
+    normal latencies.
+    """
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float,
+        backoff: float = 0.9,
+        smoothing: float = 0.1,
+        baseline_window: float = 30.0
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_window = baseline_window
+        self.in_flight = 0
+        self._latencies: Dict[str, _Latency] = {}
+        self._last_decrease = 0.0
+        CONCURRENCY_LIMIT.set(int(self.limit))
+
+    def try_acquire(self, priority: str) -> bool:
+        if self.in_flight >= self.limit * PRIORITY_SHARES[priority]:
+            CONCURRENCY_REQUESTS.inc(priority=priority, result="shed")
+            return False
+        self.in_flight += 1
+        CONCURRENCY_IN_FLIGHT.inc()
+        CONCURRENCY_REQUESTS.inc(priority=priority, result="admitted")
+        return True
+
+    def release(self, priority: str, latency: float, overloaded: bool = False) -> None:
+        in_use = self.in_flight * 2 >= self.limit
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.dec()
+
+        stats = self._latencies.get(priority)
+        if stats is None:
+            self._latencies[priority] = _Latency(latency, self.baseline_window)
+            return
+        stats.update(latency, self.smoothing)
+
+        if overloaded or stats.average > stats.baseline * self.tolerance:
+            now = time.monotonic()
+            if now - self._last_decrease >= stats.baseline:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif in_use:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        CONCURRENCY_LIMIT.set(int(self.limit))
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Pure ASGI middleware shedding HTTP requests beyond the adaptive limit with a
+    503 and Retry-After, before they reach the Mongo pool and queue there.
+    A request holds its slot until its response is sent; background tasks
+    running after that are not counted. WebSocket connections, metrics and
+    docs are not limited.
+    """
+    def __init__(self, app, limiter: Optional[AdaptiveConcurrencyLimiter] = None, retry_after_seconds: int = 1):
+        self.app = app
+        self.limiter = limiter or AdaptiveConcurrencyLimiter(
+            CONCURRENCY_LIMIT_INITIAL, CONCURRENCY_LIMIT_MIN, CONCURRENCY_LIMIT_MAX, CONCURRENCY_LATENCY_TOLERANCE
+        )
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = request_priority(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+        if not self.limiter.try_acquire(priority):
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server overloaded, retry later"},
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = None
+        released = False
+
+        def release(overloaded: bool) -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.limiter.release(priority, time.perf_counter() - start, overloaded)
+
+        async def send_releasing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            # Background tasks run after the last body chunk, inside the app call:
+            # they are not part of the request's latency nor hold its slot.
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release(status in (503, 504))
+
+        try:
+            await self.app(scope, receive, send_releasing)
+        except (ConnectionFailure, ExecutionTimeout):
+            release(True)
+            raise
+        finally:
+            release(status in (503, 504))
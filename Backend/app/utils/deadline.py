@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from pymongo.errors import PyMongoError
+from starlette.responses import JSONResponse
+from app.credentials.config import REQUEST_TIMEOUTS
+from app.utils.metrics import Counter
+from app.utils.rate_limit import route_group
+from app.utils.request_scope import Deadline, request_deadline
+
+DEADLINES_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Requests answered with a 504 because their time budget ran out, by route group.",
+    labels=("group",)
+)
+
+def _requested_timeout(scope) -> Optional[float]:
+    for key, value in scope["headers"]:
+        if key == b"x-request-timeout":
+            try:
+                seconds = float(value)
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware giving every HTTP request a time budget: the
+    `REQUEST_TIMEOUTS` value of its route group, or less when the client sends
+    X-Request-Timeout in seconds. Mongo operations (as maxTimeMS and socket
+    timeouts) and cache lookups made on its behalf are bounded by the time
+    left, so that the database stops working for a request nobody waits for.
+    When the budget runs out before the response starts, the handler is
+    cancelled and a 504 is returned. The deadline is lifted once the response
+    starts; work meant to outlive the request opts out of it explicitly with
+    `without_deadline` or `spawn_detached` (app.utils.request_scope).
+    """
+    def __init__(self, app, timeouts: Dict[str, float] = REQUEST_TIMEOUTS):
+        self.app = app
+        self.timeouts = timeouts
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["method"], scope["path"])
+        budget = self.timeouts.get(group, 0) if group else 0
+        if budget <= 0:
+            await self.app(scope, receive, send)
+            return
+        requested = _requested_timeout(scope)
+        if requested is not None:
+            budget = min(budget, requested)
+
+        deadline = Deadline(time.monotonic() + budget)
+        started = False
+
+        async def send_lifting_deadline(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                deadline.lift()
+                timeout.reschedule(None)
+            await send(message)
+
+        token = request_deadline.set(deadline)
+        try:
+            async with asyncio.timeout(budget) as timeout:
+                await self.app(scope, receive, send_lifting_deadline)
+        except TimeoutError:
+            if started or not timeout.expired():
+                raise
+        except PyMongoError as e:
+            # The driver enforces the same deadline and may give up first.
+            if started or not e.timeout:
+                raise
+        else:
+            return
+        finally:
+            request_deadline.reset(token)
+
+        DEADLINES_EXCEEDED.inc(group=group)
+        response = JSONResponse(status_code=504, content={"detail": "Request timed out"})
+        await response(scope, receive, send)
@@ -0,0 +1,155 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Type
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from app.utils.metrics import Counter
+from app.utils.responses import FieldSelection, dumps, serialize_trusted
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Cached GET responses by namespace and result (hit, miss, not_modified).",
+    labels=("namespace", "result")
+)
+
+# Deletes every response cached under the tags in KEYS, then the tag sets themselves.
+INVALIDATE_TAGS_SCRIPT = """
+local deleted = 0
+for _, tag in ipairs(KEYS) do
+    local members = redis.call('SMEMBERS', tag)
+    for i = 1, #members, 1000 do
+        deleted = deleted + redis.call('DEL', unpack(members, i, math.min(i + 999, #members)))
+    end
+    redis.call('DEL', tag)
+end
+return deleted
+"""
+
+_invalidate_script = None
+
+def _cache_key(namespace: str, key: str) -> str:
+    return f"{FastAPICache.get_prefix()}:{namespace}:{key}"
+
+def _tag_key(tag: str) -> str:
+    return f"{FastAPICache.get_prefix()}:tag:{tag}"
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+    return etag in candidates
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+def _is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    # If-Modified-Since is only considered without If-None-Match (RFC 9110, 13.1.3).
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    return if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)
+
+async def cached_response(
+    request: Request,
+    namespace: str,
+    key: str,
+    expire: int,
+    build: Callable[[], Awaitable[Any]],
+    tags: Callable[[Any], Iterable[str]],
+    response_model: Optional[Type[BaseModel]] = None,
+    selection: Optional[FieldSelection] = None
+) -> Response:
+    """
+    Serves a GET response from the fastapi-cache Redis backend with an ETag and a
+    Last-Modified header, answering 304 when the client's copy is current.
+
+    On a miss `build` produces the payload, which is shaped by `response_model`
+    without validation (see `serialize_trusted`, it is built from our own
+    documents), encoded with orjson, hashed into a strong ETag and stored for
+    `expire` seconds under every tag returned by `tags(payload)`; `invalidate_tags`
+    drops it when one of them changes. Last-Modified is the time the entry was
+    built. Exceptions raised by `build`, such as a 404, are not cached. A sparse
+    fieldset `selection` is applied when shaping and gets its own entry.
+    """
+    backend = FastAPICache.get_backend()
+    if selection is not None:
+        key = f"{key}:{','.join(sorted(selection.names))}"
+    cache_key = _cache_key(namespace, key)
+    try:
+        cached = await backend.get(cache_key)
+    except RedisError:
+        cached = None
+
+    if cached is not None:
+        if isinstance(cached, bytes):
+            cached = cached.decode()
+        etag, last_modified_text, body = cached.split("\n", 2)
+        last_modified = datetime.fromisoformat(last_modified_text)
+        result = "hit"
+    else:
+        payload = await build()
+        # Tags are read from the full payload, before fields left out of the response are dropped.
+        payload_tags = set(tags(payload))
+        if response_model is not None:
+            payload = serialize_trusted(response_model, payload, selection)
+        else:
+            payload = jsonable_encoder(payload)
+        encoded = dumps(payload)
+        body = encoded.decode()
+        etag = f'"{hashlib.sha256(encoded).hexdigest()[:32]}"'
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        try:
+            await backend.set(cache_key, f"{etag}\n{last_modified.isoformat()}\n{body}", expire)
+            async with backend.redis.pipeline(transaction=False) as pipe:
+                for tag in payload_tags:
+                    pipe.sadd(_tag_key(tag), cache_key)
+                    # A tag set must outlive every entry in it: give a new set a TTL,
+                    # then only ever extend it (GT needs Redis 7).
+                    pipe.expire(_tag_key(tag), expire, nx=True)
+                    pipe.expire(_tag_key(tag), expire, gt=True)
+                await pipe.execute()
+        except RedisError:
+            pass
+        result = "miss"
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        # Responses depend on the caller, so shared caches must not keep them and
+        # browsers must revalidate, which is cheap thanks to the 304s.
+        "Cache-Control": "private, no-cache",
+    }
+    if _is_not_modified(request, etag, last_modified):
+        RESPONSE_CACHE_REQUESTS.inc(namespace=namespace, result="not_modified")
+        return Response(status_code=304, headers=headers)
+    RESPONSE_CACHE_REQUESTS.inc(namespace=namespace, result=result)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def post_tags(post: Any) -> List[str]:
+    """Tags of a response embedding `post`: it changes with the post and with its author's summary."""
+    return [f"post:{post['id']}", f"user:{post['author_id']}"]
+
+async def invalidate_tags(*tags: str) -> int:
+    """Drops every cached response stored under any of `tags` and returns how many were dropped."""
+    global _invalidate_script
+    if not tags:
+        return 0
+    redis = FastAPICache.get_backend().redis
+    if _invalidate_script is None:
+        _invalidate_script = redis.register_script(INVALIDATE_TAGS_SCRIPT)
+    try:
+        return await _invalidate_script(keys=[_tag_key(tag) for tag in tags])
+    except RedisError:
+        return 0
@@ -1,74 +1,255 @@
-import smtplib, ssl, pandas as pd
-from email.message import EmailMessage
-import ssl
-import smtplib
-from jinja2 import Environment, FileSystemLoader
+import asyncio
+import logging
 import os
+import random
+import smtplib
+import ssl
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+from jinja2 import Environment, FileSystemLoader, TemplateError, select_autoescape
+from app.credentials.config import (
+    GMAIL_EMAIL_PASSWORD, MAIL_BATCH_SIZE, MAIL_MAX_ATTEMPTS, MAIL_POLL_SECONDS, MAIL_POOL_SIZE,
+    MAIL_SENDER, MAIL_SMTP_HOST, MAIL_SMTP_PORT, MAIL_SMTP_SSL
+)
+from app.db.mail_repo import MailOutboxRepository
+from app.utils.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+MAIL_EVENTS = Counter("mail_events_total", "Mail delivery attempts by outcome.", labels=("outcome",))
+MAIL_SEND_SECONDS = Histogram(
+    "mail_send_seconds",
+    "Time spent handing one mail to the SMTP server, connecting included.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+MAIL_SMTP_CONNECTIONS = Gauge("mail_smtp_connections", "Authenticated SMTP connections held by this worker.")
+MAIL_SMTP_LOGINS = Counter("mail_smtp_logins_total", "SMTP connections opened and authenticated.")
 
-# def send_email(subject: str, email_sender, 
-#             email_receiver, passwd, template_file, template_vars=None) -> None:
-#     em = EmailMessage()
-#     em["From"] = email_sender
-#     em["To"] = email_receiver
-#     em["Subject"] = subject
-
-#     template_dir = os.path.dirname(template_file)
-#     env = Environment(loader=FileSystemLoader(template_dir))
-#     template = env.get_template(os.path.basename(template_file))
-
-#     html_body = template.render(**(template_vars or {}))
-
-#     em.add_alternative(html_body, subtype='html')
-#     context = ssl.create_default_context()
-
-#     smtp_server = "smtp.titan.email"
-#     smtp_port = 465
-
-#     with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as smtp:
-#         try:
-#             smtp.login(email_sender, passwd)
-#             smtp.sendmail(email_sender, email_receiver, em.as_string())
-#         except smtplib.SMTPAuthenticationError as e:
-#             print("Authentication failed. Please check:")
-#             print("1. Make sure you're using your complete email address")
-#             print("2. Verify your password is correct")
-#             print("3. Consider using an app-specific password")
-#             print(f"Error details: {str(e)}")
-            
-#         except Exception as e:
-#             print(f"Email sending failed: {str(e)}")
-#             print(f"Error type: {type(e).__name__}")
-
-def send_email(subject: str, email_sender, 
-            email_receiver, passwd, template_file, template_vars=None) -> None:
-    em = EmailMessage()
-    em["From"] = email_sender
-    em["To"] = email_receiver
-    em["Subject"] = subject
-
-    template_dir = os.path.dirname(template_file)
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template(os.path.basename(template_file))
-
-    html_body = template.render(**(template_vars or {}))
-
-    em.add_alternative(html_body, subtype='html')
-    context = ssl.create_default_context()
-
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 465
-
-    with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as smtp:
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "template")
+
+# Compiled templates are cached by the environment; with auto_reload off they are
+# not even stat()ed again, so a template is parsed once per worker.
+templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False
+)
+
+# A mail claimed by a worker is retried by another one after this long.
+LEASE_SECONDS = 300
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+def render_template(template: str, context: Optional[Dict] = None) -> str:
+    return templates.get_template(template).render(**(context or {}))
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter: ~30s, 1m, 2m, ... capped at an hour."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempts)
+    return delay * random.uniform(0.5, 1.0)
+
+def is_permanent(error: Exception) -> bool:
+    """Whether retrying the mail cannot help, e.g. a rejected address or a missing template."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, TemplateError)):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Credentials are fixed by an operator; keep the mail until they are.
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+class SMTPConnectionPool:
+    """
+    Up to `size` logged-in SMTP connections reused across mails, so the TLS
+    handshake and login are paid once per connection rather than once per mail.
+    smtplib blocks, so every call runs in a thread. A connection idle for longer
+    than `idle_seconds` is assumed to have been dropped by the server and is replaced.
+    """
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_ssl: bool,
+        username: str,
+        password: Optional[str],
+        size: int,
+        timeout: float = 30,
+        idle_seconds: float = 60
+    ):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
         try:
-            smtp.login(email_sender, passwd)
-            smtp.sendmail(email_sender, email_receiver, em.as_string())
-        except smtplib.SMTPAuthenticationError as e:
-            print("Authentication failed. Please check:")
-            print("1. Make sure you're using your complete email address")
-            print("2. Verify your password is correct")
-            print("3. Consider using an app-specific password if you have 2-step verification enabled")
-            print(f"Error details: {str(e)}")
-            
+            if self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        MAIL_SMTP_LOGINS.inc()
+        return smtp
+
+    @staticmethod
+    def _quit(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _discard(self, smtp: smtplib.SMTP) -> None:
+        MAIL_SMTP_CONNECTIONS.dec()
+        await asyncio.to_thread(self._quit, smtp)
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._semaphore:
+            smtp = None
+            while self._idle and smtp is None:
+                smtp, last_used = self._idle.pop()
+                if time.monotonic() - last_used > self.idle_seconds:
+                    await self._discard(smtp)
+                    smtp = None
+            if smtp is None:
+                smtp = await asyncio.to_thread(self._connect)
+                MAIL_SMTP_CONNECTIONS.inc()
+            try:
+                yield smtp
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered and smtplib reset the transaction, so the session is still usable.
+                self._idle.append((smtp, time.monotonic()))
+                raise
+            except asyncio.CancelledError:
+                # The thread may still be using the session, so it is neither reused nor closed here.
+                MAIL_SMTP_CONNECTIONS.dec()
+                raise
+            except Exception:
+                await self._discard(smtp)
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    async def send(self, message: EmailMessage) -> None:
+        async with self.connection() as smtp:
+            await asyncio.to_thread(smtp.send_message, message)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._discard(smtp)
+
+class MailService:
+    """
+    Sends mail off the request path. `enqueue` only writes the mail to the
+    `mail_outbox` collection, so it survives restarts; a background task on
+    every worker leases due mails in batches, renders them from the cached
+    templates and sends them over the SMTP pool. Failed mails are retried with
+    exponential backoff until `max_attempts`, permanent rejections are not.
+    """
+    def __init__(
+        self,
+        db_name: str,
+        pool: SMTPConnectionPool,
+        sender: str,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int
+    ):
+        self.outbox = MailOutboxRepository(db_name)
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def enqueue(self, recipient: str, subject: str, template: str, context: Optional[Dict] = None) -> str:
+        mail_id = await self.outbox.enqueue(recipient, subject, template, context)
+        self._wakeup.set()
+        return mail_id
+
+    def _build(self, mail: Dict) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = mail["recipient"]
+        message["Subject"] = mail["subject"]
+        message.add_alternative(render_template(mail["template"], mail.get("context")), subtype="html")
+        return message
+
+    async def _deliver(self, mail: Dict) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.pool.send(self._build(mail))
         except Exception as e:
-            print(f"Email sending failed: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
+            error = f"{type(e).__name__}: {e}"
+            attempts = mail.get("attempts", 0) + 1
+            if is_permanent(e) or attempts >= self.max_attempts:
+                MAIL_EVENTS.inc(outcome="failed")
+                logger.error(f"Giving up on mail {mail['_id']} to {mail['recipient']}: {error}")
+                await self.outbox.mark_failed(mail["_id"], error)
+            else:
+                MAIL_EVENTS.inc(outcome="retried")
+                logger.warning(f"Mail {mail['_id']} failed (attempt {attempts}), retrying: {error}")
+                await self.outbox.retry_later(mail["_id"], backoff_seconds(attempts - 1), error)
+            return False
+        MAIL_SEND_SECONDS.observe(time.perf_counter() - start)
+        MAIL_EVENTS.inc(outcome="sent")
+        return True
+
+    async def dispatch_once(self) -> int:
+        """Sends one batch of due mails and returns how many were claimed."""
+        mails = await self.outbox.claim_batch(self.batch_size, LEASE_SECONDS)
+        if not mails:
+            return 0
+        delivered = await asyncio.gather(*[self._deliver(mail) for mail in mails])
+        await self.outbox.mark_sent([mail["_id"] for mail, ok in zip(mails, delivered) if ok])
+        return len(mails)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Mail dispatch failed: {e}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stops the sender; mails it had leased are retried once their lease runs out."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.pool.close()
+
+mail_service = MailService(
+    "createk",
+    SMTPConnectionPool(MAIL_SMTP_HOST, MAIL_SMTP_PORT, MAIL_SMTP_SSL, MAIL_SENDER, GMAIL_EMAIL_PASSWORD, MAIL_POOL_SIZE),
+    MAIL_SENDER,
+    MAIL_BATCH_SIZE,
+    MAIL_POLL_SECONDS,
+    MAIL_MAX_ATTEMPTS
+)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import Counter as TallyCounter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.credentials.config import (
+    NOTIFICATION_BATCH_SIZE, NOTIFICATION_COALESCE_SECONDS, NOTIFICATION_QUEUE_SIZE,
+    UNREAD_COUNTER_TTL_SECONDS
+)
+from app.db.notif_repo import NotificationRepository
+from app.db.unread_repo import UnreadCounterRepository
+from app.routers.models import NotificationType
+from app.utils.metrics import Counter, Gauge, Histogram
+from app.utils.realtime import realtime_hub
+from app.utils.request_scope import spawn_detached
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_QUEUE_DEPTH = Gauge("notification_queue_depth", "Notification events waiting to be coalesced.")
+NOTIFICATION_FLUSH_SIZE = Histogram(
+    "notification_flush_size",
+    "Notifications written per flush.",
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000)
+)
+NOTIFICATION_LAG_SECONDS = Histogram(
+    "notification_lag_seconds",
+    "Time from an event being enqueued to its notification being written.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+NOTIFICATION_EVENTS = Counter("notification_events_total", "Notification events by outcome.", labels=("outcome",))
+
+# Maximum number of actors kept on a coalesced notification.
+MAX_ACTORS = 10
+
+MESSAGES = {
+    NotificationType.FOLLOW: "started following you",
+    NotificationType.LIKE: "liked your post",
+    NotificationType.COMMENT: "commented on your post",
+    NotificationType.REPLY: "replied to your comment",
+}
+
+class NotificationEvent(NamedTuple):
+    recipient_id: str
+    sender_id: str
+    sender_name: str
+    type: NotificationType
+    post_id: Optional[str] = None
+
+class _Group:
+    def __init__(self):
+        self.actors: Dict[str, str] = {}
+        self.enqueued_at: List[float] = []
+
+class NotificationPipeline:
+    """
+    Turns events raised by request handlers into notifications off the request path.
+
+    Events are queued without blocking the handler. Events with the same
+    recipient, type and post that arrive within one coalescing window become a
+    single notification ("X and 12 others liked your post"). A window is
+    flushed with one insert_many once it is `window_seconds` old or holds
+    `batch_size` groups. Unread counters and WebSocket pushes follow each flush.
+    """
+    def __init__(self, db_name: str, window_seconds: float, batch_size: int, max_queue: int):
+        self.window_seconds = window_seconds
+        self.batch_size = batch_size
+        self.notification_repo = NotificationRepository(db_name)
+        self.unread_counters = UnreadCounterRepository(db_name, UNREAD_COUNTER_TTL_SECONDS)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: Dict[Tuple, _Group] = {}
+        self._window_end: Optional[float] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def enqueue(self, event: NotificationEvent) -> None:
+        if event.recipient_id == event.sender_id:
+            return
+        self.start()
+        try:
+            self._queue.put_nowait((event, time.monotonic()))
+        except asyncio.QueueFull:
+            NOTIFICATION_EVENTS.inc(outcome="dropped")
+            return
+        NOTIFICATION_EVENTS.inc(outcome="queued")
+        NOTIFICATION_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def start(self) -> None:
+        """
+        Starts the worker, or restarts it if it died. It runs in an empty context,
+        so that when it is started from a handler it does not inherit that
+        request's scope or deadline.
+        """
+        if self._worker is None or self._worker.done():
+            self._worker = spawn_detached(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            timeout = None if self._window_end is None else max(0.0, self._window_end - loop.time())
+            try:
+                event, enqueued_at = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush()
+                continue
+            if event is None:
+                await self._flush()
+                return
+            NOTIFICATION_QUEUE_DEPTH.set(self._queue.qsize())
+            if self._window_end is None:
+                self._window_end = loop.time() + self.window_seconds
+            group = self._pending.setdefault((event.recipient_id, event.type, event.post_id), _Group())
+            # Re-inserting moves a repeat actor to the end, so the latest actor is named.
+            group.actors.pop(event.sender_id, None)
+            group.actors[event.sender_id] = event.sender_name
+            group.enqueued_at.append(enqueued_at)
+            if len(self._pending) >= self.batch_size:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        pending, self._pending, self._window_end = self._pending, {}, None
+        if not pending:
+            return
+        now = datetime.utcnow()
+        notifications = []
+        for (recipient_id, notification_type, post_id), group in pending.items():
+            sender_id, sender_name = list(group.actors.items())[-1]
+            others = len(group.actors) - 1
+            actor = f"{sender_name} and {others} other{'s' if others > 1 else ''}" if others else sender_name
+            notifications.append({
+                "recipient_id": recipient_id,
+                "sender_id": sender_id,
+                "type": notification_type.value,
+                "content": f"{actor} {MESSAGES[notification_type]}",
+                "post_id": post_id,
+                "actor_ids": list(group.actors)[-MAX_ACTORS:],
+                "actor_count": len(group.actors),
+                "read": False,
+                "created_at": now
+            })
+
+        try:
+            notification_ids = await self.notification_repo.insert_many(notifications)
+        except Exception as e:
+            NOTIFICATION_EVENTS.inc(sum(len(group.enqueued_at) for group in pending.values()), outcome="failed")
+            logger.error(f"Could not write {len(notifications)} notifications: {e}")
+            return
+        NOTIFICATION_FLUSH_SIZE.observe(len(notifications))
+        flushed_at = time.monotonic()
+        for group in pending.values():
+            for enqueued_at in group.enqueued_at:
+                NOTIFICATION_LAG_SECONDS.observe(flushed_at - enqueued_at)
+
+        try:
+            for recipient_id, count in TallyCounter(n["recipient_id"] for n in notifications).items():
+                await self.unread_counters.notifications_added(recipient_id, count)
+            for notification_id, notification in zip(notification_ids, notifications):
+                notification.pop("_id", None)
+                await realtime_hub.publish(notification["recipient_id"], "notification", {**notification, "id": notification_id})
+        except Exception as e:
+            # The notifications are stored; counters are reconciled and clients refetch.
+            logger.error(f"Could not fan out {len(notifications)} notifications: {e}")
+
+    async def close(self) -> None:
+        """Writes every queued event, then stops the worker."""
+        if self._worker is None:
+            return
+        await self._queue.put((None, None))
+        await self._worker
+        self._worker = None
+
+notification_pipeline = NotificationPipeline(
+    "createk", NOTIFICATION_COALESCE_SECONDS, NOTIFICATION_BATCH_SIZE, NOTIFICATION_QUEUE_SIZE
+)
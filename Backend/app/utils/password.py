@@ -0,0 +1,90 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.utils.metrics import Counter, Gauge, Histogram
+import bcrypt
+
+if not hasattr(bcrypt, '__about__'):
+    bcrypt.__about__ = type('about', (object,), {'__version__': bcrypt.__version__})
+
+password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password, queueing included.",
+    labels=("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0)
+)
+PASSWORD_QUEUE_DEPTH = Gauge(
+    "password_queue_depth",
+    "Password operations running or waiting for a worker process."
+)
+PASSWORD_REJECTED = Counter(
+    "password_rejected_total",
+    "Password operations rejected because the queue was full.",
+    labels=("operation",)
+)
+
+def _hash(password: str) -> str:
+    return password_context.hash(password)
+
+def _verify(password: str, hashed_password: str) -> bool:
+    # passlib checks bcrypt digests with a constant-time comparison.
+    return password_context.verify(password, hashed_password)
+
+class PasswordService:
+    """
+    Runs bcrypt in a pool of worker processes so hashing never blocks the event
+    loop. At most `max_pending` operations may be running or queued; beyond that
+    callers get a 503 instead of piling up behind the pool.
+    """
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self._pending >= self.max_pending:
+            PASSWORD_REJECTED.inc(operation=operation)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"}
+            )
+
+        self._pending += 1
+        PASSWORD_QUEUE_DEPTH.set(self._pending)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            PASSWORD_QUEUE_DEPTH.set(self._pending)
+            PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, password: str, hashed_password: Optional[str]) -> bool:
+        if not hashed_password:
+            return False
+        return await self._run("verify", _verify, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
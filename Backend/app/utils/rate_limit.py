@@ -0,0 +1,174 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from jose import JOSEError
+from redis.exceptions import RedisError
+from starlette.responses import JSONResponse
+from app.credentials.config import RATE_LIMITS, RATE_LIMIT_TRUSTED_PROXIES
+from app.db.connector import RedisConnectionManager
+from app.utils.auth_utils import token_claims
+from app.utils.metrics import Counter
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limited requests by route group and result (allowed, rejected, error).",
+    labels=("group", "result")
+)
+
+# Sliding window counter: the previous window's count, weighted by how much of it
+# still overlaps the sliding window, plus the current window's count. A rejected
+# request is not counted. Returns {allowed, remaining, retry after in ms}.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local estimate = previous * (window - elapsed) / window + current
+if estimate + 1 > limit then
+    local wait
+    if current + 1 > limit then
+        -- Once this window ends it becomes the previous one and has to fade out.
+        wait = window - elapsed + window * (1 - (limit - 1) / current)
+    else
+        wait = window * (1 - (limit - 1 - current) / previous) - elapsed
+    end
+    return {0, 0, math.max(1, math.ceil(wait))}
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('PEXPIRE', KEYS[1], window * 2)
+end
+return {1, math.floor(limit - estimate - 1), 0}
+"""
+
+# Path prefixes with their own limits; other writes fall in "write", other reads in "default".
+ROUTE_GROUPS: List[Tuple[str, str]] = [
+    ("/api/oauth2", "auth"),
+    ("/search", "search"),
+]
+EXEMPT_PREFIXES = ("/metrics", "/docs", "/openapi.json", "/template/")
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+def route_group(method: str, path: str) -> Optional[str]:
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    for prefix, group in ROUTE_GROUPS:
+        if path.startswith(prefix):
+            return group
+    return "write" if method in WRITE_METHODS else "default"
+
+class SlidingWindowLimiter:
+    """
+    Request counters shared by every worker through Redis. Each hit is one
+    EVALSHA of `SLIDING_WINDOW_SCRIPT`, which reads the two windows, decides
+    and counts atomically, so concurrent requests cannot overshoot the limit.
+    """
+    def __init__(self, prefix: str = "ratelimit"):
+        self.prefix = prefix
+        self.connection_manager = RedisConnectionManager()
+        self._script = None
+
+    async def hit(self, group: str, subject: str, limit: int, window_seconds: int) -> Tuple[bool, int, float]:
+        """Counts one request of `subject` and returns (allowed, remaining, seconds to wait before retrying)."""
+        redis = await self.connection_manager.get_client()
+        if self._script is None:
+            self._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+        window_ms = window_seconds * 1000
+        now_ms = int(time.time() * 1000)
+        index, elapsed = divmod(now_ms, window_ms)
+        base = f"{self.prefix}:{group}:{subject}"
+        allowed, remaining, retry_after_ms = await self._script(
+            keys=[f"{base}:{index}", f"{base}:{index - 1}"],
+            args=[limit, window_ms, elapsed]
+        )
+        return bool(allowed), int(remaining), int(retry_after_ms) / 1000
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def client_key(scope, trusted_proxies: int) -> str:
+    """`user:<subject>` for requests carrying a valid access token, else `ip:<client address>`."""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        try:
+            subject = token_claims(scope, authorization[7:]).get("sub")
+        except JOSEError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+
+    address = scope["client"][0] if scope.get("client") else "unknown"
+    forwarded_for = _header(scope, b"x-forwarded-for")
+    if forwarded_for and trusted_proxies > 0:
+        # Each trusted proxy appends the address it got the request from; anything
+        # further left was sent by the client and may be forged.
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if hops:
+            address = hops[-min(trusted_proxies, len(hops))]
+    return f"ip:{address}"
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing `RATE_LIMITS` per route group and per client:
+    the JWT subject when the request is authenticated, the client address
+    otherwise; the token is decoded once and its claims are reused by `has_access`.
+    Costs one Redis round trip per limited request. Rejected requests
+    get a 429 with Retry-After; allowed ones carry X-RateLimit-Limit and
+    X-RateLimit-Remaining. When Redis fails, requests are let through.
+    """
+    def __init__(
+        self,
+        app,
+        limits: Dict[str, Tuple[int, int]] = RATE_LIMITS,
+        trusted_proxies: int = RATE_LIMIT_TRUSTED_PROXIES,
+        limiter: Optional[SlidingWindowLimiter] = None
+    ):
+        self.app = app
+        self.limits = limits
+        self.trusted_proxies = trusted_proxies
+        self.limiter = limiter or SlidingWindowLimiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["method"], scope["path"])
+        limit, window_seconds = self.limits.get(group, (0, 0)) if group else (0, 0)
+        if limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            allowed, remaining, retry_after = await self.limiter.hit(
+                group, client_key(scope, self.trusted_proxies), limit, window_seconds
+            )
+        except RedisError:
+            RATE_LIMIT_DECISIONS.inc(group=group, result="error")
+            await self.app(scope, receive, send)
+            return
+
+        if not allowed:
+            RATE_LIMIT_DECISIONS.inc(group=group, result="rejected")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after)), "X-RateLimit-Limit": str(limit)}
+            )
+            await response(scope, receive, send)
+            return
+
+        RATE_LIMIT_DECISIONS.inc(group=group, result="allowed")
+        rate_headers = [
+            (b"x-ratelimit-limit", str(limit).encode()),
+            (b"x-ratelimit-remaining", str(remaining).encode()),
+        ]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *rate_headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
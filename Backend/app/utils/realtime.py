@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional, Set
+from fastapi import WebSocket
+from redis.exceptions import RedisError
+from app.credentials.config import WS_HEARTBEAT_SECONDS, WS_SEND_QUEUE_SIZE
+from app.db.connector import RedisConnectionManager
+from app.utils.metrics import Counter, Gauge
+from app.utils.request_scope import spawn_detached
+
+logger = logging.getLogger(__name__)
+
+WS_CONNECTIONS = Gauge("ws_connections", "WebSocket connections open on this worker.")
+WS_SUBSCRIBED_USERS = Gauge("ws_subscribed_users", "Users with at least one socket on this worker.")
+WS_EVENTS_SENT = Counter("ws_events_sent_total", "Events written to WebSockets.", labels=("type",))
+WS_EVENTS_PUBLISHED = Counter("ws_events_published_total", "Events published to user channels.", labels=("type",))
+WS_DISCONNECTS = Counter("ws_disconnects_total", "WebSocket disconnections by reason.", labels=("reason",))
+
+class Connection:
+    """
+    One client socket. Events are queued and written by a dedicated task so a slow
+    client never stalls the pub/sub reader; when its queue is full the client is
+    disconnected and is expected to reconnect and refetch.
+    """
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.closed = asyncio.Event()
+        self.reason = "client"
+
+    def push(self, event_type: str, payload: str) -> bool:
+        try:
+            self.queue.put_nowait((event_type, payload))
+        except asyncio.QueueFull:
+            self.close("backpressure")
+            return False
+        return True
+
+    def close(self, reason: str) -> None:
+        if not self.closed.is_set():
+            self.reason = reason
+            self.closed.set()
+
+class RealtimeHub:
+    """
+    Routes events to the sockets held by this worker.
+
+    Every user has a Redis channel; a worker subscribes to it while it holds at
+    least one socket of that user, through a single pub/sub connection read by
+    one task. Publishing therefore reaches the user wherever they are connected.
+    """
+    def __init__(self, db_name: str, heartbeat_seconds: float, queue_size: int):
+        self.db_name = db_name
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self.connection_manager = RedisConnectionManager()
+        self._connections: Dict[str, Set[Connection]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        # Serializes (un)subscriptions, which share the pub/sub connection.
+        self._lock = asyncio.Lock()
+
+    def _channel(self, user_id: str) -> str:
+        return f"{self.db_name}:ws:user:{user_id}"
+
+    async def publish(self, user_id: str, event_type: str, data: Dict) -> None:
+        # Delivery is best effort: clients catch up through the REST endpoints.
+        try:
+            redis = await self.connection_manager.get_client()
+            await redis.publish(self._channel(user_id), json.dumps({"type": event_type, "data": data}, default=str))
+        except RedisError as e:
+            logger.warning(f"Could not publish {event_type} to {user_id}: {e}")
+            return
+        WS_EVENTS_PUBLISHED.inc(type=event_type)
+
+    async def serve(self, websocket: WebSocket, user_id: str) -> None:
+        """Runs an accepted socket until the client leaves, stops answering pings or falls behind."""
+        connection = Connection(websocket, user_id, self.queue_size)
+        await self._register(connection)
+        tasks = [
+            asyncio.create_task(self._receive(connection)),
+            asyncio.create_task(self._send(connection)),
+        ]
+        try:
+            await connection.closed.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._unregister(connection)
+            WS_DISCONNECTS.inc(reason=connection.reason)
+            if connection.reason != "client":
+                try:
+                    await websocket.close(code=1013 if connection.reason == "backpressure" else 1001)
+                except Exception:
+                    pass
+
+    async def _receive(self, connection: Connection) -> None:
+        try:
+            while True:
+                # Any client frame counts as a heartbeat answer.
+                await connection.websocket.receive_text()
+                connection.last_seen = time.monotonic()
+        except Exception:
+            connection.close("client")
+
+    async def _send(self, connection: Connection) -> None:
+        try:
+            while True:
+                try:
+                    event_type, payload = await asyncio.wait_for(connection.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - connection.last_seen > 2 * self.heartbeat_seconds:
+                        connection.close("heartbeat")
+                        return
+                    await connection.websocket.send_text('{"type": "ping"}')
+                    continue
+                await connection.websocket.send_text(payload)
+                WS_EVENTS_SENT.inc(type=event_type)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            connection.close("client")
+
+    async def _register(self, connection: Connection) -> None:
+        connections = self._connections.setdefault(connection.user_id, set())
+        connections.add(connection)
+        WS_CONNECTIONS.inc()
+        if len(connections) == 1:
+            try:
+                async with self._lock:
+                    pubsub = await self._get_pubsub()
+                    await pubsub.subscribe(self._channel(connection.user_id))
+            except BaseException:
+                # Leave no trace, so that the next connection of the user subscribes again.
+                WS_CONNECTIONS.dec()
+                connections.discard(connection)
+                if connections:
+                    # Connections that arrived meanwhile counted on this subscription.
+                    for other in connections:
+                        other.close("unsubscribed")
+                else:
+                    del self._connections[connection.user_id]
+                raise
+            WS_SUBSCRIBED_USERS.set(len(self._connections))
+            if self._reader is None:
+                # Shared by every connection: it must not live in this one's request scope.
+                self._reader = spawn_detached(self._read())
+
+    async def _unregister(self, connection: Connection) -> None:
+        WS_CONNECTIONS.dec()
+        connections = self._connections.get(connection.user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[connection.user_id]
+            WS_SUBSCRIBED_USERS.set(len(self._connections))
+            try:
+                async with self._lock:
+                    # The user may have reconnected while we waited for the lock.
+                    if connection.user_id not in self._connections:
+                        await self._pubsub.unsubscribe(self._channel(connection.user_id))
+            except Exception as e:
+                logger.warning(f"Could not unsubscribe {connection.user_id}: {e}")
+
+    async def _get_pubsub(self):
+        if self._pubsub is None:
+            redis = await self.connection_manager.get_client()
+            self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        return self._pubsub
+
+    async def _read(self) -> None:
+        prefix = self._channel("")
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Realtime pub/sub reader error: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not message or message["type"] != "message":
+                continue
+            connections = self._connections.get(message["channel"][len(prefix):])
+            if not connections:
+                continue
+            event_type = json.loads(message["data"]).get("type", "unknown")
+            for connection in list(connections):
+                connection.push(event_type, message["data"])
+
+    async def close(self) -> None:
+        for connections in list(self._connections.values()):
+            for connection in list(connections):
+                connection.close("shutdown")
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+realtime_hub = RealtimeHub("createk", WS_HEARTBEAT_SECONDS, WS_SEND_QUEUE_SIZE)
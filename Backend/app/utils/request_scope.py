@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Per-request storage shared by everything running on behalf of one request
+# (dependencies, handlers and the tasks they spawn). None outside a request.
+_request_scope: ContextVar[Optional[Dict[Any, Any]]] = ContextVar("request_scope", default=None)
+
+def current_request_scope() -> Optional[Dict[Any, Any]]:
+    return _request_scope.get()
+
+class RequestScopeMiddleware:
+    """Pure ASGI middleware giving every HTTP and WebSocket request a fresh scope dict."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+class Deadline:
+    """
+    Monotonic time by which the current request has to be answered. It is
+    shared, not copied, by the tasks the request spawns, so lifting it with
+    `lift` once the response has started reaches all of them.
+    """
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        self.expires_at: Optional[float] = expires_at
+
+    def remaining(self) -> Optional[float]:
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+    def lift(self) -> None:
+        self.expires_at = None
+
+# Set by DeadlineMiddleware (app.utils.deadline). None outside a request.
+#
+# Like the request scope, the deadline is inherited by every task a request
+# spawns. Work meant to outlive the request must not run under it: start
+# long-lived tasks with `spawn_detached` and wrap BackgroundTasks functions with
+# `without_deadline`.
+request_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline, 0 or less once it passed, None without one."""
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Awaits `awaitable`, cancelling it with asyncio.TimeoutError if the request deadline passes first."""
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, max(remaining, 0))
+
+def without_deadline(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Wraps an async function, typically a BackgroundTasks one, to run with no request deadline."""
+    @wraps(func)
+    async def run(*args: Any, **kwargs: Any) -> T:
+        token = request_deadline.set(None)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            request_deadline.reset(token)
+    return run
+
+def spawn_detached(coro: Coroutine[Any, Any, T]) -> "asyncio.Task[T]":
+    """Starts `coro` as a task in an empty context, outside the scope and deadline of the current request."""
+    return asyncio.create_task(coro, context=contextvars.Context())
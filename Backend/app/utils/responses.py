@@ -0,0 +1,137 @@
+import typing
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple, Type
+import orjson
+from bson import ObjectId
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.routers.models import Page
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """JSON-encodes `content` with orjson; datetimes are written natively in ISO 8601, ObjectIds as strings."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson, several times faster than the standard library on large pages."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """The model nested in a field annotation, unwrapping Optional[...] and List[...], and whether it is a list."""
+    many = False
+    while True:
+        origin = typing.get_origin(annotation)
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if origin in (list, typing.List) and args:
+            many, annotation = True, args[0]
+        elif origin is not None and len(args) == 1:
+            annotation = args[0]
+        else:
+            break
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+class FieldSelection(NamedTuple):
+    """Fields of `model` a client asked for with `fields=`; other fields of that model are left out."""
+    model: Type[BaseModel]
+    names: FrozenSet[str]
+
+def field_selection(model: Type[BaseModel]) -> Callable[..., Optional[FieldSelection]]:
+    """
+    Dependency parsing a sparse fieldset: `fields=id,title` keeps only those
+    fields of `model` in the response, `id` always included. Unknown names are
+    rejected with a 400. Without `fields` the whole model is returned.
+    """
+    known = frozenset(model.model_fields)
+
+    def parse(
+        fields: Optional[str] = Query(
+            None,
+            description=f"Comma-separated `{model.__name__}` fields to return; `id` is always included. Defaults to all fields."
+        )
+    ) -> Optional[FieldSelection]:
+        if fields is None:
+            return None
+        names = frozenset(name.strip() for name in fields.split(",") if name.strip())
+        unknown = names - known
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return FieldSelection(model, names | (known & {"id"}))
+
+    return parse
+
+def selected_fields(selection: Optional[FieldSelection]) -> Optional[FrozenSet[str]]:
+    return selection.names if selection is not None else None
+
+_MISSING = object()
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> Tuple[Tuple[str, str, Any, Optional[Type[BaseModel]], bool], ...]:
+    """(name, key, field if it has a default, nested model, is list) for every field of `model`."""
+    plan = []
+    for name, field in model.model_fields.items():
+        nested, many = _nested_model(field.annotation)
+        plan.append((name, field.alias or name, _MISSING if field.is_required() else field, nested, many))
+    return tuple(plan)
+
+def serialize_trusted(
+    model: Type[BaseModel],
+    data: Mapping[str, Any],
+    selection: Optional[FieldSelection] = None
+) -> Dict[str, Any]:
+    """
+    What FastAPI would send for `data` as `response_model=model`, for trusted
+    data such as documents this API wrote itself: the declared fields are
+    picked, missing ones get their default and nested models are shaped the
+    same way, but nothing is validated or coerced. Data that may not match the
+    model must go through `model_validate`. Wherever `selection.model` appears,
+    only the selected fields are kept, so partial documents are sent as they are.
+    """
+    names = selection.names if selection is not None and selection.model is model else None
+    result = {}
+    for name, key, field, nested, many in _plan(model):
+        if names is not None and name not in names:
+            continue
+        value = data.get(key, _MISSING)
+        if value is _MISSING:
+            if field is _MISSING:
+                continue
+            value = field.get_default(call_default_factory=True)
+        if nested is not None and value is not None:
+            if many:
+                value = [serialize_trusted(nested, item, selection) if isinstance(item, Mapping) else item for item in value]
+            elif isinstance(value, Mapping):
+                value = serialize_trusted(nested, value, selection)
+        result[key] = value
+    return result
+
+def trusted_response(
+    model: Type[BaseModel],
+    data: Mapping[str, Any],
+    selection: Optional[FieldSelection] = None,
+    **kwargs: Any
+) -> ORJSONResponse:
+    """
+    Returns `data` shaped as `model` without validating it. FastAPI does not
+    validate Response objects against the route's `response_model`, so the
+    route keeps its documented schema while skipping the second validation.
+    """
+    return ORJSONResponse(serialize_trusted(model, data, selection), **kwargs)
+
+def trusted_page(
+    model: Type[BaseModel],
+    items: List[Mapping[str, Any]],
+    next_cursor: Optional[str],
+    selection: Optional[FieldSelection] = None
+) -> ORJSONResponse:
+    """`trusted_response` for a `Page[model]`."""
+    return trusted_response(Page[model], {"items": items, "next_cursor": next_cursor}, selection)
@@ -0,0 +1,41 @@
+import re
+import unicodedata
+from typing import List
+
+TOKEN_PATTERN = re.compile(r"#?\w+")
+
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae"})
+
+STOPWORDS = frozenset({
+    # English
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have",
+    "in", "into", "is", "it", "its", "of", "on", "or", "that", "the", "their", "this",
+    "to", "was", "we", "were", "will", "with", "you", "your",
+    # French (accents already stripped)
+    "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "elle", "en", "est",
+    "et", "il", "ils", "je", "la", "le", "les", "leur", "mais", "nous", "ou", "par",
+    "pas", "pour", "qu", "que", "qui", "sa", "se", "ses", "son", "sur", "un", "une",
+    "vous",
+})
+
+def normalize(text: str) -> str:
+    """Lowercases `text` and strips accents, so "Équipe" and "equipe" match."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold().translate(LIGATURES))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def tokenize(text: str, expand_hashtags: bool = True) -> List[str]:
+    """
+    Splits `text` into normalized search terms. A hashtag yields the `#tag`
+    term and, when `expand_hashtags` is set, the plain `tag` word as well, so
+    indexed hashtags match both `#tag` and `tag` queries. Stopwords and single
+    characters are dropped.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.findall(normalize(text or "")):
+        word = match.lstrip("#")
+        is_hashtag = match.startswith("#") and bool(word)
+        if is_hashtag:
+            tokens.append(f"#{word}")
+        if (expand_hashtags or not is_hashtag) and len(word) > 1 and word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
@@ -0,0 +1,118 @@
+"""
+CPU time and peak memory of turning a Mongo reply of `--docs` documents into
+response-ready objects, without a server: the documents are encoded to BSON
+once and decoded the way the driver decodes a reply batch.
+
+For users (`UserRepository` reads) and posts (`/posts/all`, `/feed`) it compares:
+  - before: default codec, then a pass rewriting every `_id` to a string, a
+    copy of every user into a mapped dict before `UserInDB`, and the full post
+    documents (search fields included);
+  - after: `READ_CODEC_OPTIONS`, which yields string ids while decoding,
+    `UserInDB.model_construct` on the decoded document and, for posts, only
+    the fields of `POST_PROJECTION`, as the server would send them.
+  - raw: `RawBSONDocument`, for reference. Decoding is deferred, not avoided:
+    reading every field, as a response does, pays it back.
+Posts are rendered to JSON with `serialize_trusted` in every case.
+
+Usage (from Backend/):
+    python -m benchmarks.document_decoding --docs 10000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from app.db.base_repo import READ_CODEC_OPTIONS
+from app.db.post_repo import POST_PROJECTION
+from app.routers.models import Page, Post, UserInDB
+from app.utils.responses import dumps, serialize_trusted
+
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+def user_document(i: int) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(), "full_name": f"user{i}", "email": f"user{i}@gmail.com", "hashed_password": "x" * 60,
+        "provider": "createk", "disabled": False, "profile_picture": None, "created_at": datetime.utcnow(),
+        "follower_count": 12, "following_count": 3, "social_links": {"github": f"https://github.com/user{i}"}
+    }
+
+def post_document(i: int) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    comment = {
+        "id": str(ObjectId()), "author_id": str(ObjectId()), "content": "Count me in!",
+        "likes": [], "replies": [], "created_at": now, "updated_at": now
+    }
+    return {
+        "_id": ObjectId(), "title": f"Idea {i}", "content": "lorem ipsum " * 20, "author_id": str(ObjectId()),
+        "hashtags": ["startup", "fintech", "student"], "likes": [str(ObjectId()) for _ in range(5)],
+        "comment_count": 3, "recent_comments": [comment] * 3, "created_at": now, "updated_at": now
+    }
+
+def legacy_user(user_data: Dict) -> UserInDB:
+    return UserInDB.model_construct(**{
+        "_id": str(user_data["_id"]),
+        "full_name": user_data.get("full_name"),
+        "email": user_data.get("email"),
+        "hashed_password": user_data.get("hashed_password", ""),
+        "provider": user_data.get("provider", "createk"),
+        "disabled": user_data.get("disabled", False),
+        "profile_picture": user_data.get("profile_picture", None),
+        "follower_count": user_data.get("follower_count", 0),
+        "following_count": user_data.get("following_count", 0),
+        "social_links": user_data.get("social_links", {})
+    })
+
+def decode_with_id_pass(reply: bytes) -> List[Dict]:
+    documents = bson.decode_all(reply)
+    for document in documents:
+        document["_id"] = str(document["_id"])
+    return documents
+
+def render_posts(posts: List[Any]) -> bytes:
+    return dumps(serialize_trusted(Page[Post], {"items": [{**post, "id": post["_id"]} for post in posts]}))
+
+def render_raw_posts(posts: List[RawBSONDocument]) -> bytes:
+    return render_posts([{**post, "_id": str(post["_id"])} for post in posts])
+
+def measure(name: str, fn: Callable[[], Any], rounds: int) -> None:
+    fn()
+    cpu = time.process_time()
+    for _ in range(rounds):
+        fn()
+    cpu_ms = (time.process_time() - cpu) / rounds * 1000
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<8} {cpu_ms:8.1f}ms cpu  {peak / 1e6:7.1f}MB peak")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    users = [user_document(i) for i in range(args.docs)]
+    user_reply = b"".join(bson.encode(user) for user in users)
+    posts = [post_document(i) for i in range(args.docs)]
+    post_reply = b"".join(bson.encode(post) for post in posts)
+    projected_reply = b"".join(
+        bson.encode({key: value for key, value in post.items() if key in POST_PROJECTION or key == "_id"})
+        for post in posts
+    )
+
+    print(f"{args.docs} users")
+    measure("before", lambda: [legacy_user(user) for user in decode_with_id_pass(user_reply)], args.rounds)
+    measure("after", lambda: [UserInDB.model_construct(**user) for user in bson.decode_all(user_reply, READ_CODEC_OPTIONS)], args.rounds)
+
+    print(f"{args.docs} posts rendered to JSON")
+    measure("before", lambda: render_posts(decode_with_id_pass(post_reply)), args.rounds)
+    measure("after", lambda: render_posts(bson.decode_all(projected_reply, READ_CODEC_OPTIONS)), args.rounds)
+    measure("raw", lambda: render_raw_posts(bson.decode_all(post_reply, RAW_CODEC_OPTIONS)), args.rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compares GET /feed latency between the legacy `$in` scan and materialized timelines.
+
+Seeds a scratch database with synthetic users, follows and posts, then times
+both read paths for a sample of users and prints p50/p99 latencies.
+
+Usage (from Backend/, with MONGO_CONNECTION_STRING and REDIS_* pointing at scratch instances):
+    python -m benchmarks.feed_latency --users 2000 --follows 150 --posts 100000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+from bson import ObjectId
+from app.db.connector import MongoConnectionManager, RedisConnectionManager
+from app.db.follow_repo import FollowRepository
+from app.db.post_repo import PostRepository
+from app.db.timeline_repo import TimelineRepository
+from app.db.user_repo import UserRepository
+
+async def seed(db_name: str, users: int, follows: int, posts: int) -> List[dict]:
+    user_repo = UserRepository(db_name)
+    post_repo = PostRepository(db_name)
+    follow_repo = FollowRepository(db_name)
+
+    user_ids = [str(ObjectId()) for _ in range(users)]
+    user_docs = [
+        {
+            "_id": ObjectId(user_id),
+            "full_name": f"bench-user-{i}",
+        }
+        for i, user_id in enumerate(user_ids)
+    ]
+    following = {user_id: random.sample(user_ids, min(follows, users)) for user_id in user_ids}
+    edge_docs = [
+        {"follower_id": follower_id, "followee_id": followee_id, "created_at": datetime.utcnow()}
+        for follower_id, followees in following.items()
+        for followee_id in followees
+    ]
+    now = datetime.utcnow()
+    post_docs = [
+        {
+            "title": f"Post {i}",
+            "content": "lorem ipsum " * 20,
+            "author_id": random.choice(user_ids),
+            "likes": [],
+            "comments": [],
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+        }
+        for i in range(posts)
+    ]
+
+    async with user_repo.connection_manager.get_collection(db_name, "users") as collection:
+        await collection.drop()
+        await collection.insert_many(user_docs)
+    async with follow_repo.connection_manager.get_collection(db_name, "follows") as collection:
+        await collection.drop()
+        await follow_repo.ensure_indexes()
+        for start in range(0, len(edge_docs), 10000):
+            await collection.insert_many(edge_docs[start:start + 10000])
+    async with post_repo.connection_manager.get_collection(db_name, "posts") as collection:
+        await collection.drop()
+        await collection.create_index([("author_id", 1), ("created_at", -1)])
+        for start in range(0, len(post_docs), 10000):
+            await collection.insert_many(post_docs[start:start + 10000])
+
+    return [{"_id": user_id, "following": following[user_id]} for user_id in user_ids]
+
+async def measure(label: str, samples: List[dict], read: Callable[[dict], Awaitable]) -> None:
+    timings = []
+    for user in samples:
+        start = time.perf_counter()
+        await read(user)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<12} p50={statistics.median(timings):8.2f}ms  p99={p99:8.2f}ms  n={len(timings)}")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="createk_bench")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--follows", type=int, default=150)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    users = await seed(args.db, args.users, args.follows, args.posts)
+    samples = random.sample(users, min(args.samples, len(users)))
+    post_repo = PostRepository(args.db)
+    timeline_repo = TimelineRepository(args.db)
+
+    for user in samples:
+        await timeline_repo.rebuild(user["_id"])
+
+    await measure(
+        "$in scan",
+        samples,
+        lambda user: post_repo.find({"author_id": {"$in": user["following"]}})
+    )
+    await measure(
+        "timeline",
+        samples,
+        lambda user: timeline_repo.get_page(user["_id"], args.limit)
+    )
+
+    await MongoConnectionManager().close_all()
+    await RedisConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Drains a burst of welcome mails through the mail outbox into a local SMTP sink.
+
+Starts an aiosmtpd server in-process (accepting any login, without TLS),
+queues `--mails` welcome mails in a scratch database and runs the mail
+service until the outbox is empty. Prints throughput, per-mail send latency
+and how many SMTP logins were needed; `--no-reuse` replaces every pooled
+connection after each mail to show the cost of one handshake per mail.
+`--fail-rate` makes the sink reject that share of mails with a 451 to
+exercise the retry path.
+
+Usage (from Backend/, with MONGO_CONNECTION_STRING pointing at a scratch
+instance and aiosmtpd installed):
+    python -m benchmarks.mail_burst --mails 500 --pool 4
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import List
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from app.db.connector import MongoConnectionManager
+from app.utils.mail import MAIL_SMTP_LOGINS, MailService, SMTPConnectionPool
+
+class Sink:
+    def __init__(self, fail_rate: float):
+        self.fail_rate = fail_rate
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        if random.random() < self.fail_rate:
+            return "451 Try again later"
+        self.received += 1
+        return "250 OK"
+
+def accept_any(server, session, envelope, mechanism, auth_data) -> AuthResult:
+    return AuthResult(success=True)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="createk_mail_bench")
+    parser.add_argument("--mails", type=int, default=500)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--no-reuse", action="store_true")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    sink = Sink(args.fail_rate)
+    controller = Controller(
+        sink, hostname="127.0.0.1", port=args.port,
+        authenticator=accept_any, auth_require_tls=False
+    )
+    controller.start()
+
+    pool = SMTPConnectionPool(
+        "127.0.0.1", args.port, False, "bench@createk.local", "secret", args.pool,
+        idle_seconds=-1 if args.no_reuse else 60
+    )
+    service = MailService(args.db, pool, "bench@createk.local", args.batch, 0.1, 3)
+
+    try:
+        async with service.outbox.connection_manager.get_collection(args.db, "mail_outbox") as collection:
+            await collection.drop()
+        await service.outbox.ensure_indexes()
+        for i in range(args.mails):
+            await service.enqueue(f"user-{i}@createk.local", "Welcome to Createk", "welcome.html", {"full_name": f"User {i}"})
+
+        start = time.perf_counter()
+        rounds: List[float] = []
+        while await service.outbox.count({"status": "pending"}):
+            round_start = time.perf_counter()
+            claimed = await service.dispatch_once()
+            if claimed:
+                rounds.append((time.perf_counter() - round_start) * 1000 / claimed)
+            # Make retries due at once instead of waiting out the backoff.
+            await service.outbox.update_many(
+                {"status": "pending", "lease": {"$exists": False}},
+                {"$set": {"next_attempt_at": datetime.utcnow()}}
+            )
+        elapsed = time.perf_counter() - start
+
+        sent = await service.outbox.count({"status": "sent"})
+        failed = await service.outbox.count({"status": "failed"})
+        print(f"sent {sent}, failed {failed}, sink received {sink.received} in {elapsed:.2f}s ({sent / elapsed:.0f} mails/s)")
+        if rounds:
+            print(f"per mail p50={statistics.median(rounds):.2f}ms  max={max(rounds):.2f}ms (batch average)")
+        print(f"smtp logins: {MAIL_SMTP_LOGINS.value()}")
+    finally:
+        await service.close()
+        controller.stop()
+        await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
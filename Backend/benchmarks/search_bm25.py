@@ -0,0 +1,113 @@
+"""
+Compares /search/posts latency between the legacy `$regex` scan and the BM25 inverted index.
+
+Seeds a scratch database with a synthetic corpus whose vocabulary follows a
+Zipf distribution, builds the inverted index, then times both read paths for
+a sample of single- and two-term queries and prints p50/p99 latencies.
+
+Usage (from Backend/, with MONGO_CONNECTION_STRING pointing at a scratch instance):
+    python -m benchmarks.search_bm25 --posts 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+from bson import ObjectId
+from typing import Awaitable, Callable, List
+from app.db.connector import MongoConnectionManager
+from app.db.post_repo import PostRepository
+from app.db.search_index_repo import PostSearchIndex
+
+BATCH_SIZE = 5000
+
+def build_vocabulary(size: int) -> List[str]:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "do", "fi"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(syllables, k=random.randint(2, 4))))
+    return list(words)
+
+async def seed(db_name: str, posts: int, vocabulary: List[str]) -> None:
+    post_repo = PostRepository(db_name)
+    index = PostSearchIndex(db_name)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    async with post_repo.connection_manager.get_collection(db_name, "posts") as collection:
+        await collection.drop()
+    for name in ("search_postings", "search_terms", "search_stats"):
+        async with post_repo.connection_manager.get_collection(db_name, name) as collection:
+            await collection.drop()
+    await index.ensure_indexes()
+
+    now = datetime.utcnow()
+    for start in range(0, posts, BATCH_SIZE):
+        batch = [
+            {
+                "title": " ".join(random.choices(vocabulary, weights, k=5)),
+                "content": " ".join(random.choices(vocabulary, weights, k=40)),
+                "author_id": "bench",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for _ in range(min(BATCH_SIZE, posts - start))
+        ]
+        post_ids = await post_repo.insert_many(batch)
+        await index.index_documents(list(zip(post_ids, batch)))
+        print(f"seeded {start + len(batch)}/{posts} posts", end="\r")
+    print()
+
+async def measure(label: str, queries: List[str], read: Callable[[str], Awaitable]) -> None:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        await read(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<8} p50={statistics.median(timings):9.2f}ms  p99={p99:9.2f}ms  n={len(timings)}")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="createk_bench")
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, keeps the vocabulary stable across runs")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    vocabulary = build_vocabulary(args.vocabulary)
+    if not args.skip_seed:
+        await seed(args.db, args.posts, vocabulary)
+
+    post_repo = PostRepository(args.db)
+    index = PostSearchIndex(args.db)
+    queries = [
+        " ".join(random.sample(vocabulary[:5000], random.randint(1, 2)))
+        for _ in range(args.queries)
+    ]
+
+    async def regex_search(query: str):
+        return await post_repo.find_many({
+            "$or": [
+                {"title": {"$regex": query, "$options": "i"}},
+                {"content": {"$regex": query, "$options": "i"}},
+                {"hashtags": query}
+            ]
+        })
+
+    async def bm25_search(query: str):
+        ranked, _ = await index.search(query, args.limit)
+        return await post_repo.find_many({"_id": {"$in": [ObjectId(doc_id) for doc_id, _ in ranked]}})
+
+    await measure("$regex", queries, regex_search)
+    await measure("bm25", queries, bm25_search)
+
+    await MongoConnectionManager().close_all()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Per-item cost of turning stored documents into a JSON response body.
+
+Builds `--items` post documents shaped like `/posts/all` and `/feed` pages
+(author summary and recent comments embedded), notification documents and
+raw user documents, then times, per item:
+  - validated: what FastAPI does with a returned dict and a `response_model`,
+    i.e. validate into the model, dump in JSON mode and encode with `json`;
+  - trusted: `serialize_trusted` (picks the declared fields, no validation)
+    encoded with orjson, as `trusted_response` and `cached_response` do;
+  - users: `UserInDB(**doc)` against `UserInDB.model_construct(**doc)` as
+    used by `UserRepository`.
+Both paths are checked to produce the same JSON before timing.
+
+Usage (from Backend/):
+    python -m benchmarks.serialization --items 1000 --rounds 20
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+from bson import ObjectId
+from pydantic import TypeAdapter
+from app.routers.models import Notification, Page, Post, UserInDB
+from app.utils.responses import dumps, serialize_trusted
+
+def post_document(now: datetime) -> Dict[str, Any]:
+    post_id = str(ObjectId())
+    comment = {
+        "id": str(ObjectId()), "author_id": str(ObjectId()), "content": "Count me in!",
+        "likes": [], "replies": [], "created_at": now, "updated_at": now
+    }
+    return {
+        "_id": post_id, "id": post_id, "title": "Looking for a co-founder", "content": "lorem ipsum " * 20,
+        "author_id": str(ObjectId()), "hashtags": ["startup"],
+        "author": {"id": str(ObjectId()), "full_name": "johndoe", "profile_picture": None},
+        "likes": [str(ObjectId()) for _ in range(5)], "comment_count": 3,
+        "recent_comments": [comment] * 3, "created_at": now, "updated_at": now
+    }
+
+def notification_document(now: datetime) -> Dict[str, Any]:
+    notification_id = str(ObjectId())
+    return {
+        "_id": notification_id, "id": notification_id, "recipient_id": str(ObjectId()),
+        "sender_id": str(ObjectId()), "type": "like", "content": "johndoe liked your post",
+        "post_id": str(ObjectId()), "actor_ids": [str(ObjectId())], "actor_count": 1,
+        "read": False, "created_at": now
+    }
+
+def user_document() -> Dict[str, Any]:
+    return {
+        "_id": str(ObjectId()), "full_name": "johndoe", "email": "johndoe@gmail.com", "hashed_password": "x" * 60,
+        "provider": "createk", "disabled": False, "profile_picture": None,
+        "follower_count": 12, "following_count": 3, "social_links": {"github": "https://github.com/johndoe"}
+    }
+
+def per_item_us(fn: Callable[[], Any], items: int, rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds / items * 1e6
+
+def validated_body(adapter: TypeAdapter, payload: Dict) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(payload), mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    pages = {
+        "posts": (Page[Post], {"items": [post_document(now) for _ in range(args.items)], "next_cursor": "cursor"}),
+        "notifications": (Page[Notification], {"items": [notification_document(now) for _ in range(args.items)], "next_cursor": "cursor"}),
+    }
+    for name, (model, payload) in pages.items():
+        adapter = TypeAdapter(model)
+        assert json.loads(validated_body(adapter, payload)) == json.loads(dumps(serialize_trusted(model, payload)))
+        before = per_item_us(lambda: validated_body(adapter, payload), args.items, args.rounds)
+        after = per_item_us(lambda: dumps(serialize_trusted(model, payload)), args.items, args.rounds)
+        print(f"{name:<14} validated {before:7.1f}us/item  trusted {after:7.1f}us/item  ({before / after:.1f}x)")
+
+    users: List[Dict] = [user_document() for _ in range(args.items)]
+    before = per_item_us(lambda: [UserInDB(**user) for user in users], args.items, args.rounds)
+    after = per_item_us(lambda: [UserInDB.model_construct(**user) for user in users], args.items, args.rounds)
+    print(f"{'users':<14} validated {before:7.1f}us/item  trusted {after:7.1f}us/item  ({before / after:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Holds many idle /ws connections against one uvicorn worker.
+
+Opens `--sockets` WebSockets as `--user` (any existing user works: a worker
+subscribes once per user, so also try `--users` > 1 to exercise one channel
+per socket), answers heartbeats, keeps them open for `--hold` seconds and
+prints connect latencies, failures and the worker's own `ws_connections`
+gauge read from /metrics. Watch the worker's RSS and CPU while it holds.
+
+Usage (from Backend/, against a single worker started with e.g.
+`ulimit -n 65536 && uvicorn app.main:app --workers 1`; raise the client's
+ulimit -n as well):
+    python -m benchmarks.ws_idle --sockets 10000 --user alice --hold 60
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+import httpx
+import websockets
+from app.utils.auth_utils import create_access_token
+
+async def hold_socket(url: str, token: str, connected: asyncio.Event, timings: List[float], failures: List[str]) -> None:
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(f"{url}?token={token}", open_timeout=30, ping_interval=None) as websocket:
+            timings.append((time.perf_counter() - start) * 1000)
+            connected.set()
+            async for frame in websocket:
+                if json.loads(frame).get("type") == "ping":
+                    await websocket.send("pong")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        failures.append(type(e).__name__)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1:8000")
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--user", default="bench-user-0", help="full_name the tokens are issued for")
+    parser.add_argument("--users", type=int, default=1, help="spread sockets over <user>, <user>-1, ... <user>-(n-1)")
+    parser.add_argument("--concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--hold", type=float, default=60)
+    args = parser.parse_args()
+
+    url = f"ws://{args.host}/ws"
+    tokens = [
+        create_access_token({"sub": args.user if i == 0 else f"{args.user}-{i}"})
+        for i in range(args.users)
+    ]
+    timings: List[float] = []
+    failures: List[str] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def open_one(i: int) -> asyncio.Task:
+        async with semaphore:
+            connected = asyncio.Event()
+            task = asyncio.create_task(hold_socket(url, tokens[i % len(tokens)], connected, timings, failures))
+            waiter = asyncio.create_task(connected.wait())
+            await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            return task
+
+    start = time.perf_counter()
+    tasks = await asyncio.gather(*[open_one(i) for i in range(args.sockets)])
+    ramp = time.perf_counter() - start
+    print(f"opened {len(timings)} sockets in {ramp:.1f}s, {len(failures)} failures {sorted(set(failures))}")
+    if timings:
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"connect p50={statistics.median(timings):8.2f}ms  p99={p99:8.2f}ms")
+
+    await asyncio.sleep(args.hold)
+    async with httpx.AsyncClient(base_url=f"http://{args.host}") as client:
+        metrics = (await client.get("/metrics")).text
+    for line in metrics.splitlines():
+        if line.startswith(("ws_connections", "ws_subscribed_users", "ws_disconnects_total")):
+            print(f"worker {line}")
+    print(f"still open after {args.hold:.0f}s: {sum(not task.done() for task in tasks)}")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+import copy
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import pytest
+from bson import ObjectId
+from app.db.connector import MongoConnectionManager
+
+OPERATORS = {
+    "$in": lambda value, operand: value in operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+}
+
+def matches(document: Dict, query: Dict) -> bool:
+    """Top-level equality and the comparison operators above; enough for the repositories under test."""
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            if not all(OPERATORS[operator](value, operand) for operator, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict]):
+        self.documents = documents
+
+    def sort(self, keys: List[tuple]):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, limit: int):
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self.documents[:length]
+
+class FakeCollection:
+    """The few collection methods the tests go through, recording what was written."""
+    def __init__(self):
+        self.documents: List[Dict] = []
+
+    def with_options(self, **kwargs):
+        return self
+
+    def find(self, query: Dict, projection: Optional[Dict] = None) -> FakeCursor:
+        # Projections are ignored: callers only read the fields they asked for.
+        return FakeCursor([copy.deepcopy(document) for document in self.documents if matches(document, query)])
+
+    async def update_many(self, query: Dict, update: Dict, upsert: bool = False):
+        modified = 0
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update.get("$set", {}))
+                for field, amount in update.get("$inc", {}).items():
+                    document[field] = document.get(field, 0) + amount
+                for field in update.get("$unset", {}):
+                    document.pop(field, None)
+                modified += 1
+        return SimpleNamespace(modified_count=modified, upserted_id=None)
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        document = next((document for document in self.documents if matches(document, query)), None)
+        if document is None:
+            return SimpleNamespace(modified_count=0, upserted_id=None)
+        return await self.update_many({"_id": document["_id"]}, update)
+
+    async def insert_one(self, document: Dict):
+        document.setdefault("_id", ObjectId())
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents: List[Dict]):
+        return SimpleNamespace(inserted_ids=[(await self.insert_one(document)).inserted_id for document in documents])
+
+@pytest.fixture
+def fake_mongo(monkeypatch):
+    """Replaces the Mongo client with in-memory collections: `fake_mongo[db][collection]`."""
+    client = defaultdict(lambda: defaultdict(FakeCollection))
+
+    async def get_client(self):
+        return client
+
+    monkeypatch.setattr(MongoConnectionManager, "get_client", get_client)
+    return client
@@ -0,0 +1,38 @@
+import asyncio
+from app.utils.cache import CacheManager
+
+def test_cancelled_leader_does_not_cancel_waiters(monkeypatch):
+    cache = CacheManager("test", {})
+
+    async def miss(namespace, keys):
+        return {}
+
+    async def write(namespace, entries, ttl=None):
+        return None
+
+    monkeypatch.setattr(cache, "_read", miss)
+    monkeypatch.setattr(cache, "_write", write)
+
+    async def scenario():
+        leader_loading = asyncio.Event()
+
+        async def stuck_loader():
+            leader_loading.set()
+            await asyncio.Event().wait()
+
+        async def loader():
+            return {"id": "post"}
+
+        leader = asyncio.create_task(cache.get_or_load("post", "1", stuck_loader))
+        await leader_loading.wait()
+        waiter = asyncio.create_task(cache.get_or_load("post", "1", loader))
+        await asyncio.sleep(0)
+        # e.g. the leader's client disconnected or its deadline ran out.
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        return leader.cancelled(), await waiter
+
+    leader_cancelled, value = asyncio.run(scenario())
+    assert leader_cancelled
+    assert value == {"id": "post"}
+    assert not CacheManager._inflight
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from app.db.base_repo import BaseRepository
+from app.utils.deadline import DeadlineMiddleware
+from app.utils.request_scope import Deadline, remaining_time, request_deadline, spawn_detached, without_deadline
+
+BUDGET = 0.05
+
+def build_app(detached_writes: list):
+    repo = BaseRepository("test", "events")
+    app = FastAPI()
+
+    async def write_later(name: str) -> None:
+        await asyncio.sleep(BUDGET * 2)
+        await repo.insert_one({"name": name})
+
+    @app.post("/slow")
+    async def slow():
+        detached_writes.append(spawn_detached(write_later("detached")))
+        await asyncio.sleep(BUDGET * 4)
+        return {}
+
+    @app.get("/remaining")
+    async def remaining():
+        return {"remaining": remaining_time()}
+
+    app.add_middleware(DeadlineMiddleware, timeouts={"default": BUDGET, "write": BUDGET})
+    return app
+
+def run(app, method: str, path: str):
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path)
+    return request
+
+def test_without_deadline_outlives_the_request_deadline(fake_mongo):
+    repo = BaseRepository("test", "events")
+    remaining = []
+
+    async def write_later(name: str) -> None:
+        await asyncio.sleep(BUDGET * 2)
+        remaining.append(remaining_time())
+        await repo.insert_one({"name": name})
+
+    async def scenario():
+        # Still running when the request's deadline passes, as a background task may be.
+        token = request_deadline.set(Deadline(time.monotonic() + BUDGET))
+        try:
+            await without_deadline(write_later)("background")
+        finally:
+            request_deadline.reset(token)
+
+    asyncio.run(scenario())
+    assert remaining == [None]
+    assert [event["name"] for event in fake_mongo["test"]["events"].documents] == ["background"]
+
+def test_timed_out_request_returns_504_and_detached_task_still_writes(fake_mongo):
+    detached = []
+    app = build_app(detached)
+
+    async def scenario():
+        response = await run(app, "POST", "/slow")()
+        await asyncio.gather(*detached)
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 504
+    assert [event["name"] for event in fake_mongo["test"]["events"].documents] == ["detached"]
+
+def test_remaining_time_is_scoped_to_the_request():
+    response = asyncio.run(run(build_app([]), "GET", "/remaining")())
+    assert 0 < response.json()["remaining"] <= BUDGET
+    assert remaining_time() is None
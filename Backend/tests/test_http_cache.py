@@ -0,0 +1,30 @@
+import asyncio
+import fakeredis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from starlette.requests import Request
+from app.utils.http_cache import _tag_key, cached_response, invalidate_tags
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+def test_tag_set_outlives_every_entry_under_it():
+    redis = fakeredis.FakeAsyncRedis()
+    FastAPICache.init(RedisBackend(redis), prefix="test-cache")
+
+    async def scenario():
+        async def build():
+            return {"id": "1"}
+
+        def tags(payload):
+            return ["post:1"]
+
+        await cached_response(_request(), "post_response", "long", 600, build, tags)
+        # A shorter-lived entry under the same tag must not shorten the set.
+        await cached_response(_request(), "feed_response", "short", 15, build, tags)
+        ttl = await redis.ttl(_tag_key("post:1"))
+
+        assert await invalidate_tags("post:1") == 2
+        return ttl
+
+    assert asyncio.run(scenario()) > 15
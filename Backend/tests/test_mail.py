@@ -0,0 +1,92 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta
+from typing import List
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from app.utils.mail import BACKOFF_BASE_SECONDS, MailService, SMTPConnectionPool
+
+class RecordingHandler:
+    """Accepts every login and answers each DATA with the next scripted reply, 250 once they run out."""
+    def __init__(self):
+        self.logins = 0
+        self.replies: List[str] = []
+        self.received: List[str] = []
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=True)
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.replies:
+            return self.replies.pop(0)
+        self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(
+        handler,
+        hostname="127.0.0.1",
+        port=_free_port(),
+        authenticator=handler.authenticate,
+        auth_require_tls=False
+    )
+    controller.start()
+    yield handler, controller
+    controller.stop()
+
+def _mail_service(controller: Controller) -> MailService:
+    pool = SMTPConnectionPool(
+        controller.hostname, controller.port, False, "sender@example.com", "secret", size=1, timeout=5
+    )
+    return MailService("test", pool, "sender@example.com", batch_size=10, poll_seconds=1, max_attempts=3)
+
+def _dispatch(service: MailService, recipients: List[str]) -> None:
+    async def scenario():
+        for recipient in recipients:
+            await service.enqueue(recipient, "Welcome", "welcome.html")
+        await service.dispatch_once()
+        await service.close()
+
+    asyncio.run(scenario())
+
+def test_connection_is_reused_across_mails(fake_mongo, smtp_server):
+    handler, controller = smtp_server
+    recipients = [f"user{i}@example.com" for i in range(3)]
+    _dispatch(_mail_service(controller), recipients)
+
+    assert sorted(handler.received) == recipients
+    assert handler.logins == 1
+    assert [mail["status"] for mail in fake_mongo["test"]["mail_outbox"].documents] == ["sent"] * 3
+
+def test_transient_rejection_is_retried_with_backoff(fake_mongo, smtp_server):
+    handler, controller = smtp_server
+    handler.replies = ["451 Try again later"]
+    _dispatch(_mail_service(controller), ["user@example.com"])
+
+    [mail] = fake_mongo["test"]["mail_outbox"].documents
+    assert mail["status"] == "pending"
+    assert mail["attempts"] == 1
+    assert "451" in mail["last_error"]
+    # The lease is released and the retry waits out the backoff.
+    assert "lease" not in mail
+    assert mail["next_attempt_at"] >= datetime.utcnow() + timedelta(seconds=BACKOFF_BASE_SECONDS * 0.5 - 5)
+
+def test_permanent_rejection_is_not_retried(fake_mongo, smtp_server):
+    handler, controller = smtp_server
+    handler.replies = ["550 No such user"]
+    _dispatch(_mail_service(controller), ["nobody@example.com"])
+
+    [mail] = fake_mongo["test"]["mail_outbox"].documents
+    assert mail["status"] == "failed"
+    assert mail["attempts"] == 1
+    assert "550" in mail["last_error"]
+    assert "lease" not in mail
@@ -0,0 +1,30 @@
+import asyncio
+import time
+from app.routers.models import NotificationType
+from app.utils.notifications import NotificationEvent, NotificationPipeline
+from app.utils.request_scope import Deadline, request_deadline
+
+def test_worker_started_under_expired_deadline_still_writes(fake_mongo, monkeypatch):
+    async def scenario():
+        pipeline = NotificationPipeline("test", window_seconds=0.01, batch_size=10, max_queue=100)
+
+        async def skip(*args, **kwargs):
+            return None
+        monkeypatch.setattr(pipeline.unread_counters, "notifications_added", skip)
+
+        # The first event of the process comes from a request whose budget ran out.
+        token = request_deadline.set(Deadline(time.monotonic() - 1))
+        try:
+            pipeline.enqueue(NotificationEvent("recipient", "sender", "bob", NotificationType.FOLLOW))
+        finally:
+            request_deadline.reset(token)
+        await asyncio.sleep(0.05)
+        pipeline.enqueue(NotificationEvent("recipient", "other", "alice", NotificationType.FOLLOW))
+        await pipeline.close()
+
+    asyncio.run(scenario())
+    written = fake_mongo["test"]["notifications"].documents
+    assert [notification["content"] for notification in written] == [
+        "bob started following you",
+        "alice started following you",
+    ]
@@ -0,0 +1,129 @@
+"""
+Every hot-path repository query must be served by an index: the index registry
+is applied to a scratch database seeded with one document per collection, and
+no winning plan of the patterns below may contain a COLLSCAN stage. Add a
+pattern whenever a repository gains a query that runs on a request path.
+
+Needs a mongod at MONGO_CONNECTION_STRING and is skipped without one.
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from app.credentials.config import MONGO_CONNECTION_STRING
+from app.db.connector import MongoConnectionManager
+from app.db.indexes import ensure_indexes
+
+DB_NAME = "createk_plans"
+
+def _mongod_reachable() -> bool:
+    try:
+        with MongoClient(MONGO_CONNECTION_STRING, serverSelectionTimeoutMS=500) as client:
+            client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+pytestmark = pytest.mark.skipif(not _mongod_reachable(), reason="no mongod reachable at MONGO_CONNECTION_STRING")
+
+USER_ID = str(ObjectId())
+OTHER_ID = str(ObjectId())
+NOW = datetime.utcnow()
+
+SEED: Dict[str, Dict] = {
+    "users": {"full_name": "plan-user", "email": "plan@example.com"},
+    "posts": {"author_id": USER_ID, "title": "plan", "content": "plan", "created_at": NOW},
+    "comments": {"post_id": USER_ID, "index": 0, "count": 1, "comments": []},
+    "follows": {"follower_id": USER_ID, "followee_id": OTHER_ID, "created_at": NOW},
+    "messages": {"conversation_id": f"{USER_ID}:{OTHER_ID}", "sender_id": USER_ID, "recipient_id": OTHER_ID, "created_at": NOW},
+    "conversations": {
+        "conversation_id": f"{USER_ID}:{OTHER_ID}",
+        "participants": [USER_ID, OTHER_ID],
+        "created_at": NOW,
+        "updated_at": NOW
+    },
+    "notifications": {"recipient_id": USER_ID, "created_at": NOW, "read": False},
+    "search_postings": {"index": "posts", "term": "plan", "doc_id": USER_ID, "tf": 1, "length": 1},
+    "search_terms": {"index": "posts", "term": "plan", "df": 1},
+    "search_stats": {"index": "posts", "doc_count": 1, "total_length": 1},
+}
+
+class QueryPattern(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict
+    sort: Optional[List[tuple]] = None
+
+QUERY_PATTERNS = [
+    QueryPattern("principal by full_name", "users", {"full_name": "plan-user"}),
+    QueryPattern("user by email", "users", {"email": "plan@example.com"}),
+    QueryPattern("users page", "users", {"_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+    QueryPattern("posts page", "posts", {}, [("created_at", -1), ("_id", -1)]),
+    QueryPattern("posts by author", "posts", {"author_id": USER_ID}, [("created_at", -1), ("_id", -1)]),
+    QueryPattern(
+        "timeline rebuild", "posts",
+        {"author_id": {"$in": [USER_ID, OTHER_ID]}}, [("created_at", -1)]
+    ),
+    QueryPattern(
+        "last comment bucket", "comments",
+        {"post_id": USER_ID, "index": {"$exists": True}}, [("index", -1)]
+    ),
+    QueryPattern("comment buckets", "comments", {"post_id": USER_ID, "index": {"$gte": 0}}, [("index", 1)]),
+    QueryPattern("is following", "follows", {"follower_id": USER_ID, "followee_id": OTHER_ID}),
+    QueryPattern("following page", "follows", {"follower_id": USER_ID}, [("_id", -1)]),
+    QueryPattern("followers page", "follows", {"followee_id": OTHER_ID}, [("_id", -1)]),
+    QueryPattern(
+        "conversation", "messages",
+        {"conversation_id": f"{USER_ID}:{OTHER_ID}"}, [("created_at", 1), ("_id", 1)]
+    ),
+    QueryPattern("conversation by id", "conversations", {"conversation_id": f"{USER_ID}:{OTHER_ID}"}),
+    QueryPattern("inbox", "conversations", {"participants": USER_ID}, [("updated_at", -1), ("_id", -1)]),
+    QueryPattern("notifications", "notifications", {"recipient_id": USER_ID}, [("created_at", -1), ("_id", -1)]),
+    QueryPattern("unread notifications", "notifications", {"recipient_id": USER_ID, "read": False}),
+    QueryPattern(
+        "unread conversations", "conversations",
+        {"participants": USER_ID, f"unread.{USER_ID}": {"$gt": 0}}
+    ),
+    QueryPattern("postings by term", "search_postings", {"index": "posts", "term": "plan"}, [("tf", -1)]),
+    QueryPattern("postings by document", "search_postings", {"index": "posts", "doc_id": USER_ID}),
+    QueryPattern("document frequencies", "search_terms", {"index": "posts", "term": {"$in": ["plan"]}}),
+    QueryPattern("index stats", "search_stats", {"index": "posts"}),
+]
+
+def _stages(plan) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _stages(item)]
+    return []
+
+async def _collection_scans() -> List[str]:
+    client = await MongoConnectionManager().get_client()
+    await client.drop_database(DB_NAME)
+    try:
+        for collection_name, document in SEED.items():
+            await client[DB_NAME][collection_name].insert_one(document)
+        await ensure_indexes(DB_NAME)
+
+        scans = []
+        for pattern in QUERY_PATTERNS:
+            cursor = client[DB_NAME][pattern.collection].find(pattern.filter)
+            if pattern.sort:
+                cursor = cursor.sort(pattern.sort)
+            explain = await cursor.limit(20).explain()
+            stages = _stages(explain["queryPlanner"]["winningPlan"])
+            if "COLLSCAN" in stages:
+                scans.append(f"{pattern.collection}: {pattern.name} ({' > '.join(stages)})")
+        return scans
+    finally:
+        await client.drop_database(DB_NAME)
+        await MongoConnectionManager().close_all()
+
+def test_hot_path_queries_use_an_index():
+    assert asyncio.run(_collection_scans()) == []
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError
+from app.utils.realtime import WS_CONNECTIONS, RealtimeHub
+
+class FakeWebSocket:
+    async def receive_text(self) -> str:
+        await asyncio.Event().wait()
+
+    async def send_text(self, text: str) -> None:
+        pass
+
+    async def close(self, code: int) -> None:
+        pass
+
+class FlakyPubSub:
+    """Fails the first subscription, as when Redis is briefly unreachable."""
+    def __init__(self):
+        self.channels = []
+
+    async def subscribe(self, channel: str) -> None:
+        if not self.channels:
+            self.channels.append(None)
+            raise ConnectionError("Redis is down")
+        self.channels.append(channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self.channels.remove(channel)
+
+    async def get_message(self, **kwargs):
+        await asyncio.sleep(kwargs.get("timeout", 1.0))
+
+    async def close(self) -> None:
+        pass
+
+def test_failed_subscription_is_rolled_back(monkeypatch):
+    hub = RealtimeHub("test", heartbeat_seconds=60, queue_size=10)
+    pubsub = FlakyPubSub()
+    hub._pubsub = pubsub
+
+    async def get_pubsub():
+        return pubsub
+
+    monkeypatch.setattr(hub, "_get_pubsub", get_pubsub)
+    gauge_before = WS_CONNECTIONS._values.get(WS_CONNECTIONS._key({}), 0)
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await hub.serve(FakeWebSocket(), "alice")
+        assert hub._connections == {}
+        assert WS_CONNECTIONS._values.get(WS_CONNECTIONS._key({}), 0) == gauge_before
+
+        # The next socket of the user subscribes again.
+        served = asyncio.create_task(hub.serve(FakeWebSocket(), "alice"))
+        await asyncio.sleep(0.01)
+        assert pubsub.channels == [None, hub._channel("alice")]
+        served.cancel()
+        await asyncio.gather(served, return_exceptions=True)
+        await hub.close()
+
+    asyncio.run(scenario())